@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+from datetime import date, timedelta
+
+import catalog
+import shared_state
+
+# 교사용 학급 통계 저장소
+# 스토리보드가 완성될 때마다 원본 한 줄(storyboards)과 함께 집계 표를 그 자리에서 1씩 올려요.
+# 통계 화면은 원본을 다시 세지 않고 집계 표만 읽으니, 1년치 기록이 쌓여도 몇 ms 안에 답해요.
+# ANALYTICS_PATH를 정하지 않으면 쓰지 않아요. 여러 워커가 같은 파일을 함께 써도 돼요 (SQLite WAL).
+#
+# 집계 표 (모두 학급이 맨 앞 열인 기본 키라 학급·기간으로 바로 찾아요)
+# - daily_valence: 학급·날짜·감정 신호등(positive/mixed/negative)별 개수
+# - daily_emotion: 학급·날짜·감정별 개수
+# - daily_situation: 학급·날짜·상황(공백 정리한 앞 60자)별 개수
+# - daily_student: 학급·날짜·학생(브라우저 토큰)별 개수
+# - class_totals: 학급별 전체 개수와 마지막 날짜
+# 원본과 집계는 한 트랜잭션으로 함께 써서 어긋나지 않아요. 집계 방식을 바꾸면 rebuild()로 원본에서 다시 만들어요.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS storyboards (
+    id INTEGER PRIMARY KEY,
+    classroom TEXT NOT NULL,
+    day TEXT NOT NULL,
+    student TEXT,
+    emotion TEXT,
+    valence TEXT NOT NULL,
+    situation TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS storyboards_class_day ON storyboards (classroom, day);
+CREATE TABLE IF NOT EXISTS daily_valence (
+    classroom TEXT NOT NULL, day TEXT NOT NULL, valence TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (classroom, day, valence)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_emotion (
+    classroom TEXT NOT NULL, day TEXT NOT NULL, emotion TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (classroom, day, emotion)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_situation (
+    classroom TEXT NOT NULL, day TEXT NOT NULL, situation TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (classroom, day, situation)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_student (
+    classroom TEXT NOT NULL, day TEXT NOT NULL, student TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (classroom, day, student)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS class_totals (
+    classroom TEXT PRIMARY KEY, count INTEGER NOT NULL, last_day TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+AGGREGATES = (
+    ("daily_valence", "classroom, day, valence", "?, ?, ?"),
+    ("daily_emotion", "classroom, day, emotion", "?, ?, ?"),
+    ("daily_situation", "classroom, day, situation", "?, ?, ?"),
+    ("daily_student", "classroom, day, student", "?, ?, ?"),
+)
+
+VALENCES = ("positive", "mixed", "negative")
+SITUATION_KEY_LENGTH = 60
+
+
+def situation_key(situation):
+    return " ".join((situation or "").split())[:SITUATION_KEY_LENGTH]
+
+
+def storyboard_row(classroom, student, emotion, situation, day=None, created=None):
+    # (classroom, day, student, emotion, valence, situation, created)
+    day = day or date.today().isoformat()
+    return (classroom, day, student or "-", emotion or "-", catalog.emotion_valence(emotion or ""),
+            situation_key(situation), created or time.time())
+
+
+def period(days, today=None):
+    # 오늘까지 days일 (시작일, 끝일)
+    today = today or date.today()
+    return (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+class AnalyticsStore:
+    def __init__(self, path, busy_timeout=10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connect().executescript(SCHEMA)
+
+    def connect(self):
+        return shared_state.connect_local(self.local, self.path, self.busy_timeout)
+
+    # --- 쓰기 ---
+
+    def add_rows(self, db, rows):
+        db.executemany(
+            "INSERT INTO storyboards (classroom, day, student, emotion, valence, situation, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        keys = {
+            "daily_valence": [(r[0], r[1], r[4]) for r in rows],
+            "daily_emotion": [(r[0], r[1], r[3]) for r in rows],
+            "daily_situation": [(r[0], r[1], r[5]) for r in rows],
+            "daily_student": [(r[0], r[1], r[2]) for r in rows],
+        }
+        for table, columns, values in AGGREGATES:
+            db.executemany(
+                f"INSERT INTO {table} ({columns}, count) VALUES ({values}, 1) "
+                f"ON CONFLICT DO UPDATE SET count = count + 1", keys[table])
+        db.executemany(
+            "INSERT INTO class_totals (classroom, count, last_day) VALUES (?, 1, ?) "
+            "ON CONFLICT DO UPDATE SET count = count + 1, last_day = max(last_day, excluded.last_day)",
+            [(r[0], r[1]) for r in rows])
+
+    def record_many(self, rows):
+        # rows: storyboard_row()로 만든 줄들 ; 원본과 집계를 한 트랜잭션으로 써요
+        db = self.connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            self.add_rows(db, rows)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def record(self, classroom, student, emotion, situation, day=None):
+        self.record_many([storyboard_row(classroom, student, emotion, situation, day)])
+
+    def rebuild(self):
+        # 원본에서 집계 표를 다시 만들어요 (집계 방식을 바꿨을 때)
+        db = self.connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("daily_valence", "daily_emotion", "daily_situation", "daily_student", "class_totals"):
+                db.execute(f"DELETE FROM {table}")
+            db.execute("INSERT INTO daily_valence SELECT classroom, day, valence, count(*) FROM storyboards GROUP BY 1, 2, 3")
+            db.execute("INSERT INTO daily_emotion SELECT classroom, day, emotion, count(*) FROM storyboards GROUP BY 1, 2, 3")
+            db.execute("INSERT INTO daily_situation SELECT classroom, day, situation, count(*) FROM storyboards GROUP BY 1, 2, 3")
+            db.execute("INSERT INTO daily_student SELECT classroom, day, student, count(*) FROM storyboards GROUP BY 1, 2, 3")
+            db.execute("INSERT INTO class_totals SELECT classroom, count(*), max(day) FROM storyboards GROUP BY 1")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    # --- 통계 화면용 읽기 (start, end는 "YYYY-MM-DD", 끝 날짜 포함) ---
+
+    def classrooms(self):
+        return self.connect().execute(
+            "SELECT classroom, count, last_day FROM class_totals ORDER BY classroom").fetchall()
+
+    def valence_by_day(self, classroom, start, end):
+        # [(날짜, {신호등: 개수})] 날짜순
+        days = {}
+        for day, valence, count in self.connect().execute(
+                "SELECT day, valence, count FROM daily_valence WHERE classroom = ? AND day BETWEEN ? AND ?",
+                (classroom, start, end)):
+            days.setdefault(day, dict.fromkeys(VALENCES, 0))[valence] = count
+        return sorted(days.items())
+
+    def valence_totals(self, classroom, start, end):
+        totals = dict.fromkeys(VALENCES, 0)
+        for valence, count in self.connect().execute(
+                "SELECT valence, sum(count) FROM daily_valence WHERE classroom = ? AND day BETWEEN ? AND ? "
+                "GROUP BY valence", (classroom, start, end)):
+            totals[valence] = count
+        return totals
+
+    def top_emotions(self, classroom, start, end, limit=10):
+        return self.connect().execute(
+            "SELECT emotion, sum(count) AS total FROM daily_emotion WHERE classroom = ? AND day BETWEEN ? AND ? "
+            "GROUP BY emotion ORDER BY total DESC LIMIT ?", (classroom, start, end, limit)).fetchall()
+
+    def top_situations(self, classroom, start, end, limit=10):
+        return self.connect().execute(
+            "SELECT situation, sum(count) AS total FROM daily_situation WHERE classroom = ? AND day BETWEEN ? AND ? "
+            "GROUP BY situation ORDER BY total DESC LIMIT ?", (classroom, start, end, limit)).fetchall()
+
+    def student_usage(self, classroom, start, end, limit=50):
+        # [(학생, 만든 개수, 쓴 날 수)] 많이 쓴 순
+        return self.connect().execute(
+            "SELECT student, sum(count) AS total, count(*) FROM daily_student "
+            "WHERE classroom = ? AND day BETWEEN ? AND ? "
+            "GROUP BY student ORDER BY total DESC LIMIT ?", (classroom, start, end, limit)).fetchall()
@@ -1,14 +1,41 @@
 import streamlit as st
-import requests
+import os
+import hmac
+import hashlib
+import threading
+import uuid
 import json
-import re
+from functools import lru_cache
 from datetime import datetime
-import time
 
-# 시크릿 키 불러오기
-GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY")
+import metrics
+import prompts
+import catalog
+import scheduler
+import shared_state
+import scene_parser
+import prefetch
+import analytics
+import ledger
+import moderation
+import assets
+import images
+import gemini_client
+from gemini_client import ask_gemini
+from moderation import validate_text_input
+from storyboard_state import Storyboard, is_stale_widget_key
 
-# 페이지 설정
+def get_setting(key, default=None):
+    # 환경 변수가 있으면 먼저 쓰고, 없으면 시크릿에서 찾아요 (CI에서는 시크릿 파일이 없어요)
+    value = os.environ.get(key)
+    if value:
+        return value
+    try:
+        return st.secrets.get(key, default)
+    except FileNotFoundError:
+        return default
+
+# 페이지 설정 (첫 화면이 빨리 나가도록 다른 준비보다 먼저 해요)
 st.set_page_config(
     page_title="4컷 만화 프롬프트 만들기",
     page_icon="📋",
@@ -16,307 +43,87 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-st.markdown("""
-<style>
-    .stApp, .stApp *, .stMarkdown, .stMarkdown * {
-        color: #000000 !important;
-    }
-    
-    .stTextInput > div > div > input, 
-    .stTextArea > div > div > textarea,
-    .stTextInput input,
-    .stTextArea textarea {
-        color: #ffffff !important;
-        background-color: #2c3e50 !important;
-    }
-    
-    .stCode, .stCode *, code, pre {
-        color: #ffffff !important;
-        background: #2c3e50 !important;
-    }
-    
-    /* 모든 버튼과 클릭 요소의 커서 문제 완전 해결 */
-    .stButton > button, 
-    .stButton > button *,
-    .stButton button,
-    button,
-    [data-testid="stButton"] > button,
-    [data-testid="stButton"] button,
-    [data-testid="stButton"],
-    .stButton,
-    div[data-testid="stButton"],
-    div[data-testid="stButton"] > button,
-    .element-container button {
-        color: white !important;
-        background: #3498db !important;
-        cursor: pointer !important;
-        pointer-events: auto !important;
-        border: none !important;
-    }
-    
-    .stButton > button:hover, 
-    .stButton > button *:hover,
-    .stButton button:hover,
-    button:hover,
-    [data-testid="stButton"] > button:hover,
-    [data-testid="stButton"] button:hover,
-    [data-testid="stButton"]:hover,
-    .stButton:hover,
-    div[data-testid="stButton"]:hover,
-    div[data-testid="stButton"] > button:hover,
-    .element-container button:hover {
-        cursor: pointer !important;
-        background: #2980b9 !important;
-        pointer-events: auto !important;
-    }
-    
-    .stButton > button:disabled, 
-    .stButton > button:disabled *,
-    .stButton button:disabled,
-    button:disabled,
-    [data-testid="stButton"] > button:disabled,
-    [data-testid="stButton"] button:disabled,
-    div[data-testid="stButton"] > button:disabled,
-    .element-container button:disabled {
-        cursor: not-allowed !important;
-        background: #95a5a6 !important;
-        opacity: 0.5 !important;
-        color: #ffffff !important;
-    }
-    
-    /* 라디오 버튼과 모든 클릭 가능한 요소들 */
-    [role="button"],
-    .stRadio > div,
-    .stRadio label,
-    .stRadio,
-    input[type="radio"],
-    .stSelectbox,
-    .stTextInput,
-    .stTextArea {
-        cursor: pointer !important;
-    }
-    
-    /* 전체 앱에서 커서 문제 해결 */
-    * {
-        cursor: default;
-    }
-    
-    button, input, select, textarea, [role="button"], .stButton, [data-testid="stButton"] {
-        cursor: pointer !important;
-    }
-    
-    /* 워터마크 예쁘게 꾸미기 - 왼쪽 하단 */
-    .watermark {
-        position: fixed;
-        bottom: 20px;
-        left: 20px;
-        font-size: 12px;
-        color: #ffffff;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 8px 16px;
-        border-radius: 20px;
-        z-index: 99999;
-        pointer-events: none;
-        font-weight: 600;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-        backdrop-filter: blur(10px);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        animation: watermarkFloat 3s ease-in-out infinite;
-    }
-    
-    @keyframes watermarkFloat {
-        0%, 100% { transform: translateY(0px); }
-        50% { transform: translateY(-5px); }
-    }
-    
-    /* 코드 블록 복사 버튼 스타일링 */
-    .stCode {
-        position: relative;
-    }
-    
-    .stCode:hover::after {
-        content: "📋";
-        position: absolute;
-        top: 10px;
-        right: 10px;
-        background: rgba(52, 152, 219, 0.9);
-        color: white;
-        padding: 5px 8px;
-        border-radius: 8px;
-        font-size: 12px;
-        cursor: pointer;
-        z-index: 1000;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-    }
-    
-    .stApp {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        font-family: 'Noto Sans KR', sans-serif;
-    }
-    .main-container {
-        background: rgba(255, 255, 255, 0.98);
-        padding: 2rem;
-        border-radius: 20px;
-        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        margin: 1rem auto;
-        max-width: 1200px;
-    }
-    .main-title {
-        text-align: center;
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    .subtitle {
-        text-align: center;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-    }
-    .step-indicator {
-        display: flex;
-        justify-content: center;
-        margin-bottom: 2rem;
-    }
-    .step {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin: 0 1rem;
-        font-weight: bold;
-    }
-    .step.active {
-        background: #3498db;
-        color: white;
-    }
-    .step.completed {
-        background: #27ae60;
-        color: white;
-    }
-    .step.inactive {
-        background: #ecf0f1;
-        color: #000000;
-    }
-    .card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 15px;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.08);
-        margin-bottom: 1rem;
-    }
-    .stButton > button {
-        width: 100%;
-        height: 50px;
-        border-radius: 10px;
-        border: none;
-        background: #3498db;
-        color: white;
-        font-weight: 600;
-        font-size: 1rem;
-    }
-    
-    .safety-guide {
-        display: flex;
-        gap: 2rem;
-        align-items: flex-start;
-        margin-bottom: 2rem;
-    }
-    
-    .safety-guide-left {
-        flex: 1;
-        background: #fff8e1;
-        border: 2px solid #ffc107;
-        border-radius: 15px;
-        padding: 1.5rem;
-    }
-    
-    .safety-guide-right {
-        flex: 1;
-        background: #e8f5e8;
-        border: 2px solid #28a745;
-        border-radius: 15px;
-        padding: 1.5rem;
-    }
-    
-    .safety-title {
-        font-size: 1.2rem;
-        font-weight: bold;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .safety-list {
-        list-style: none;
-        padding: 0;
-        margin: 0;
-    }
-    
-    .safety-list li {
-        margin-bottom: 0.8rem;
-        padding-left: 1.5rem;
-        position: relative;
-        line-height: 1.4;
-    }
-    
-    .safety-list li:before {
-        content: "•";
-        position: absolute;
-        left: 0;
-        color: #666;
-        font-weight: bold;
-    }
-    
-    .prohibited-list li:before {
-        content: "⚠️";
-        font-size: 1rem;
-    }
-    
-    .recommended-list li:before {
-        content: "✅";
-        font-size: 1rem;
-    }
-    
-    .next-step-container {
-        text-align: center;
-        padding: 2rem;
-        margin-top: 2rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 20px;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .next-step-text {
-        color: white;
-        font-size: 1.1rem;
-        margin-bottom: 1rem;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .next-step-emoji {
-        font-size: 2rem;
-        margin-bottom: 0.5rem;
-        display: inline-block;
-    }
-    
-    @media (max-width: 768px) {
-        .safety-guide {
-            flex-direction: column;
-            gap: 1rem;
-        }
-        
-        .main-container {
-            max-width: 95%;
-            padding: 1rem;
-        }
+@st.cache_resource
+def shared_store():
+    # 여러 워커 모드(workers.py): 같은 서버의 워커들이 SHARED_STATE_PATH의 SQLite 파일을 함께 써요
+    path = get_setting("SHARED_STATE_PATH")
+    return shared_state.SharedStore(path) if path else None
+
+@st.cache_resource
+def analytics_store():
+    # 교사용 학급 통계(analytics.py) ; ANALYTICS_PATH를 정하지 않으면 기록하지 않아요
+    path = get_setting("ANALYTICS_PATH")
+    return analytics.AnalyticsStore(path) if path else None
+
+@st.cache_resource
+def usage_ledger():
+    # Gemini 사용량 장부와 하루 예산(ledger.py) ; LEDGER_PATH를 정하지 않으면 기록하지 않아요
+    path = get_setting("LEDGER_PATH")
+    if not path:
+        return None
+    return ledger.Ledger(
+        path,
+        daily_budget=float(get_setting("DAILY_BUDGET_USD", 0)),
+        soft_ratio=float(get_setting("BUDGET_SOFT_RATIO", 0.8)),
+        input_price=float(get_setting("GEMINI_INPUT_PRICE", ledger.INPUT_PRICE)),
+        output_price=float(get_setting("GEMINI_OUTPUT_PRICE", ledger.OUTPUT_PRICE)),
+    )
+
+@st.cache_resource
+def load_settings():
+    # 시크릿/환경 설정은 처음 필요할 때 프로세스마다 한 번만 읽고, Gemini 클라이언트와 스케줄러도 그때 설정해요
+    # (첫 화면을 그리기 전에는 시크릿 파일을 읽지 않아요)
+    store = shared_store()
+    rate_limit = get_setting("GEMINI_RATE_LIMIT")
+    gemini_client.configure(
+        api_key=get_setting("GEMINI_API_KEY"),
+        base_url=get_setting("GEMINI_BASE_URL"),
+        mode=get_setting("GEMINI_MODE"),
+        fixture_dir=get_setting("GEMINI_FIXTURE_DIR"),
+        shared=store,
+        ledger=usage_ledger(),
+    )
+    scheduler.configure(
+        max_concurrent=get_setting("GEMINI_MAX_CONCURRENCY"),
+        queue_timeout=get_setting("GEMINI_QUEUE_TIMEOUT"),
+        # 분당 호출 수 제한은 모든 워커를 합쳐서 지켜요
+        limiter=shared_state.RateLimiter(store, "gemini", int(rate_limit)) if store and rate_limit else None,
+    )
+    dall_e_api_key = get_setting("DALL_E_API_KEY")
+    return {
+        "dall_e_api_key": dall_e_api_key,
+        # 4컷 이미지 만들기: IMAGE_BACKEND를 정하지 않으면 DALL-E 키가 있을 때만 켜요
+        "image_backend": get_setting("IMAGE_BACKEND") or ("openai" if dall_e_api_key else None),
+        # 그림 저장소(static/assets/)가 쓸 수 있는 최대 용량(MB) ; 넘으면 오래 안 본 그림부터 지워요
+        "asset_store_max_mb": int(get_setting("ASSET_STORE_MAX_MB", 512)),
+        # separate: 2·4단계에서 입력할 때마다 검사 / combined: 4단계에서 만들기를 누를 때 검사와 장면 만들기를 한 번에
+        "pipeline_mode": get_setting("PIPELINE_MODE", "separate"),
     }
-</style>
-""", unsafe_allow_html=True)
+
+def warm_up_modules(image_backend):
+    gemini_client.http_session()
+    if image_backend:
+        images.warm_up()
+
+@st.cache_resource
+def start_warm_up():
+    # 첫 화면을 다 보낸 뒤 백그라운드에서 HTTP 클라이언트(와 Pillow)를 미리 불러 둬요
+    # 첫 검사 호출이 모듈을 불러오느라 기다리지 않아요
+    thread = threading.Thread(target=warm_up_modules, args=(load_settings()["image_backend"],), daemon=True)
+    thread.start()
+    return thread
+
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+
+@st.cache_resource
+def stylesheet_tag():
+    # 전역 스타일은 static/style.css 파일로 한 번만 내려받게 하고, 매 실행마다는 짧은 <link> 태그만 보내요
+    # 주소에 내용 해시를 붙여서 CSS가 바뀌면 브라우저가 새 파일을 받아요
+    with open(STYLESHEET_PATH, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f'<link rel="stylesheet" href="app/static/style.css?v={version}">'
+
+st.markdown(stylesheet_tag(), unsafe_allow_html=True)
 
 def init_session_state():
     today = datetime.now().strftime("%Y-%m-%d")
@@ -328,110 +135,219 @@ def init_session_state():
     defaults = {
         "call_count": 0,
         "current_step": 1,
-        "age_group": None,
-        "gender": None,
-        "art_style": None,
-        "situation": None,
-        "emotion": None,
-        "reason": None,
-        "emotion_options": ([], []),
-        "scenes": [],
-        "scene_prompts": [],
+        "storyboard": None,
+        "classroom": st.query_params.get("class", scheduler.DEFAULT_TENANT),
         "last_date": today
     }
     
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
-
-def validate_text_input(text, min_length=5, max_length=200, field_name="입력"):
-    if not text or not text.strip():
-        return False, f"{field_name}을 입력해주세요."
     
-    text = text.strip()
-    if len(text) < min_length:
-        return False, f"{field_name}은 최소 {min_length}자 이상 입력해주세요."
-    
-    if len(text) > max_length:
-        return False, f"{field_name}은 최대 {max_length}자까지 입력 가능합니다."
-    
-    return True, ""
+    if st.session_state.storyboard is None:
+        st.session_state.storyboard = Storyboard()
+        restore_shared_session(today)
+
+def session_token():
+    # 여러 워커 모드에서 브라우저를 알아보는 토큰 (주소의 ?sb=) ; 새로고침하거나 다른 워커로 연결돼도 같아요
+    token = st.query_params.get("sb")
+    if not token:
+        token = uuid.uuid4().hex
+        st.query_params["sb"] = token
+    return token
+
+def shared_session_data():
+    return {
+        "date": st.session_state.last_date,
+        "step": st.session_state.current_step,
+        "call_count": st.session_state.call_count,
+        "storyboard": st.session_state.storyboard.to_dict(),
+    }
+
+def restore_shared_session(today):
+    # 다른 워커에서 만들던 스토리보드와 오늘 만든 횟수를 이어받아요
+    store = shared_store()
+    if store is None:
+        return
+    data = store.load_session(session_token())
+    if not data:
+        return
+    st.session_state.current_step = data["step"]
+    st.session_state.storyboard = Storyboard.from_dict(data["storyboard"])
+    if data["date"] == today:
+        st.session_state.call_count = data["call_count"]
+    st.session_state.saved_session = json.dumps(data, ensure_ascii=False, sort_keys=True)
+
+def save_shared_session():
+    # 전체 재실행이 끝날 때 바뀐 경우에만 저장해요
+    store = shared_store()
+    if store is None:
+        return
+    data = shared_session_data()
+    snapshot = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    if snapshot != st.session_state.get("saved_session"):
+        store.save_session(session_token(), data)
+        st.session_state.saved_session = snapshot
+
+def reset_storyboard():
+    # 새 스토리보드를 시작할 때 이전 스토리보드에서 쓰던 위젯 값도 함께 지워요
+    for key in list(st.session_state.keys()):
+        if is_stale_widget_key(key):
+            del st.session_state[key]
+    st.session_state.storyboard = Storyboard()
+
+# 이미 호출을 보낸 미리 만들기 결과를 기다려 줄 최대 시간(초) ; 넘으면 평소처럼 바로 호출해요
+# (아직 보내지 못한 작업은 기다리지 않고 취소해요, Prefetcher.collect)
+PREFETCH_WAIT = 0.5
+
+@st.cache_resource
+def prefetcher():
+    # 대기열이 밀리거나 분당 한도에 가까우면(scheduler.under_pressure), 하루 예산이 빠듯하면 미리 만들기를 멈춰요
+    return prefetch.Prefetcher(
+        max_workers=int(get_setting("PREFETCH_WORKERS", 2)),
+        budget_per_minute=int(get_setting("PREFETCH_BUDGET", 30)),
+        pressure=lambda: scheduler.under_pressure() or gemini_client.budget_state() != "ok",
+    )
+
+def speculate(template, tenant, **values):
+    # 뒤에서 미리 보내는 호출 (st.* 없이) ; 급한 호출에 자리를 양보하도록 batch 우선순위로 줄을 서요
+    load_settings()
+    result = ask_gemini(**prompts.request(template, **values), tenant=tenant, priority="batch",
+                        before_send=prefetcher().before_send)
+    if not result or result.startswith(("[오류]", "[안전 필터]")):
+        return None
+    return result
+
+def panel_values(age_group, gender, situation, emotion, index, scene):
+    return dict(age_group=age_group, gender=gender, situation=situation, emotion=emotion, index=index, scene=scene)
+
+def prefetch_panels(jobs, tenant, gender, values, scenes):
+    # 네 장면이 다 나왔으면 5단계의 컷별 프롬프트 호출도 이어서 미리 보내요
+    if len(scenes) < scene_parser.PANEL_COUNT:
+        return
+    for number, scene in sorted(scenes.items()):
+        panel = panel_values(values["age_group"], gender, values["situation"], values["emotion"], number, scene)
+        jobs.submit(prefetch.job_key("panel", panel), speculate, prompts.PANEL_PROMPT, tenant, **panel)
+
+def refine_scenes(jobs, draft_key, tenant, gender, values):
+    # 초안이 아직 보내지지 않았으면 기다리지 않고 초안 없이 만들어요
+    draft = jobs.collect(draft_key, PREFETCH_WAIT)
+    if draft:
+        result = speculate(prompts.SCENE_REFINE, tenant, draft=draft.strip(), **values)
+    else:
+        result = speculate(prompts.SCENE_SUMMARY, tenant, **values)
+    if result:
+        prefetch_panels(jobs, tenant, gender, values, scene_parser.parse_scenes(result))
+    return result
+
+def check_ahead(jobs, tenant, gender, values):
+    result = speculate(prompts.STORYBOARD_CHECKED, tenant, **values)
+    parsed = parse_verdicts(result) if result else None
+    if parsed and all(parsed[0].values()):
+        prefetch_panels(jobs, tenant, gender, values, parsed[1])
+    return result
+
+def draft_values(board):
+    return dict(age_group=board.age_group, situation=board.situation, emotion=board.emotion)
+
+def scene_values(board, reason=None):
+    return dict(draft_values(board), reason=board.reason if reason is None else reason)
+
+def replace_prefetch(slot, key):
+    # 입력이 바뀌어 필요 없어진 이전 작업은 취소해요
+    previous = st.session_state.get(slot)
+    if previous and previous != key:
+        prefetcher().cancel(previous)
+    st.session_state[slot] = key
+
+def prefetch_draft(board):
+    # 3단계에서 감정을 고르면 이유 없이 장면 초안을 미리 만들어요 (combined 모드는 4단계에서 한 번에 보내요)
+    if combined_pipeline():
+        return
+    values = draft_values(board)
+    key = prefetch.job_key("draft", values)
+    prefetcher().submit(key, speculate, prompts.SCENE_DRAFT, st.session_state.classroom, **values)
+    replace_prefetch("prefetch_draft", key)
+
+def prefetch_scenes(board, reason):
+    # 4단계에서 이유가 검사를 통과하면 초안을 이유에 맞게 다듬고, 이어서 컷별 프롬프트까지 만들어 둬요
+    # (combined 모드는 검사+장면 호출을 미리 보내요)
+    values = scene_values(board, reason)
+    jobs = prefetcher()
+    tenant = st.session_state.classroom
+    if combined_pipeline():
+        key = prefetch.job_key("combined", values)
+        jobs.submit(key, check_ahead, jobs, tenant, board.gender, values)
+    else:
+        key = prefetch.job_key("scenes", values)
+        jobs.submit(key, refine_scenes, jobs, prefetch.job_key("draft", draft_values(board)), tenant, board.gender, values)
+    replace_prefetch("prefetch_scenes", key)
+
+def combined_pipeline():
+    return load_settings()["pipeline_mode"] == "combined"
+
+def ask_ai(template, on_chunk=None, **values):
+    # 학급 단위로 공정하게 순서를 받도록 학급 이름을 함께 넘겨요 (주소의 ?class=3-2)
+    load_settings()
+    result = ask_gemini(**prompts.request(template, **values), tenant=st.session_state.classroom, on_chunk=on_chunk)
+    if result == gemini_client.BUDGET_MESSAGE and template["purpose"] == "moderation":
+        # 하루 예산 때문에 보내지 않은 검사는 로컬 필터로 정해요 (공유 캐시에 같은 검사가 있으면 ask_gemini가 이미 돌려줬어요)
+        metrics.increment("budget.local_moderation")
+        return moderation.local_verdict(values["text"])
+    return result
+
+@st.cache_resource
+def image_backend():
+    settings = load_settings()
+    if settings["image_backend"] == "openai":
+        return images.get_backend("openai", api_key=settings["dall_e_api_key"])
+    return images.get_backend(settings["image_backend"])
+
+@st.cache_resource
+def asset_store():
+    return assets.AssetStore(max_bytes=load_settings()["asset_store_max_mb"] * 1024 * 1024)
+
+def asset_image_html(name, alt, width=None):
+    # 그림 바이트는 웹소켓으로 보내지 않고, 정적 파일 주소만 보내서 브라우저가 직접(그리고 캐시해서) 받아요
+    size = f'width="{width}"' if width else 'style="max-width: 100%;"'
+    return f'<img src="{asset_store().url(name)}" alt="{alt}" {size}>'
+
+def make_comic_images(board):
+    style_prompt = catalog.style_prompt(board.art_style)
+
+    def make_strip():
+        return images.make_strip(image_backend(), board.scene_prompts, style_prompt, store=asset_store())
+
+    with st.spinner("🖼️ 네 컷을 그리고 한 장으로 이어 붙이고 있어요..."):
+        try:
+            store = shared_store()
+            if store is None:
+                result = make_strip()
+            else:
+                # 같은 만화를 다른 워커가 그리고 있으면 기다렸다가 결과만 받아요 (결과 캐시는 그림 저장소가 맡아요)
+                key = hashlib.sha256(json.dumps([list(board.scene_prompts), style_prompt]).encode("utf-8")).hexdigest()
+                result = store.run_once(f"images:{key}", make_strip, lease=600, max_age=0)
+        except (images.ImageGenerationError, ValueError, OSError) as e:
+            # 잘못된 그림 설정(ValueError)이나 그림 파일을 못 읽고 못 쓴 경우(PIL, 디스크)도 같은 실패로 보여줘요
+            st.error(f"❌ 이미지를 만들지 못했어요: {e}")
+            return
+    board.strip = result["strip"]
+    board.thumbnails = result["thumbnails"]
 
 def validate_age_group(age_group):
-    valid_ages = ["초등학교 1~2학년", "초등학교 3~4학년", "초등학교 5~6학년", "교사"]
-    return age_group in valid_ages
+    return age_group in catalog.AGE_GROUPS
 
 def get_emotion_traffic_light(emotion):
-    positive_emotions = ["기쁨", "행복", "감사", "뿌듯함", "만족", "희망", "신남", "설렘", "평온", "자신감"]
-    negative_emotions = ["슬픔", "화남", "답답함", "걱정", "두려움", "실망", "부끄러움", "외로움", "스트레스", "짜증"]
-    
-    if emotion in positive_emotions:
-        return {
-            "color": "🟢",
-            "status": "초록불",
-            "message": "건강하고 긍정적인 감정이에요! 이런 감정을 잘 표현하고 나누어보세요.",
-            "css_color": "#28a745"
-        }
-    elif emotion in negative_emotions:
-        return {
-            "color": "🔴", 
-            "status": "빨간불",
-            "message": "힘들고 어려운 감정이네요. 이런 감정은 혼자 담아두지 말고 선생님이나 부모님께 도움을 요청하는 것이 좋아요.",
-            "css_color": "#dc3545"
-        }
-    else:
-        return {
-            "color": "🟡",
-            "status": "노란불", 
-            "message": "복잡한 감정이에요. 천천히 생각해보고 감정을 정리해보세요.",
-            "css_color": "#ffc107"
-        }
-
-def ask_gemini(prompt, model="models/gemini-1.5-pro-latest"):
-    try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/{model}:generateContent?key={GEMINI_API_KEY}"
-        headers = {"Content-Type": "application/json"}
-        data = {"contents": [{"parts": [{"text": prompt}]}]}
-        
-        response = requests.post(url, headers=headers, data=json.dumps(data), timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
-        
-        inappropriate_words = [
-            "바보", "멍청", "죽어", "꺼져", "시발", "개새", "병신", "미친",
-            "혐오", "차별", "따돌림", "왕따", "괴롭히", "폭력", "때리", "싸우",
-            "비키니", "키스", "연애", "사랑", "섹시", "예쁘", "잘생", "몸매",
-            "담배", "술", "마약", "도박", "자해", "칼", "위험한",
-            "트럼프", "김정은", "윤석열", "문재인", "박근혜", "이재명", 
-            "바이든", "푸틴", "시진핑", "정치인", "대통령", "국회의원"
-        ]
-        
-        for word in inappropriate_words:
-            if word in generated_text:
-                return f"[안전 필터] 부적절한 내용이 생성되어 다시 생성합니다. 안전한 내용으로 대체됩니다."
-        
-        return generated_text
-        
-    except requests.exceptions.Timeout:
-        return "[오류] 요청 시간이 초과되었습니다."
-    except requests.exceptions.RequestException as e:
-        return f"[오류] 네트워크 오류: {str(e)}"
-    except KeyError:
-        return "[오류] API 응답 형식이 올바르지 않습니다."
-    except Exception as e:
-        return f"[오류] 예상치 못한 오류: {str(e)}"
+    return catalog.traffic_light(emotion)
 
 def fetch_emotions(situation):
-    positive_emotions = ["기쁨", "행복", "감사", "뿌듯함", "만족", "희망", "신남", "설렘", "평온", "자신감"]
-    negative_emotions = ["슬픔", "화남", "답답함", "걱정", "두려움", "실망", "부끄러움", "외로움", "스트레스", "짜증"]
-    return positive_emotions, negative_emotions
+    return catalog.POSITIVE_EMOTIONS, catalog.NEGATIVE_EMOTIONS
 
-def render_step_indicator(current_step):
+@lru_cache(maxsize=None)
+def step_indicator_html(current_step):
     steps = ["👤", "📝", "😊", "💭", "🎨"]
     
-    html = '<div class="step-indicator">'
+    parts = ['<div class="step-indicator">']
     for i, icon in enumerate(steps, 1):
         if i < current_step:
             css_class = "step completed"
@@ -440,213 +356,135 @@ def render_step_indicator(current_step):
         else:
             css_class = "step inactive"
         
-        html += f'<div class="{css_class}">{icon}</div>'
-    html += '</div>'
-    
-    st.markdown(html, unsafe_allow_html=True)
+        parts.append(f'<div class="{css_class}">{icon}</div>')
+    parts.append('</div>')
+    return "".join(parts)
 
-def render_progress_bar(progress):
-    html = f'''
+def render_step_indicator(current_step):
+    st.markdown(step_indicator_html(current_step), unsafe_allow_html=True)
+
+@lru_cache(maxsize=None)
+def progress_bar_html(progress):
+    return f'''
     <div style="width: 100%; height: 6px; background: #ecf0f1; border-radius: 3px; margin: 1rem 0;">
         <div style="width: {progress}%; height: 100%; background: #3498db; border-radius: 3px; transition: width 0.3s ease;"></div>
     </div>
     '''
-    st.markdown(html, unsafe_allow_html=True)
 
-# 메인 실행
-init_session_state()
+def render_progress_bar(progress):
+    st.markdown(progress_bar_html(progress), unsafe_allow_html=True)
 
-# 현재 call_count와 남은 횟수를 표시하고 싶다면
-remaining_calls = 50 - st.session_state.call_count
-st.info(f"오늘은 스토리보드를 {st.session_state.call_count}회 생성했어요. {remaining_calls}회 더 생성할 수 있어요!")
+@lru_cache(maxsize=None)
+def selected_style_html(style_name, emoji, desc):
+    return f"""
+        <div class="success-animation" style="background: #e8f5e8; border: 2px solid #27ae60; padding: 1rem; border-radius: 15px; text-align: center;">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">{emoji}</div>
+            <div style="font-size: 1.2rem; font-weight: bold; color: #27ae60; margin-bottom: 0.5rem;">선택한 스타일: {style_name}</div>
+            <div style="color: #2d5016;">{desc}</div>
+        </div>
+        """
 
-if st.session_state.call_count >= 50:
-    st.error("🚫 오늘은 50회까지만 생성할 수 있습니다. 내일 다시 이용해 주세요.")
-    st.stop()
+@lru_cache(maxsize=None)
+def situation_examples_html(age_group, situations):
+    return f"""
+    <div style="background: #f8f9fa; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
+        <strong>💡 {age_group} 학교생활 상황 예시:</strong><br>
+        {'<br>'.join([f'• {situation}' for situation in situations])}
+    </div>
+    """
 
-st.markdown('<div class="main-container">', unsafe_allow_html=True)
+def go_to_step(step, balloons=False, message=None):
+    # 서버에서 기다리거나 곧 버려질 화면을 그리지 않고 바로 다음 단계로 다시 실행해요
+    # 풍선과 알림은 다음 실행에서 한 번만 보여줘서 애니메이션은 브라우저에서 재생돼요
+    st.session_state.current_step = step
+    st.session_state.pending_feedback = {"balloons": balloons, "message": message}
+    st.rerun()
 
-st.markdown('<h1 class="main-title">📋 4컷 만화 스토리보드 생성기</h1>', unsafe_allow_html=True)
-st.markdown('<p class="subtitle">감정과 상황을 바탕으로 4컷 만화 스토리보드와 최적화된 이미지 프롬프트를 만들어보세요!</p>', unsafe_allow_html=True)
+def select_style(style_name):
+    # 버튼 콜백이라 스크립트 실행 전에 반영돼요 (추가 st.rerun() 없이 한 번만 실행)
+    st.session_state.storyboard.art_style = style_name
+    st.session_state.pending_feedback = {"balloons": False, "message": f"✨ {style_name} 스타일을 선택했어요!"}
 
-render_step_indicator(st.session_state.current_step)
+def show_pending_feedback():
+    feedback = st.session_state.pop("pending_feedback", None)
+    if not feedback:
+        return
+    if feedback["balloons"]:
+        st.balloons()
+    if feedback["message"]:
+        st.toast(feedback["message"])
 
-progress = (st.session_state.current_step - 1) * 25
-render_progress_bar(progress)
+# 2~5단계는 fragment로 나눠서, 글자를 입력하거나 검사할 때 해당 단계만 다시 실행돼요
+# 단계를 넘어갈 때의 st.rerun()은 앱 전체를 다시 실행해요
+
+def record_storyboard(board):
+    store = analytics_store()
+    if store is None:
+        return
+    try:
+        store.record(st.session_state.classroom, session_token(), board.emotion, board.situation)
+    except Exception:
+        # 통계 기록이 안 돼도 학생 화면은 그대로 보여줘요
+        metrics.increment("analytics.record_errors")
+
+def render_teacher_dashboard():
+    # 주소에 ?teacher=<TEACHER_KEY>&class=3-2 를 붙이면 학급 감정 통계를 봐요 (집계 표만 읽어요)
+    store = analytics_store()
+    teacher_key = get_setting("TEACHER_KEY")
+    given = st.query_params.get("teacher", "")
+    # 열쇠는 한 글자씩 맞춰 보며 알아내지 못하도록 걸리는 시간이 같은 비교를 써요
+    if store is None or not teacher_key or not hmac.compare_digest(given.encode("utf-8"), teacher_key.encode("utf-8")):
+        st.error("교사용 통계를 볼 수 없어요. ANALYTICS_PATH와 TEACHER_KEY 설정을 확인해주세요.")
+        return
+    st.subheader("📊 학급 감정 통계")
+    classes = [row[0] for row in store.classrooms()]
+    if not classes:
+        st.info("아직 기록된 스토리보드가 없어요.")
+        return
+    current = st.session_state.classroom
+    classroom = st.selectbox("학급", classes, index=classes.index(current) if current in classes else 0)
+    days = st.radio("기간", (7, 30, 365), format_func=lambda n: {7: "최근 7일", 30: "최근 30일", 365: "최근 1년"}[n], horizontal=True)
+    start, end = analytics.period(days)
+
+    with metrics.timer("analytics.dashboard"):
+        totals = store.valence_totals(classroom, start, end)
+        by_day = store.valence_by_day(classroom, start, end)
+        emotions = store.top_emotions(classroom, start, end)
+        situations = store.top_situations(classroom, start, end)
+        students = store.student_usage(classroom, start, end)
+
+    columns = st.columns(3)
+    for column, valence in zip(columns, analytics.VALENCES):
+        light = catalog.TRAFFIC_LIGHTS[valence]
+        column.metric(f"{light['color']} {light['status']}", totals[valence])
+    if by_day:
+        st.bar_chart({
+            "날짜": [day for day, _ in by_day],
+            **{catalog.TRAFFIC_LIGHTS[v]["color"]: [counts[v] for _, counts in by_day] for v in analytics.VALENCES},
+        }, x="날짜", color=[catalog.TRAFFIC_LIGHTS[v]["css_color"] for v in analytics.VALENCES])
 
-if st.session_state.current_step == 1:
-    # 안전 사용 안내 (HTML 렌더링이 아닌 Streamlit 네이티브 컴포넌트 사용)
     col1, col2 = st.columns(2)
-    
     with col1:
-        st.markdown("#### 🚫 이런 내용은 차단돼요")
-        st.markdown("""
-        - ⚠️ 욕설, 폭언, 혐오 표현
-        - ⚠️ 폭력적이거나 위험한 내용  
-        - ⚠️ 부적절한 성적 표현
-        - ⚠️ 정치적 인물이나 논란적 내용
-        - ⚠️ 의미 없는 글자 나열
-        """)
-    
-    with col2:
-        st.markdown("#### ✅ 이런 건전한 내용을 사용해주세요")
-        st.markdown("""
-        - ✅ 친구와의 우정 이야기
-        - ✅ 학교에서의 즐거운 경험
-        - ✅ 가족과의 따뜻한 시간
-        - ✅ 새로운 것을 배우는 기쁨
-        - ✅ 도움을 주고받는 경험
-        """)
-    
-    st.info("""
-    🎨 **감정 표현 4컷 만화 만들기**
-    
-    📚 교육 목표: 자신의 감정을 인식하고 표현하는 능력 향상  
-    🎯 결과물: 4컷 만화 스토리보드 + AI 이미지 생성용 프롬프트
-    """)
-    
-    st.subheader("👤 사용자 나이대를 선택하세요")
-    st.markdown("만화 스타일과 내용을 맞춤화하기 위해 나이대를 선택해주세요.")
-    
-    age_options = ["초등학교 1~2학년", "초등학교 3~4학년", "초등학교 5~6학년", "교사"]
-    selected_age = st.radio("나이대 선택", age_options, horizontal=True)
-    
-    age_descriptions = {
-        "초등학교 1~2학년": "🌟 간단하고 귀여운 스타일의 만화를 만들어요!",
-        "초등학교 3~4학년": "🎨 조금 더 자세하고 재미있는 스토리를 만들어요!",
-        "초등학교 5~6학년": "📖 감정 표현이 풍부하고 깊이 있는 만화를 만들어요!",
-        "교사": "🎓 교육용으로 활용할 수 있는 전문적인 스토리보드를 만들어요!"
-    }
-    
-    if selected_age:
-        st.info(f"✨ {age_descriptions[selected_age]}")
-    
-    st.markdown("### 👦👧 주인공 성별을 선택하세요")
-    gender = st.radio("성별 선택", ["남자", "여자"], horizontal=True)
-    
-    if gender:
-        gender_emoji = "👦" if gender == "남자" else "👧"
-        st.info(f"{gender_emoji} {gender} 주인공으로 만화를 만들어요!")
-    
-    st.markdown("### 🎨 만화/사진 스타일을 선택하세요")
-    st.markdown("원하는 스타일을 클릭해보세요! 각각 다른 느낌의 만화가 만들어져요.")
-    
-    art_styles = {
-        "귀여운 애니메이션": {"emoji": "🌟", "desc": "지브리, 디즈니 같은 부드럽고 따뜻한 스타일"},
-        "한국 웹툰": {"emoji": "📱", "desc": "네이버 웹툰 같은 깔끔하고 현대적인 스타일"}, 
-        "3D 캐릭터": {"emoji": "🎭", "desc": "픽사, 토이스토리 같은 입체적이고 생동감 있는 스타일"},
-        "피규어 형태": {"emoji": "🧸", "desc": "레고, 플레이모빌 같은 귀여운 장난감 스타일"},
-        "낙서 형태": {"emoji": "✏️", "desc": "공책에 그린 듯한 자유롭고 친근한 손그림 스타일"},
-        "수채화": {"emoji": "🖼️", "desc": "부드럽고 몽환적인 수채화 일러스트 스타일"},
-        "동화책": {"emoji": "📚", "desc": "따뜻하고 상상력 가득한 동화책 삽화 스타일"},
-        "실제 사진": {"emoji": "📸", "desc": "실제 아이들이 연기하는 사진 스타일"},
-        "인형극": {"emoji": "🎪", "desc": "인형이나 마네킹을 이용한 인형극 사진 스타일"},
-        "클레이 모델": {"emoji": "🏺", "desc": "찰흙이나 클레이로 만든 캐릭터 사진 스타일"}
-    }
-    
-    col1, col2, col3 = st.columns(3)
-    
-    style_names = list(art_styles.keys())
-    selected_style = st.session_state.get('art_style', None)
-    
-    for i, style_name in enumerate(style_names):
-        col_idx = i % 3
-        if col_idx == 0:
-            current_col = col1
-        elif col_idx == 1:
-            current_col = col2
-        else:
-            current_col = col3
-            
-        with current_col:
-            style_info = art_styles[style_name]
-            
-            if st.button(f"{style_info['emoji']} {style_name}", key=f"style_{style_name}", use_container_width=True):
-                st.session_state.art_style = style_name
-                st.success(f"✨ {style_name} 스타일을 선택했어요!")
-                st.rerun()
-    
-    if selected_style:
-        st.markdown("---")
-        style_info = art_styles[selected_style]
-        st.markdown(f"""
-        <div class="success-animation" style="background: #e8f5e8; border: 2px solid #27ae60; padding: 1rem; border-radius: 15px; text-align: center;">
-            <div style="font-size: 3rem; margin-bottom: 0.5rem;">{style_info['emoji']}</div>
-            <div style="font-size: 1.2rem; font-weight: bold; color: #27ae60; margin-bottom: 0.5rem;">선택한 스타일: {selected_style}</div>
-            <div style="color: #2d5016;">{style_info['desc']}</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    st.markdown("""
-    <div class="next-step-container">
-        <div class="next-step-emoji">🚀</div>
-        <div class="next-step-text">모든 정보가 준비되었어요! 다음 단계로 넘어가 볼까요?</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    col1, col2, col3 = st.columns([2, 3, 2])
+        st.markdown("**😊 많이 고른 감정**")
+        st.dataframe([{"감정": emotion, "횟수": count} for emotion, count in emotions], hide_index=True)
     with col2:
-        if st.button("✨ 다음 단계로 GO! ✨", key="step1_next", use_container_width=True):
-            if validate_age_group(selected_age) and gender and st.session_state.get('art_style'):
-                st.session_state.age_group = selected_age
-                st.session_state.gender = gender
-                st.session_state.current_step = 2
-                st.balloons()
-                st.rerun()
-            else:
-                missing = []
-                if not gender:
-                    missing.append("성별")
-                if not st.session_state.get('art_style'):
-                    missing.append("화풍")
-                st.error(f"{'과 '.join(missing)}을 선택해주세요!")
+        st.markdown("**📝 자주 나온 상황**")
+        st.dataframe([{"상황": situation, "횟수": count} for situation, count in situations], hide_index=True)
+    st.markdown("**👦👧 학생별 사용량** (브라우저 단위)")
+    st.dataframe([{"학생": student[:8], "만든 개수": count, "쓴 날": active}
+                  for student, count, active in students], hide_index=True)
 
-elif st.session_state.current_step == 2:
+@st.fragment
+@metrics.timed("fragment.step2")
+def render_step2():
+    board = st.session_state.storyboard
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📝 어떤 상황인가요?")
     
-    age_situations = {
-        "초등학교 1~2학년": [
-            "급식시간에 좋아하는 반찬이 나왔을 때",
-            "친구와 놀이터에서 함께 놀았을 때", 
-            "선생님께 칭찬을 받았을 때",
-            "새로운 친구와 인사를 나눴을 때",
-            "미술 시간에 그림을 그렸을 때"
-        ],
-        "초등학교 3~4학년": [
-            "체육시간에 피구를 하다가 공에 맞았을 때",
-            "숙제를 깜빡하고 학교에 왔을 때",
-            "시험에서 예상보다 좋은 점수를 받았을 때",
-            "친구와 다툰 후 화해했을 때",
-            "발표를 하는데 긴장되었을 때"
-        ],
-        "초등학교 5~6학년": [
-            "학급 임원 선거에서 떨어졌을 때",
-            "친한 친구가 다른 학교로 전학갔을 때",
-            "어려운 수학 문제를 혼자 풀었을 때",
-            "단체 활동에서 의견이 안 맞았을 때",
-            "졸업식을 앞두고 친구들과 시간을 보낼 때"
-        ],
-        "교사": [
-            "학생이 처음으로 어려운 개념을 이해했을 때",
-            "학급에서 갈등이 일어나 중재해야 할 때", 
-            "공개수업을 앞두고 준비하는 상황",
-            "학부모와 상담하는 시간",
-            "동료 교사와 협업하여 프로젝트를 진행할 때"
-        ]
-    }
-    
-    current_age = st.session_state.age_group or "초등학교 1~2학년"
-    situations = age_situations.get(current_age, age_situations["초등학교 1~2학년"])
+    current_age = board.age_group or "초등학교 1~2학년"
+    situations = catalog.situations_for(current_age)
     
-    st.markdown(f"""
-    <div style="background: #f8f9fa; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-        <strong>💡 {current_age} 학교생활 상황 예시:</strong><br>
-        {'<br>'.join([f'• {situation}' for situation in situations])}
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(situation_examples_html(current_age, situations), unsafe_allow_html=True)
     
     st.markdown("위 예시를 참고하거나, 직접 경험한 학교생활 상황을 자세히 적어주세요.")
     
@@ -662,49 +500,26 @@ elif st.session_state.current_step == 2:
     
     situation_valid = len(situation.strip()) >= 10 if situation else False
     
-    if situation and len(situation.strip()) >= 5:
+    # combined 모드에서는 4단계에서 만들기를 누를 때 한꺼번에 검사해요
+    # (아래 기본 키워드 목록은 AI 응답이 애매할 때만 쓰는 것이라 한 글자 단어도 들어 있어 따로 쓰면 평범한 문장도 막혀요)
+    if situation and len(situation.strip()) >= 5 and not combined_pipeline():
         # AI 기반 실시간 문맥 검증 (키워드 체크 먼저 하지 않고 문맥으로 판단)
         try:
-            context_check_prompt = f"""
-다음 텍스트가 초등학생에게 적합한지 문맥을 고려하여 판단해주세요:
-
-텍스트: "{situation}"
-
-판단 기준:
-- 문맥상 폭력적이거나 위험한 의도가 있는가?
-- 문맥상 욕설이나 혐오 표현의 의도가 있는가?
-- 문맥상 성적이거나 부적절한 내용인가?
-- 정치적 인물이나 논란적 내용인가?
-- 의미있는 교육적 상황인가?
-- 초등학생 교육환경에 적합한가?
-
-문맥 예시:
-- "친구와 죽 먹기" → 적합 (음식을 먹는 이야기)
-- "괴물을 죽이기" → 부적절 (폭력적 내용)
-- "김정은 만나기" → 부적절 (정치적 인물)
-- "시험을 망쳤어" → 적합 (학교 상황 표현)
-- "선생님이 미쳤다고 했어" → 부적절 (부적절한 표현)
-
-문맥상 의미를 종합적으로 고려하여 "적합" 또는 "부적절" 중 하나로만 답변하세요.
-특히 욕설의 변형이나 은어, 부적절한 표현이 숨어있는지 주의깊게 살펴보세요:
-"""
-            
-            ai_response = ask_gemini(context_check_prompt)
+            ai_response = ask_ai(prompts.SITUATION_CHECK, text=situation)
             
             if ai_response and "부적절" in ai_response:
-                if has_inappropriate:
-                    st.error("🚨 부적절한 내용이 감지되었습니다!")
-                    st.warning("""
-                    **디지털 시민 교육**: 학교에서는 모든 친구들이 안전하고 편안하게 느낄 수 있는 내용만 사용해야 해요.
-                    
-                    **건전한 내용으로 바꿔주세요**:
-                    - 친구와 사이좋게 놀이터에서 놀았을 때
-                    - 선생님께 칭찬을 받아서 기뻤을 때  
-                    - 새로운 것을 배워서 뿌듯했을 때
-                    - 친구에게 도움을 주거나 받았을 때
-                    - 가족과 함께 즐거운 시간을 보냈을 때
-                    """)
-                    situation_valid = False
+                st.error("🚨 부적절한 내용이 감지되었습니다!")
+                st.warning("""
+                **디지털 시민 교육**: 학교에서는 모든 친구들이 안전하고 편안하게 느낄 수 있는 내용만 사용해야 해요.
+                
+                **건전한 내용으로 바꿔주세요**:
+                - 친구와 사이좋게 놀이터에서 놀았을 때
+                - 선생님께 칭찬을 받아서 기뻤을 때  
+                - 새로운 것을 배워서 뿌듯했을 때
+                - 친구에게 도움을 주거나 받았을 때
+                - 가족과 함께 즐거운 시간을 보냈을 때
+                """)
+                situation_valid = False
             elif ai_response and "적합" in ai_response:
                 if len(situation.strip()) >= 10:
                     st.success("✅ 훌륭한 상황 설명이에요! 건전하고 교육적인 내용으로 멋진 만화를 만들 수 있을 거예요! 👍")
@@ -713,12 +528,7 @@ elif st.session_state.current_step == 2:
                     situation_valid = False
             else:
                 # AI 응답이 애매하면 기본 키워드로 한번 더 체크 (더 강화된 키워드 리스트)
-                inappropriate_words = [
-                    "시발", "병신", "김정은", "트럼프", "윤석열", "죽어", "꺼져", "좆", "씨발", "개새끼",
-                    "바보", "멍청", "미친", "년", "새끼", "개새", "처먹", "좋이나", "쳐먹", "개소리",
-                    "좋아", "좋이", "처", "먹", "쳐", "개", "병", "신", "미", "친"
-                ]
-                has_inappropriate = any(word in situation.lower().replace(" ", "") for word in inappropriate_words)
+                has_inappropriate = moderation.keyword_hit(situation, "situation")
                 
                 if has_inappropriate:
                     st.error("🚨 부적절한 표현이 포함되어 있어요!")
@@ -727,12 +537,7 @@ elif st.session_state.current_step == 2:
                     situation_valid = len(situation.strip()) >= 10
         except:
             # AI 검증 실패 시 기본 키워드 체크 (더 강화된 키워드 리스트)
-            inappropriate_words = [
-                "시발", "병신", "김정은", "트럼프", "윤석열", "죽어", "꺼져", "좆", "씨발", "개새끼",
-                "바보", "멍청", "미친", "년", "새끼", "개새", "처먹", "좋이나", "쳐먹", "개소리",
-                "좋아", "좋이", "처", "먹", "쳐", "개", "병", "신", "미", "친"
-            ]
-            has_inappropriate = any(word in situation.lower().replace(" ", "") for word in inappropriate_words)
+            has_inappropriate = moderation.keyword_hit(situation, "situation")
             
             if has_inappropriate:
                 st.error("🚨 부적절한 표현이 포함되어 있어요!")
@@ -751,11 +556,8 @@ elif st.session_state.current_step == 2:
             if situation_valid:
                 is_valid, message = validate_text_input(situation, min_length=10, max_length=200, field_name="상황 설명")
                 if is_valid:
-                    st.session_state.situation = situation.strip()
-                    st.session_state.emotion_options = fetch_emotions(st.session_state.situation)
-                    st.session_state.current_step = 3
-                    st.balloons()
-                    st.rerun()
+                    board.situation = situation.strip()
+                    go_to_step(3, balloons=True)
                 else:
                     st.error(message)
             else:
@@ -768,32 +570,33 @@ elif st.session_state.current_step == 2:
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-elif st.session_state.current_step == 3:
+@st.fragment
+@metrics.timed("fragment.step3")
+def render_step3():
+    board = st.session_state.storyboard
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("😊 이 상황에서 느낀 감정을 선택하세요")
     st.markdown("가장 강하게 느꼈던 감정 하나를 골라주세요.")
     
+    positive_emotions, negative_emotions = fetch_emotions(board.situation)
+    
     st.markdown("### 🌟 긍정적인 감정")
     pos_cols = st.columns(5)
-    for i, emotion in enumerate(st.session_state.emotion_options[0]):
+    for i, emotion in enumerate(positive_emotions):
         with pos_cols[i % 5]:
             if st.button(f"😊 {emotion}", key=f"pos_{emotion}", use_container_width=True):
-                st.session_state.emotion = emotion
-                st.session_state.current_step = 4
-                st.success(f"✨ '{emotion}' 감정을 선택했어요!")
-                time.sleep(0.5)
-                st.rerun()
+                board.emotion = emotion
+                prefetch_draft(board)
+                go_to_step(4, message=f"✨ '{emotion}' 감정을 선택했어요!")
     
     st.markdown("### 😔 부정적인 감정")
     neg_cols = st.columns(5)
-    for i, emotion in enumerate(st.session_state.emotion_options[1]):
+    for i, emotion in enumerate(negative_emotions):
         with neg_cols[i % 5]:
             if st.button(f"😔 {emotion}", key=f"neg_{emotion}", use_container_width=True):
-                st.session_state.emotion = emotion
-                st.session_state.current_step = 4
-                st.success(f"✨ '{emotion}' 감정을 선택했어요!")
-                time.sleep(0.5)
-                st.rerun()
+                board.emotion = emotion
+                prefetch_draft(board)
+                go_to_step(4, message=f"✨ '{emotion}' 감정을 선택했어요!")
     
     st.markdown("---")
     st.markdown("### 🚥 감정 신호등이란?")
@@ -811,14 +614,17 @@ elif st.session_state.current_step == 3:
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-elif st.session_state.current_step == 4:
+@st.fragment
+@metrics.timed("fragment.step4")
+def render_step4():
+    board = st.session_state.storyboard
     st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.subheader(f"💭 '{st.session_state.emotion}' 감정을 느낀 이유는 무엇인가요?")
+    st.subheader(f"💭 '{board.emotion}' 감정을 느낀 이유는 무엇인가요?")
     st.markdown("그 감정을 느끼게 된 구체적인 이유나 생각을 적어주세요.")
     
     reason = st.text_area(
         "감정의 이유",
-        placeholder=f"예: {st.session_state.emotion}을 느낀 이유는...",
+        placeholder=f"예: {board.emotion}을 느낀 이유는...",
         height=100,
         key="reason_input"
     )
@@ -828,32 +634,10 @@ elif st.session_state.current_step == 4:
     
     reason_valid = len(reason.strip()) >= 5 if reason else False
     
-    if reason and len(reason.strip()) >= 3:
+    if reason and len(reason.strip()) >= 3 and not combined_pipeline():
         # AI 기반 실시간 문맥 검증 (감정 이유도 문맥으로 판단)
         try:
-            reason_check_prompt = f"""
-다음 감정의 이유가 초등학생에게 적합한지 문맥을 고려하여 판단해주세요:
-
-텍스트: "{reason}"
-
-판단 기준:
-- 문맥상 폭력적이거나 위험한 의도가 있는가?
-- 문맥상 욕설이나 혐오 표현의 의도가 있는가?
-- 문맥상 성적이거나 부적절한 내용인가?
-- 정치적 인물이나 논란적 내용인가?
-- 의미있는 감정 표현인가?
-- 초등학생 교육환경에 적합한가?
-
-문맥 예시:
-- "죽도록 열심히 했는데" → 적합 (열심히 노력했다는 의미)
-- "친구를 죽이고 싶었어" → 부적절 (폭력적 표현)
-- "미친듯이 기뻤어" → 적합 (매우 기뻤다는 의미)
-- "선생님이 미쳤다고 생각해" → 부적절 (비하 표현)
-
-문맥상 의미를 종합적으로 고려하여 "적합" 또는 "부적절" 중 하나로만 답변하세요:
-"""
-            
-            ai_response = ask_gemini(reason_check_prompt)
+            ai_response = ask_ai(prompts.REASON_CHECK, text=reason)
             
             if ai_response and "부적절" in ai_response:
                 st.error("🚨 부적절한 감정 표현이 감지되었습니다!")
@@ -876,8 +660,7 @@ elif st.session_state.current_step == 4:
                     reason_valid = False
             else:
                 # AI 응답이 애매하면 기본 키워드로 한번 더 체크
-                inappropriate_words = ["시발", "병신", "김정은", "트럼프", "앙착의와잡괴", "좆", "씨발", "개새끼"]
-                has_inappropriate = any(word in reason.lower() for word in inappropriate_words)
+                has_inappropriate = moderation.keyword_hit(reason, "reason")
                 
                 if has_inappropriate:
                     st.error("🚨 부적절한 표현이 포함되어 있어요!")
@@ -886,8 +669,7 @@ elif st.session_state.current_step == 4:
                     reason_valid = len(reason.strip()) >= 5
         except:
             # AI 검증 실패 시 기본 키워드 체크
-            inappropriate_words = ["시발", "병신", "김정은", "트럼프", "앙착의와잡괴", "좆", "씨발", "개새끼"]
-            has_inappropriate = any(word in reason.lower() for word in inappropriate_words)
+            has_inappropriate = moderation.keyword_hit(reason, "reason")
             
             if has_inappropriate:
                 st.error("🚨 부적절한 표현이 포함되어 있어요!")
@@ -895,6 +677,9 @@ elif st.session_state.current_step == 4:
             else:
                 reason_valid = len(reason.strip()) >= 5
     
+    if reason_valid:
+        prefetch_scenes(board, reason.strip())
+    
     col1, col2, col3 = st.columns([1, 2, 1])
     with col1:
         if st.button("⬅️ 이전"):
@@ -906,10 +691,20 @@ elif st.session_state.current_step == 4:
             if reason_valid:
                 is_valid, message = validate_text_input(reason, min_length=5, max_length=150, field_name="감정의 이유")
                 if is_valid:
-                    st.session_state.reason = reason.strip()
-                    st.session_state.current_step = 5
-                    st.balloons()
-                    st.rerun()
+                    board.reason = reason.strip()
+                    if combined_pipeline():
+                        board.scenes = ()
+                        board.scene_prompts = ()
+                        with st.spinner("🔍 내용을 확인하고 스토리보드를 만들고 있어요..."):
+                            rejected = check_and_make_scenes(board)
+                        if "situation" in rejected:
+                            go_to_step(2, message="🚨 상황 설명에 부적절한 내용이 있어요. 건전한 내용으로 바꿔주세요!")
+                        elif rejected:
+                            st.error("🚨 부적절한 감정 표현이 감지되었습니다! 건전한 표현으로 바꿔주세요.")
+                        else:
+                            go_to_step(5, balloons=True)
+                    else:
+                        go_to_step(5, balloons=True)
                 else:
                     st.error(message)
             else:
@@ -922,23 +717,129 @@ elif st.session_state.current_step == 4:
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-elif st.session_state.current_step == 5:
+def default_scenes(board):
+    return [
+        f"{board.age_group} 학생이 {board.situation}를 경험합니다",
+        f"상황이 진행되면서 {board.emotion} 감정이 생겨납니다",
+        f"{board.reason} 때문에 감정이 더욱 강해집니다",
+        f"상황이 마무리되며 감정을 정리합니다"
+    ]
+
+def make_scenes(board):
+    # 장면 요약을 스트리밍으로 받으며 장면이 하나씩 완성될 때마다 진행 상황을 보여줘요
+    # 번호 모양이 달라도 scene_parser가 찾아내고, 빠진 장면만 한 번 더 요청해요
+    values = scene_values(board)
+    prefetched = prefetcher().claim(prefetch.job_key("scenes", values), PREFETCH_WAIT)
+    if prefetched:
+        return fill_missing_scenes(board, scene_parser.parse_scenes(prefetched), values)
+
+    progress = st.empty()
+    parser = scene_parser.SceneParser()
+
+    def on_chunk(text):
+        if parser.feed(text):
+            progress.caption(f"📝 장면 {len(parser.scenes)}/{parser.count}개 완성")
+
+    result = ask_ai(prompts.SCENE_SUMMARY, on_chunk=on_chunk, **values)
+    if not result or result.startswith(("[오류]", "[안전 필터]")):
+        progress.empty()
+        return [
+            f"{board.age_group} 학생이 상황을 경험합니다",
+            f"상황에서 {board.emotion} 감정을 느낍니다",
+            f"{board.reason} 때문입니다",
+            f"감정을 정리하고 마무리합니다"
+        ]
+
+    # 스트리밍 조각은 진행 표시에만 쓰고, 장면은 안전 필터를 거친 최종 글에서 읽어요
+    # (필터가 지운 컷은 빠진 컷이 되어 그 컷만 다시 요청해요)
+    scenes = scene_parser.parse_scenes(result)
+    if not scenes:
+        metrics.increment("scenes.wasted_calls")
+    progress.empty()
+    return fill_missing_scenes(board, scenes, values)
+
+def fill_missing_scenes(board, scenes, values):
+    # 빠진 장면만 한 번 더 요청하고, 그래도 빠진 장면은 기본 문장으로 채워요
+    missing = [number for number in range(1, scene_parser.PANEL_COUNT + 1) if number not in scenes]
+    if missing:
+        metrics.increment("scenes.parse.partial")
+        metrics.increment("scenes.parse.missing_panels", len(missing))
+        known = "\n".join(f"{number}. {scene}" for number, scene in sorted(scenes.items())) or "(없음)"
+        filled = ask_ai(prompts.SCENE_FILL, scenes=known, missing=", ".join(map(str, missing)), **values)
+        metrics.increment("scenes.refill.calls")
+        if filled and not filled.startswith(("[오류]", "[안전 필터]")):
+            refill = scene_parser.parse_scenes(filled)
+            added = {number: refill[number] for number in missing if number in refill}
+            if not added:
+                metrics.increment("scenes.wasted_calls")
+            scenes.update(added)
+    else:
+        metrics.increment("scenes.parse.complete")
+    fallback = default_scenes(board)
+    return [scenes.get(i + 1, fallback[i]) for i in range(scene_parser.PANEL_COUNT)]
+
+def parse_verdicts(text):
+    # 한 번에 검사하고 만들기 응답(JSON) → ({"situation": bool, "reason": bool}, {번호: 장면}) ; 형식이 틀리면 None
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+        verdicts = {field: data[field] for field in ("situation", "reason")}
+        scenes = [str(scene) for scene in data.get("scenes") or []]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if not all(verdict in ("적합", "부적절") for verdict in verdicts.values()):
+        return None
+    passed = {field: verdict == "적합" for field, verdict in verdicts.items()}
+    return passed, {i + 1: scene.strip() for i, scene in enumerate(scenes[:scene_parser.PANEL_COUNT]) if scene.strip()}
+
+def check_and_make_scenes(board):
+    # PIPELINE_MODE=combined: 4단계에서 만들기를 누를 때 상황·이유 검사와 장면 만들기를 한 번의 호출로 해요
+    # 부적절한 입력 이름 목록을 돌려줘요 (비어 있으면 통과, 장면은 board.scenes에 넣어요)
+    values = scene_values(board)
+    result = prefetcher().claim(prefetch.job_key("combined", values), PREFETCH_WAIT)
+    if result is None:
+        result = ask_ai(prompts.STORYBOARD_CHECKED, **values)
+    metrics.increment("pipeline.combined.calls")
+    parsed = None
+    if result and not result.startswith(("[오류]", "[안전 필터]")):
+        parsed = parse_verdicts(result)
+    if parsed is None:
+        # 응답을 믿을 수 없으면 예전처럼 따로 검사하고, 장면은 5단계에서 만들어요
+        # (검사 응답도 없거나 애매하면 2·4단계처럼 기본 키워드로 정해요 ; 하루 예산이 빠듯할 때도 이 길로 와요)
+        metrics.increment("pipeline.combined.fallback")
+        checks = {"situation": prompts.SITUATION_CHECK, "reason": prompts.REASON_CHECK}
+        return [field for field, template in checks.items()
+                if moderation.input_blocked(values[field], field, moderation.ai_verdict(ask_ai(template, text=values[field])))]
+    passed, scenes = parsed
+    rejected = [field for field, ok in passed.items() if not ok]
+    if rejected:
+        metrics.increment("pipeline.combined.rejected")
+        return rejected
+    board.scenes = fill_missing_scenes(board, scenes, values)
+    return []
+
+@st.fragment
+@metrics.timed("fragment.step5")
+def render_step5():
+    board = st.session_state.storyboard
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📋 당신만의 4컷 만화 스토리보드가 완성되었어요!")
     
     with st.expander("📋 입력 정보 확인", expanded=False):
-        st.write(f"**👤 나이대:** {st.session_state.age_group}")
-        st.write(f"**👦👧 성별:** {st.session_state.gender}")
-        st.write(f"**🎨 화풍:** {st.session_state.art_style}")
-        st.write(f"**📝 상황:** {st.session_state.situation}")
-        st.write(f"**😊 감정:** {st.session_state.emotion}")
-        st.write(f"**💭 이유:** {st.session_state.reason}")
+        st.write(f"**👤 나이대:** {board.age_group}")
+        st.write(f"**👦👧 성별:** {board.gender}")
+        st.write(f"**🎨 화풍:** {board.art_style}")
+        st.write(f"**📝 상황:** {board.situation}")
+        st.write(f"**😊 감정:** {board.emotion}")
+        st.write(f"**💭 이유:** {board.reason}")
         
-        if st.session_state.emotion:
-            traffic_light = get_emotion_traffic_light(st.session_state.emotion)
+        if board.emotion:
+            traffic_light = get_emotion_traffic_light(board.emotion)
             st.write(f"**🚥 감정 신호등:** {traffic_light['color']} {traffic_light['status']}")
     
-    traffic_light = get_emotion_traffic_light(st.session_state.emotion)
+    traffic_light = get_emotion_traffic_light(board.emotion)
     st.markdown(f"""
     <div style="background: {traffic_light['css_color']}15; border: 2px solid {traffic_light['css_color']}; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
         <h4 style="color: {traffic_light['css_color']}; margin-bottom: 0.5rem;">🚥 감정 신호등 결과: {traffic_light['color']} {traffic_light['status']}</h4>
@@ -946,109 +847,47 @@ elif st.session_state.current_step == 5:
     </div>
     """, unsafe_allow_html=True)
     
-    if not st.session_state.scenes:
+    if not board.scenes:
         with st.spinner("📋 AI가 당신의 이야기를 4컷 만화 스토리보드로 만들고 있어요..."):
-            summary_prompt = f"""
-나이대: {st.session_state.age_group}
-상황: {st.session_state.situation}
-감정: {st.session_state.emotion}
-이유: {st.session_state.reason}
-
-위 정보를 바탕으로 4컷 만화의 각 장면을 간단명료하게 설명해주세요.
-각 장면은 한 문장으로, 번호와 함께 작성해주세요.
-
-다음 형식으로 작성해주세요:
-1. [첫 번째 장면 설명]
-2. [두 번째 장면 설명]
-3. [세 번째 장면 설명]
-4. [네 번째 장면 설명]
-"""
-            
-            result = ask_gemini(summary_prompt)
-            
-            if result and "[오류]" not in result:
-                scenes = []
-                lines = result.strip().split("\n")
-                
-                for line in lines:
-                    line = line.strip()
-                    if re.match(r'^\d+\.', line):
-                        scene_text = re.sub(r'^\d+\.\s*', '', line).strip()
-                        if scene_text:
-                            scenes.append(scene_text)
-                
-                if len(scenes) < 4:
-                    default_scenes = [
-                        f"{st.session_state.age_group} 학생이 {st.session_state.situation}를 경험합니다",
-                        f"상황이 진행되면서 {st.session_state.emotion} 감정이 생겨납니다",
-                        f"{st.session_state.reason} 때문에 감정이 더욱 강해집니다",
-                        f"상황이 마무리되며 감정을 정리합니다"
-                    ]
-                    scenes = default_scenes
-                
-                st.session_state.scenes = scenes[:4]
-            else:
-                st.session_state.scenes = [
-                    f"{st.session_state.age_group} 학생이 상황을 경험합니다",
-                    f"상황에서 {st.session_state.emotion} 감정을 느낍니다",
-                    f"{st.session_state.reason} 때문입니다",
-                    f"감정을 정리하고 마무리합니다"
-                ]
+            board.scenes = make_scenes(board)
     
-    if st.session_state.scenes:
-        st.success(f"✅ {len(st.session_state.scenes)}개의 장면이 생성되었습니다!")
+    if board.scenes:
+        st.success(f"✅ {len(board.scenes)}개의 장면이 생성되었습니다!")
         
-        if not st.session_state.scene_prompts:
+        if not board.scene_prompts:
             with st.spinner("🎨 각 장면별 최적화된 이미지 프롬프트를 생성하고 있어요..."):
-                character_desc = f"{'Korean elementary school boy' if st.session_state.gender == '남자' else 'Korean elementary school girl'}"
-                age_desc = st.session_state.age_group
+                character_desc = f"{'Korean elementary school boy' if board.gender == '남자' else 'Korean elementary school girl'}"
+                age_desc = board.age_group
+                scene_prompts = []
                 
-                for i, scene in enumerate(st.session_state.scenes):
-                    prompt_generation_request = f"""
-다음 정보로 K-6 학생용 안전한 단일 장면 이미지 생성용 영어 프롬프트를 만들어주세요:
-
-캐릭터 정보:
-- 나이대: {st.session_state.age_group}
-- 성별: {st.session_state.gender}
-- 상황: {st.session_state.situation}
-- 감정: {st.session_state.emotion}
-- 이 장면: {scene}
-
-안전 요구사항 (반드시 준수):
-1. K-6 학생에게 적합한 건전한 내용만
-2. 폭력, 성적 내용, 위험한 행동 절대 금지
-3. 교육적이고 긍정적인 내용
-4. 학교 환경에 적합한 상황
-
-기술 요구사항:
-1. 단일 장면만 묘사 (4컷 중 {i+1}번째 컷)
-2. 동일한 캐릭터가 4개 프롬프트 모두에 등장
-3. 일관된 화풍 유지 (cute anime/manga style)
-4. 영어로 작성
-5. 한국 초등학생 캐릭터
-
-안전하고 교육적인 프롬프트만 간결하게 출력해주세요:
-"""
-                    
-                    ai_prompt = ask_gemini(prompt_generation_request)
+                for i, scene in enumerate(board.scenes):
+                    values = panel_values(board.age_group, board.gender, board.situation, board.emotion, i + 1, scene)
+                    ai_prompt = prefetcher().claim(prefetch.job_key("panel", values), PREFETCH_WAIT)
+                    if ai_prompt is None:
+                        ai_prompt = ask_ai(prompts.PANEL_PROMPT, **values)
                     if ai_prompt and "[오류]" not in ai_prompt:
                         clean_prompt = ai_prompt.strip()
                         if ":" in clean_prompt:
                             clean_prompt = clean_prompt.split(":")[-1].strip()
                         
-                        safe_prompt = f"Safe for children, educational content. Cute anime/manga style illustration of a {character_desc} ({age_desc}) showing {st.session_state.emotion} emotion. {clean_prompt}. Wholesome, school-appropriate, consistent character design, colorful, child-friendly art style."
-                        st.session_state.scene_prompts.append(clean_prompt)
+                        safe_prompt = f"Safe for children, educational content. Cute anime/manga style illustration of a {character_desc} ({age_desc}) showing {board.emotion} emotion. {clean_prompt}. Wholesome, school-appropriate, consistent character design, colorful, child-friendly art style."
+                        scene_prompts.append(clean_prompt)
                     else:
-                        default_prompt = f"Safe for children, educational content. Cute anime/manga style illustration of a {character_desc} ({age_desc}) showing {st.session_state.emotion} emotion in this scene: {scene}. Wholesome, school-appropriate, consistent character design, colorful, child-friendly art style."
-                        st.session_state.scene_prompts.append(default_prompt)
+                        default_prompt = f"Safe for children, educational content. Cute anime/manga style illustration of a {character_desc} ({age_desc}) showing {board.emotion} emotion in this scene: {scene}. Wholesome, school-appropriate, consistent character design, colorful, child-friendly art style."
+                        scene_prompts.append(default_prompt)
+                
+                board.scene_prompts = scene_prompts
         
-        for i, scene in enumerate(st.session_state.scenes):
+        for i, scene in enumerate(board.scenes):
             st.markdown(f"### 🎬 컷 {i+1}")
             st.write(f"**장면 설명:** {scene}")
             
-            if len(st.session_state.scene_prompts) > i:
+            if len(board.scene_prompts) > i:
                 st.markdown("**🤖 이 컷의 개별 프롬프트:**")
-                st.code(st.session_state.scene_prompts[i], language="text")
+                st.code(board.scene_prompts[i], language="text")
+            
+            if len(board.thumbnails) > i and asset_store().has(board.thumbnails[i]):
+                st.markdown(asset_image_html(board.thumbnails[i], f"컷 {i+1} 미리보기", width=200), unsafe_allow_html=True)
             
             st.divider()
     else:
@@ -1058,10 +897,7 @@ elif st.session_state.current_step == 5:
     
     with col1:
         if st.button("🔄 다시 만들기"):
-            keys_to_reset = ["age_group", "gender", "art_style", "situation", "emotion", "reason", "scenes", "scene_prompts", "emotion_options", "counted"]
-            for key in keys_to_reset:
-                if key in st.session_state:
-                    del st.session_state[key]
+            reset_storyboard()
             st.session_state.current_step = 1
             st.rerun()
     
@@ -1075,45 +911,16 @@ elif st.session_state.current_step == 5:
             st.balloons()
             st.success("🎉 멋진 4컷 만화 스토리보드가 완성되었어요! 프롬프트를 복사해서 AI 이미지 생성 사이트에서 만들어보세요!")
     
-    if st.session_state.scenes and not hasattr(st.session_state, 'counted'):
+    if board.scenes and not board.counted:
         st.session_state.call_count += 1
-        st.session_state.counted = True
+        board.counted = True
+        record_storyboard(board)
         
-    if st.session_state.scenes and st.session_state.scene_prompts:
+    if board.scenes and board.scene_prompts:
         st.markdown("---")
         st.markdown("### 🎬 4컷 만화 생성 프롬프트")
         
-        character_desc = f"{'Korean elementary school boy' if st.session_state.gender == '남자' else 'Korean elementary school girl'}"
-        
-        style_prompts = {
-            "귀여운 애니메이션": "Studio Ghibli style, Disney animation style, soft colors, magical atmosphere",
-            "한국 웹툰": "Korean webtoon style, clean lines, vibrant colors, modern digital art",
-            "3D 캐릭터": "Pixar 3D animation style, volumetric lighting, detailed textures, playful 3D characters",
-            "피규어 형태": "LEGO minifigure style, Playmobil toy style, cute figurine aesthetic", 
-            "낙서 형태": "Hand-drawn doodle style, sketch-like, casual drawing, notebook doodle aesthetic",
-            "수채화": "Watercolor illustration, soft brushstrokes, gentle colors, dreamy atmosphere",
-            "동화책": "Children's book illustration, storybook art style, warm and cozy",
-            "실제 사진": "Real photography, candid photo of children, natural lighting, documentary style",
-            "인형극": "Puppet show photography, marionette style, theatrical lighting, stage setting",
-            "클레이 모델": "Clay animation style, stop-motion photography, plasticine characters"
-        }
-        
-        art_style_prompt = style_prompts.get(st.session_state.art_style, "cute anime/manga style")
-        
-        four_panel_prompt = f"""Create a 4-panel comic strip (네컷 만화) with consistent character design throughout all panels:
-
-Character: {character_desc} ({st.session_state.age_group})
-Art Style: {art_style_prompt}
-Story theme: {st.session_state.situation}
-Main emotion: {st.session_state.emotion}
-Reason for emotion: {st.session_state.reason}
-
-Panel 1: {st.session_state.scenes[0] if len(st.session_state.scenes) > 0 else ""}
-Panel 2: {st.session_state.scenes[1] if len(st.session_state.scenes) > 1 else ""}
-Panel 3: {st.session_state.scenes[2] if len(st.session_state.scenes) > 2 else ""}
-Panel 4: {st.session_state.scenes[3] if len(st.session_state.scenes) > 3 else ""}
-
-Safety requirements: Safe for children, educational content, wholesome, school-appropriate, consistent character design across all panels, colorful, child-friendly."""
+        four_panel_prompt = prompts.four_panel_prompt(board)
         
         st.markdown("**🎨 아래 프롬프트를 복사해서 AI 이미지 생성 사이트에 붙여넣으세요:**")
         
@@ -1127,6 +934,16 @@ Safety requirements: Safe for children, educational content, wholesome, school-a
         )
         
         # 복사 안내 메시지
+        if load_settings()["image_backend"]:
+            if st.button("🖼️ 4컷 이미지 만들기", key="make_images"):
+                make_comic_images(board)
+                if board.strip:
+                    # 위쪽 컷마다 미리보기도 보이도록 다시 그려요
+                    st.rerun()
+            if board.strip and asset_store().has(board.strip):
+                st.markdown(asset_image_html(board.strip, "완성된 4컷 만화"), unsafe_allow_html=True)
+                st.markdown(f'<a href="{asset_store().url(board.strip)}" download="4컷만화.png">⬇️ 4컷 만화 내려받기</a>', unsafe_allow_html=True)
+        
         st.info("💡 **복사 방법**: 위 텍스트 박스를 클릭 → 전체 선택(Ctrl+A) → 복사(Ctrl+C) → AI 사이트에 붙여넣기(Ctrl+V)")
         
         # 추가 복사 옵션
@@ -1138,7 +955,9 @@ Safety requirements: Safe for children, educational content, wholesome, school-a
             lines = four_panel_prompt.split('\n')
             for i, line in enumerate(lines[:10]):  # 처음 10줄만 표시
                 if line.strip():
-                    st.text_input(f"라인 {i+1}", line, key=f"line_{i}")
+                    # 위젯 대신 코드 블록으로 보여줘서 줄마다 세션에 위젯 값이 쌓이지 않아요
+                    st.caption(f"라인 {i+1}")
+                    st.code(line, language="text")
             
             if len(lines) > 10:
                 st.write(f"... (총 {len(lines)}줄)")
@@ -1173,6 +992,145 @@ Safety requirements: Safe for children, educational content, wholesome, school-a
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+# 메인 실행
+run_started = metrics.start()
+init_session_state()
+show_pending_feedback()
+
+if st.query_params.get("teacher"):
+    render_teacher_dashboard()
+    st.stop()
+
+# 현재 call_count와 남은 횟수를 표시하고 싶다면
+remaining_calls = 50 - st.session_state.call_count
+st.info(f"오늘은 스토리보드를 {st.session_state.call_count}회 생성했어요. {remaining_calls}회 더 생성할 수 있어요!")
+
+if st.session_state.call_count >= 50:
+    st.error("🚫 오늘은 50회까지만 생성할 수 있습니다. 내일 다시 이용해 주세요.")
+    st.stop()
+
+st.markdown('<div class="main-container">', unsafe_allow_html=True)
+
+st.markdown('<h1 class="main-title">📋 4컷 만화 스토리보드 생성기</h1>', unsafe_allow_html=True)
+st.markdown('<p class="subtitle">감정과 상황을 바탕으로 4컷 만화 스토리보드와 최적화된 이미지 프롬프트를 만들어보세요!</p>', unsafe_allow_html=True)
+
+render_step_indicator(st.session_state.current_step)
+
+progress = (st.session_state.current_step - 1) * 25
+render_progress_bar(progress)
+
+board = st.session_state.storyboard
+
+if st.session_state.current_step == 1:
+    # 안전 사용 안내 (HTML 렌더링이 아닌 Streamlit 네이티브 컴포넌트 사용)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 🚫 이런 내용은 차단돼요")
+        st.markdown("""
+        - ⚠️ 욕설, 폭언, 혐오 표현
+        - ⚠️ 폭력적이거나 위험한 내용  
+        - ⚠️ 부적절한 성적 표현
+        - ⚠️ 정치적 인물이나 논란적 내용
+        - ⚠️ 의미 없는 글자 나열
+        """)
+    
+    with col2:
+        st.markdown("#### ✅ 이런 건전한 내용을 사용해주세요")
+        st.markdown("""
+        - ✅ 친구와의 우정 이야기
+        - ✅ 학교에서의 즐거운 경험
+        - ✅ 가족과의 따뜻한 시간
+        - ✅ 새로운 것을 배우는 기쁨
+        - ✅ 도움을 주고받는 경험
+        """)
+    
+    st.info("""
+    🎨 **감정 표현 4컷 만화 만들기**
+    
+    📚 교육 목표: 자신의 감정을 인식하고 표현하는 능력 향상  
+    🎯 결과물: 4컷 만화 스토리보드 + AI 이미지 생성용 프롬프트
+    """)
+    
+    st.subheader("👤 사용자 나이대를 선택하세요")
+    st.markdown("만화 스타일과 내용을 맞춤화하기 위해 나이대를 선택해주세요.")
+    
+    selected_age = st.radio("나이대 선택", catalog.AGE_GROUPS, horizontal=True)
+    
+    if selected_age:
+        st.info(f"✨ {catalog.AGE_DESCRIPTIONS[selected_age]}")
+    
+    st.markdown("### 👦👧 주인공 성별을 선택하세요")
+    gender = st.radio("성별 선택", ["남자", "여자"], horizontal=True)
+    
+    if gender:
+        gender_emoji = "👦" if gender == "남자" else "👧"
+        st.info(f"{gender_emoji} {gender} 주인공으로 만화를 만들어요!")
+    
+    st.markdown("### 🎨 만화/사진 스타일을 선택하세요")
+    st.markdown("원하는 스타일을 클릭해보세요! 각각 다른 느낌의 만화가 만들어져요.")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    style_names = list(catalog.ART_STYLES.keys())
+    selected_style = board.art_style
+    
+    for i, style_name in enumerate(style_names):
+        col_idx = i % 3
+        if col_idx == 0:
+            current_col = col1
+        elif col_idx == 1:
+            current_col = col2
+        else:
+            current_col = col3
+            
+        with current_col:
+            style_info = catalog.ART_STYLES[style_name]
+            
+            st.button(f"{style_info['emoji']} {style_name}", key=f"style_{style_name}", use_container_width=True,
+                      on_click=select_style, args=(style_name,))
+    
+    if selected_style:
+        st.markdown("---")
+        style_info = catalog.ART_STYLES[selected_style]
+        st.markdown(selected_style_html(selected_style, style_info['emoji'], style_info['desc']), unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    st.markdown("""
+    <div class="next-step-container">
+        <div class="next-step-emoji">🚀</div>
+        <div class="next-step-text">모든 정보가 준비되었어요! 다음 단계로 넘어가 볼까요?</div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([2, 3, 2])
+    with col2:
+        if st.button("✨ 다음 단계로 GO! ✨", key="step1_next", use_container_width=True):
+            if validate_age_group(selected_age) and gender and board.art_style:
+                board.age_group = selected_age
+                board.gender = gender
+                go_to_step(2, balloons=True)
+            else:
+                missing = []
+                if not gender:
+                    missing.append("성별")
+                if not board.art_style:
+                    missing.append("화풍")
+                st.error(f"{'과 '.join(missing)}을 선택해주세요!")
+
+elif st.session_state.current_step == 2:
+    render_step2()
+
+elif st.session_state.current_step == 3:
+    render_step3()
+
+elif st.session_state.current_step == 4:
+    render_step4()
+
+elif st.session_state.current_step == 5:
+    render_step5()
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # 워터마크와 푸터도 Streamlit 네이티브로 변경
@@ -1181,3 +1139,13 @@ st.markdown('<div class="watermark">🎨 서울가동초 백인규</div>', unsaf
 
 st.markdown("---")
 st.markdown("📋 4컷 만화 스토리보드 생성기 | 감정을 표현하고 창의성을 키워보세요!")
+
+metrics.finish("rerun.app", run_started)
+
+save_shared_session()
+start_warm_up()
+
+# 주소에 ?metrics=1 을 붙이면 성능 지표를 볼 수 있어요 (교사/관리자용)
+if st.query_params.get("metrics"):
+    with st.expander("📊 성능 지표"):
+        st.json(metrics.snapshot())
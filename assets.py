@@ -0,0 +1,170 @@
+import os
+import mmap
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+# 내용 주소 방식의 그림 저장소
+# 파일 이름이 곧 내용의 해시라서 같은 그림은 한 번만 저장되고, 한 번 정해진 주소의 내용은 바뀌지 않아요.
+# - static/assets/ 아래에 두어서 Streamlit이 /app/static/assets/<이름> 으로 디스크에서 바로 내려보내요
+#   (다시 볼 때 서버가 그림을 읽어서 웹소켓으로 보내지 않아요)
+#   Streamlit의 정적 파일 주소는 Cache-Control을 붙이지 않고 304로 답하지도 않아서, 브라우저는
+#   Last-Modified를 보고 어림잡은 시간 동안만 캐시해요. 그 뒤에는 그림을 다시 통째로 받아요.
+# - 전체 크기가 max_bytes를 넘으면 가장 오래 안 본 그림부터 지워요 (LRU)
+#   시작할 때(scan)도 확인해서, ASSET_STORE_MAX_MB를 줄였으면 바로 그만큼 지워요
+# - 미리보기 만들기처럼 바이트가 필요한 곳은 open_mapped()로 복사 없이 메모리 매핑해서 읽어요
+# 프롬프트 해시처럼 내용을 만들기 전에 아는 이름은 alias()로 내용 이름에 연결해 둬요.
+# 여러 워커가 같은 폴더를 쓰면 용량 계산은 워커마다 자기가 본 파일 기준이라 대략적이에요.
+
+ASSET_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "assets")
+STATIC_URL = "app/static/assets"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+NAMES_DIR = "_names"
+HASH_CHUNK = 1024 * 1024
+
+
+def content_name(digest, suffix):
+    return f"{digest[:32]}{suffix}"
+
+
+class AssetStore:
+    def __init__(self, root=ASSET_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # 이름 → 크기 ; 앞쪽일수록 오래 안 본 그림이에요
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(os.path.join(root, NAMES_DIR), exist_ok=True)
+        self.scan()
+
+    def scan(self):
+        # 다시 시작해도 최근에 본 순서를 이어가도록 파일 수정 시각으로 순서를 정해요
+        found = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                found.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        with self.lock:
+            self.entries.clear()
+            for _, name, size in sorted(found):
+                self.entries[name] = size
+            self.total_bytes = sum(self.entries.values())
+            self.evict()
+            metrics.set_gauge("assets.bytes", self.total_bytes)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def url(self, name):
+        # 내용이 바뀌면 이름도 바뀌니 같은 주소는 늘 같은 그림이에요 (?v=는 캐시를 나누는 표시일 뿐이에요)
+        return f"{STATIC_URL}/{name}?v={name[:12]}"
+
+    def touch(self, name):
+        with self.lock:
+            known = name in self.entries
+            if known:
+                self.entries.move_to_end(name)
+        if not known:
+            # 여러 워커 모드에서는 다른 워커가 같은 폴더에 넣은 그림일 수 있어요
+            try:
+                size = os.path.getsize(self.path(name))
+            except FileNotFoundError:
+                return False
+            self.add(name, size)
+            return True
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            # 다른 워커가 지운 그림
+            with self.lock:
+                self.total_bytes -= self.entries.pop(name, 0)
+            return False
+        return True
+
+    def has(self, name):
+        found = self.touch(name)
+        metrics.increment("assets.hits" if found else "assets.misses")
+        return found
+
+    def add(self, name, size):
+        with self.lock:
+            if name not in self.entries:
+                self.total_bytes += size
+            self.entries[name] = size
+            self.entries.move_to_end(name)
+            self.evict(keep=name)
+            metrics.set_gauge("assets.bytes", self.total_bytes)
+
+    def evict(self, keep=None):
+        # self.lock을 잡은 상태에서 불러요
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name, size = next(iter(self.entries.items()))
+            if name == keep:
+                self.entries.move_to_end(name)
+                continue
+            del self.entries[name]
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+            metrics.increment("assets.evictions")
+
+    def put(self, data, suffix=".png"):
+        name = content_name(hashlib.sha256(data).hexdigest(), suffix)
+        if self.touch(name):
+            return name
+        tmp_path = f"{self.path(name)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path(name))
+        self.add(name, len(data))
+        return name
+
+    def put_file(self, source_path, suffix=".png"):
+        # 이미 디스크에 쓴 파일(이어 붙인 만화 등)은 복사하지 않고 이름만 바꿔서 넣어요
+        # source_path는 같은 파일 시스템(보통 self.temp_path())에 있어야 해요
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        name = content_name(digest.hexdigest(), suffix)
+        if self.touch(name):
+            os.remove(source_path)
+            return name
+        size = os.path.getsize(source_path)
+        os.replace(source_path, self.path(name))
+        self.add(name, size)
+        return name
+
+    def temp_path(self, suffix=".png"):
+        return os.path.join(self.root, f"{time.time_ns()}.{threading.get_ident()}{suffix}.tmp")
+
+    @contextmanager
+    def open_mapped(self, name):
+        # 읽기 전용 메모리 매핑 ; 필요한 부분만 페이지 단위로 읽혀요
+        self.touch(name)
+        with open(self.path(name), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def alias(self, key, name):
+        tmp_path = os.path.join(self.root, NAMES_DIR, f"{key}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp_path, os.path.join(self.root, NAMES_DIR, key))
+
+    def resolve(self, key):
+        # 연결된 그림이 지워졌으면 없는 것으로 봐요
+        try:
+            with open(os.path.join(self.root, NAMES_DIR, key), encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            metrics.increment("assets.misses")
+            return None
+        return name if self.has(name) else None
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from bench.common import percentile, print_table, save_baseline, compare_to_baseline
+
+import catalog
+import analytics
+
+# 교사용 학급 통계 벤치마크
+# 합성 스토리보드 --storyboards개(기본 100만 개, 1년, --classes개 학급)를 analytics.AnalyticsStore에 넣고
+# 1) 넣는 속도 (묶음 쓰기, 완성 한 번마다 쓰는 record() 한 건의 지연 시간)
+# 2) 통계 화면 한 번(신호등 합계/일별/감정/상황/학생 다섯 질의)에 걸리는 시간 — 집계 표 vs 원본을 다시 세기
+# 를 재요. 통계 화면이 --budget ms를 넘으면 실패해요.
+#
+#   python -m bench.analytics
+#   python -m bench.analytics --storyboards 100000 --classes 40
+#   python -m bench.analytics --save-baseline
+#   python -m bench.analytics --check
+
+BASELINE_NAME = "analytics"
+DASHBOARD_BUDGET_MS = 50
+BATCH = 5000
+
+RAW_QUERIES = (
+    "SELECT valence, count(*) FROM storyboards WHERE classroom = ? AND day BETWEEN ? AND ? GROUP BY valence",
+    "SELECT day, valence, count(*) FROM storyboards WHERE classroom = ? AND day BETWEEN ? AND ? GROUP BY day, valence",
+    "SELECT emotion, count(*) AS n FROM storyboards WHERE classroom = ? AND day BETWEEN ? AND ? "
+    "GROUP BY emotion ORDER BY n DESC LIMIT 10",
+    "SELECT situation, count(*) AS n FROM storyboards WHERE classroom = ? AND day BETWEEN ? AND ? "
+    "GROUP BY situation ORDER BY n DESC LIMIT 10",
+    "SELECT student, count(*) AS n, count(DISTINCT day) FROM storyboards WHERE classroom = ? AND day BETWEEN ? AND ? "
+    "GROUP BY student ORDER BY n DESC LIMIT 50",
+)
+
+
+def synthetic_rows(count, classes, students_per_class, seed, today):
+    rng = random.Random(seed)
+    emotions = catalog.POSITIVE_EMOTIONS + catalog.NEGATIVE_EMOTIONS + ("긴장", "억울함")
+    situations = [s for group in catalog.AGE_SITUATIONS.values() for s in group]
+    classrooms = [f"{grade}-{number}" for grade in range(1, 7) for number in range(1, 60)][:classes]
+    start = today - timedelta(days=364)
+    for i in range(count):
+        classroom = rng.choice(classrooms)
+        day = (start + timedelta(days=rng.randrange(365))).isoformat()
+        student = f"{classroom}-s{rng.randrange(students_per_class)}"
+        situation = rng.choice(situations) if rng.random() < 0.7 else f"{rng.choice(situations)} ({rng.randrange(1000)})"
+        yield analytics.storyboard_row(classroom, student, rng.choice(emotions), situation, day, created=i)
+
+
+def dashboard(store, classroom, start, end):
+    store.valence_totals(classroom, start, end)
+    store.valence_by_day(classroom, start, end)
+    store.top_emotions(classroom, start, end)
+    store.top_situations(classroom, start, end)
+    store.student_usage(classroom, start, end)
+
+
+def raw_dashboard(store, classroom, start, end):
+    db = store.connect()
+    for query in RAW_QUERIES:
+        db.execute(query, (classroom, start, end)).fetchall()
+
+
+def timed_ms(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="교사용 학급 통계 벤치마크")
+    parser.add_argument("--storyboards", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--students", type=int, default=25, help="학급당 학생 수")
+    parser.add_argument("--queries", type=int, default=50, help="기간마다 통계 화면을 여는 횟수")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=DASHBOARD_BUDGET_MS, help="통계 화면 p99 예산 (ms)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 느려지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    today = date.today()
+    path = os.path.join(tempfile.mkdtemp(prefix="analytics_"), "analytics.db")
+    store = analytics.AnalyticsStore(path)
+
+    started = time.perf_counter()
+    batch = []
+    for row in synthetic_rows(args.storyboards, args.classes, args.students, args.seed, today):
+        batch.append(row)
+        if len(batch) == BATCH:
+            store.record_many(batch)
+            batch = []
+    if batch:
+        store.record_many(batch)
+    ingest_s = time.perf_counter() - started
+    record_ms = [timed_ms(store.record, "1-1", "1-1-s0", "기쁨", "친구와 놀이터에서 함께 놀았을 때") for _ in range(200)]
+    size_mb = sum(os.path.getsize(f"{path}{suffix}") for suffix in ("", "-wal") if os.path.exists(f"{path}{suffix}")) / 1e6
+
+    print(f"스토리보드 {args.storyboards:,}개, 학급 {args.classes}개, 1년 ; 파일 {size_mb:.0f}MB")
+    print(f"넣기: {args.storyboards / ingest_s:,.0f}개/초 (묶음 {BATCH}개), "
+          f"record() 한 건 p50 {percentile(record_ms, 50):.2f}ms / p99 {percentile(record_ms, 99):.2f}ms\n")
+
+    rng = random.Random(args.seed)
+    classes = [row[0] for row in store.classrooms()]
+    rows = []
+    results = {"record_p99_ms": percentile(record_ms, 99)}
+    failed = False
+    for days in (7, 30, 365):
+        start, end = analytics.period(days, today)
+        picks = [rng.choice(classes) for _ in range(args.queries)]
+        fast = [timed_ms(dashboard, store, classroom, start, end) for classroom in picks]
+        raw = [timed_ms(raw_dashboard, store, classroom, start, end) for classroom in picks[:10]]
+        rows.append([f"{days}일", f"{percentile(fast, 50):.2f}", f"{percentile(fast, 99):.2f}",
+                     f"{percentile(raw, 50):.1f}", f"{percentile(raw, 50) / max(percentile(fast, 50), 1e-6):.0f}배"])
+        results[f"dashboard_{days}d_p99_ms"] = percentile(fast, 99)
+        failed = failed or percentile(fast, 99) > args.budget
+    print_table(rows, ["기간", "집계 p50(ms)", "집계 p99(ms)", "원본 다시 세기 p50(ms)", "차이"])
+    print(f"\n통계 화면 예산: p99 {args.budget:.0f}ms")
+    if failed:
+        print("[예산 초과] 통계 화면")
+
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import sys
+import timeit
+import argparse
+import tracemalloc
+
+from bench.common import print_table
+
+import catalog
+
+# 감정/화풍/상황 표 찾기 비용 비교
+# 예전처럼 호출할 때마다 리스트와 dict를 새로 만들고 선형 탐색하는 방식과
+# catalog 모듈의 미리 만든 색인을 쓰는 방식을 호출당 시간과 재실행당 메모리 할당량으로 비교해요.
+#
+#   python -m bench.catalog_lookup
+
+
+def legacy_traffic_light(emotion):
+    positive_emotions = ["기쁨", "행복", "감사", "뿌듯함", "만족", "희망", "신남", "설렘", "평온", "자신감"]
+    negative_emotions = ["슬픔", "화남", "답답함", "걱정", "두려움", "실망", "부끄러움", "외로움", "스트레스", "짜증"]
+    if emotion in positive_emotions:
+        return {"color": "🟢", "status": "초록불", "message": "건강하고 긍정적인 감정이에요!", "css_color": "#28a745"}
+    elif emotion in negative_emotions:
+        return {"color": "🔴", "status": "빨간불", "message": "힘들고 어려운 감정이네요.", "css_color": "#dc3545"}
+    return {"color": "🟡", "status": "노란불", "message": "복잡한 감정이에요.", "css_color": "#ffc107"}
+
+
+def legacy_style_prompt(style_name):
+    style_prompts = {
+        "귀여운 애니메이션": "Studio Ghibli style, Disney animation style, soft colors, magical atmosphere",
+        "한국 웹툰": "Korean webtoon style, clean lines, vibrant colors, modern digital art",
+        "3D 캐릭터": "Pixar 3D animation style, volumetric lighting, detailed textures, playful 3D characters",
+        "피규어 형태": "LEGO minifigure style, Playmobil toy style, cute figurine aesthetic",
+        "낙서 형태": "Hand-drawn doodle style, sketch-like, casual drawing, notebook doodle aesthetic",
+        "수채화": "Watercolor illustration, soft brushstrokes, gentle colors, dreamy atmosphere",
+        "동화책": "Children's book illustration, storybook art style, warm and cozy",
+        "실제 사진": "Real photography, candid photo of children, natural lighting, documentary style",
+        "인형극": "Puppet show photography, marionette style, theatrical lighting, stage setting",
+        "클레이 모델": "Clay animation style, stop-motion photography, plasticine characters",
+    }
+    return style_prompts.get(style_name, "cute anime/manga style")
+
+
+def legacy_situations(age_group):
+    age_situations = {
+        "초등학교 1~2학년": ["급식시간에 좋아하는 반찬이 나왔을 때", "친구와 놀이터에서 함께 놀았을 때", "선생님께 칭찬을 받았을 때",
+                         "새로운 친구와 인사를 나눴을 때", "미술 시간에 그림을 그렸을 때"],
+        "초등학교 3~4학년": ["체육시간에 피구를 하다가 공에 맞았을 때", "숙제를 깜빡하고 학교에 왔을 때", "시험에서 예상보다 좋은 점수를 받았을 때",
+                         "친구와 다툰 후 화해했을 때", "발표를 하는데 긴장되었을 때"],
+        "초등학교 5~6학년": ["학급 임원 선거에서 떨어졌을 때", "친한 친구가 다른 학교로 전학갔을 때", "어려운 수학 문제를 혼자 풀었을 때",
+                         "단체 활동에서 의견이 안 맞았을 때", "졸업식을 앞두고 친구들과 시간을 보낼 때"],
+        "교사": ["학생이 처음으로 어려운 개념을 이해했을 때", "학급에서 갈등이 일어나 중재해야 할 때", "공개수업을 앞두고 준비하는 상황",
+               "학부모와 상담하는 시간", "동료 교사와 협업하여 프로젝트를 진행할 때"],
+    }
+    return age_situations.get(age_group, age_situations["초등학교 1~2학년"])
+
+
+def legacy_rerun():
+    # 5단계 화면 한 번 그릴 때의 표 사용량 (신호등 2번, 화풍 1번, 상황 1번)
+    legacy_traffic_light("짜증")
+    legacy_traffic_light("짜증")
+    legacy_style_prompt("수채화")
+    legacy_situations("교사")
+
+
+def catalog_rerun():
+    catalog.traffic_light("짜증")
+    catalog.traffic_light("짜증")
+    catalog.style_prompt("수채화")
+    catalog.situations_for("교사")
+
+
+CASES = [
+    ("traffic_light", lambda: legacy_traffic_light("짜증"), lambda: catalog.traffic_light("짜증")),
+    ("traffic_light(모르는 감정)", lambda: legacy_traffic_light("뿌듯했어"), lambda: catalog.traffic_light("뿌듯했어")),
+    ("style_prompt", lambda: legacy_style_prompt("클레이 모델"), lambda: catalog.style_prompt("클레이 모델")),
+    ("situations", lambda: legacy_situations("교사"), lambda: catalog.situations_for("교사")),
+    ("rerun 전체", legacy_rerun, catalog_rerun),
+]
+
+
+def per_call_ns(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def allocated_bytes(func, number=1000):
+    # 호출 한 번 동안 새로 잡은 메모리의 최댓값 평균
+    tracemalloc.start()
+    total = 0
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        func()
+        total += tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    return total / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="고정 표 찾기 비용 비교")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name, legacy, current in CASES:
+        before = per_call_ns(legacy, args.number)
+        after = per_call_ns(current, args.number)
+        rows.append([name, f"{before:.0f}", f"{after:.0f}", f"{before / after:.1f}x"])
+    print_table(rows, ["항목", "이전(ns)", "현재(ns)", "배수"])
+
+    print(f"\n재실행당 최대 할당량: {allocated_bytes(legacy_rerun):.0f} bytes -> {allocated_bytes(catalog_rerun):.0f} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
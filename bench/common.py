@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import platform
+
+# 벤치마크 공통 도구 (백분위수 계산, 기준값 저장/비교)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO_ROOT, "bench", "baselines")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load_baseline(name):
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(name, metrics):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    record = {"python": platform.python_version(), "machine": platform.machine(), "metrics": metrics}
+    with open(baseline_path(name), "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(name, metrics, tolerance=0.2, floors=None):
+    # 값이 클수록 나쁜 지표(지연 시간, 호출 수, 메모리)만 비교해요
+    # 기준값보다 tolerance 비율 이상 커지면 회귀로 보고해요
+    # floors({이름 끝: 값})에 맞는 지표는 그 값보다 적게 늘면 잡음으로 보고 넘어가요 (아주 작은 값의 흔들림)
+    baseline = load_baseline(name)
+    if baseline is None:
+        return []
+    regressions = []
+    for key, old in baseline["metrics"].items():
+        new = metrics.get(key)
+        if new is None or not isinstance(old, (int, float)) or old <= 0:
+            continue
+        floor = next((value for suffix, value in (floors or {}).items() if key.endswith(suffix)), 0)
+        if new > old * (1 + tolerance) and new - old > floor:
+            regressions.append(f"{key}: {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_table(rows, headers):
+    widths = [max([len(str(h))] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
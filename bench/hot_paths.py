@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import timeit
+import argparse
+import subprocess
+
+from bench.common import REPO_ROOT, print_table, save_baseline, compare_to_baseline
+
+import catalog
+import prompts
+import moderation
+import output_filter
+import scene_parser
+from storyboard_state import Storyboard
+
+# 재실행마다 도는 순수 함수들의 호출당 시간
+# 입력 검사(길이, 키워드), 감정 신호등, 안전 필터, 장면 해석(한 번에 / 스트리밍), 프롬프트 조립을
+# 고정된 입력으로 timeit을 여러 번 돌려 가장 빠른 값(µs/호출)을 재요.
+# 같은 기계에서도 실행마다 CPU 속도가 1.5배쯤 오르내려서, 함수마다 바로 앞에서 고정된 기준 작업(reference)도 재고
+# 그 배수(기준 작업 대비)로 기준값과 비교해요. 배수가 tolerance 이상 커진 함수는 한 번 더 재서 둘 중 나은 값으로도
+# 커졌을 때만 실패해요 (잠깐 다른 일이 끼어든 탓인지 가려요).
+# 먼저 새 프로세스에서 이 모듈들을 불러와도 streamlit을 부르거나 스레드를 띄우지 않는지(부수 효과 없음) 확인해요.
+#
+#   python -m bench.hot_paths
+#   python -m bench.hot_paths --save-baseline
+#   python -m bench.hot_paths --check
+
+BASELINE_NAME = "hot_paths"
+CORPUS_PATH = os.path.join(REPO_ROOT, "bench", "corpus", "scene_responses.json")
+MODULES = ("catalog", "prompts", "moderation", "output_filter", "scene_parser", "storyboard_state")
+
+IMPORT_CHECK = """
+import sys, threading
+for name in sys.argv[1:]:
+    __import__(name)
+print(int("streamlit" in sys.modules), threading.active_count())
+"""
+
+SITUATION = "친구와 함께 미술 시간에 그림을 그리다가 물감을 쏟았을 때"
+REASON = "친구가 괜찮다고 말해 줘서 고맙고 마음이 편해졌어요"
+STREAM_CHUNK = 12
+
+
+def import_side_effects():
+    # (streamlit을 불렀는지, 살아 있는 스레드 수)
+    completed = subprocess.run([sys.executable, "-c", IMPORT_CHECK, *MODULES],
+                               capture_output=True, text=True, cwd=REPO_ROOT, check=True)
+    loaded, threads = completed.stdout.split()
+    return loaded == "1", int(threads)
+
+
+def reference():
+    # 기계 속도를 재는 고정 작업 (문자열 다루기 + 작은 반복문)
+    text = SITUATION * 4
+    return sum(len(part) for part in text.split(" ") if "친" not in part)
+
+
+def stream_parse(text):
+    parser = scene_parser.SceneParser()
+    for i in range(0, len(text), STREAM_CHUNK):
+        parser.feed(text[i:i + STREAM_CHUNK])
+    return parser.close()
+
+
+def cases():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        responses = [item["text"] for item in json.load(f)]
+    response = responses[0]
+    board = Storyboard(age_group=catalog.AGE_GROUPS[1], gender="여자", art_style="한국 웹툰", situation=SITUATION,
+                       emotion="감사", reason=REASON, scenes=tuple(scene_parser.parse_scenes(response).values()))
+    panel = {"age_group": board.age_group, "gender": board.gender, "situation": SITUATION,
+             "emotion": board.emotion, "index": 1, "scene": board.scenes[0]}
+    return [
+        ("validate_text_input", lambda: moderation.validate_text_input(SITUATION, 10, 200, "상황 설명")),
+        ("traffic_light", lambda: [catalog.traffic_light(emotion) for emotion in ("기쁨", "짜증", "긴장")]),
+        ("keyword_hit.situation", lambda: moderation.keyword_hit(SITUATION, "situation")),
+        ("keyword_hit.reason", lambda: moderation.keyword_hit(REASON, "reason")),
+        ("blocked_words", lambda: output_filter.blocked_words(response)),
+        ("output_filter.repair", lambda: output_filter.repair(response, "scenes")),
+        ("parse_scenes", lambda: scene_parser.parse_scenes(response)),
+        ("parse_scenes.corpus", lambda: [scene_parser.parse_scenes(text) for text in responses]),
+        ("SceneParser.stream", lambda: stream_parse(response)),
+        ("four_panel_prompt", lambda: prompts.four_panel_prompt(board)),
+        ("prompts.request", lambda: prompts.request(prompts.PANEL_PROMPT, **panel)),
+    ]
+
+
+def per_call_us(func, repeat, min_time):
+    # 한 번 재는 데 min_time초쯤 걸리도록 횟수를 정하고, repeat번 중 가장 빠른 값을 써요
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def relative_cost(func, repeat, min_time):
+    # (µs/호출, 기준 작업 대비 배수)
+    reference_us = per_call_us(reference, repeat, min_time)
+    us = per_call_us(func, repeat, min_time)
+    return us, us / reference_us
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="재실행마다 도는 순수 함수들의 호출당 시간")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--min-time", type=float, default=0.02, help="한 번 잴 때 걸리는 시간 (초)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 느려지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    loaded, threads = import_side_effects()
+    print(f"모듈 불러오기: streamlit {'불러옴' if loaded else '안 불러옴'}, 스레드 {threads}개")
+    if loaded or threads > 1:
+        print("[부수 효과] 도우미 모듈을 불러올 때 streamlit이나 스레드가 생겨요")
+        failed = True
+
+    rows = []
+    results = {}
+    funcs = dict(cases())
+    for name, func in funcs.items():
+        us, ratio = relative_cost(func, args.repeat, args.min_time)
+        rows.append([name, f"{us:.2f}", f"{ratio:.2f}"])
+        results[f"{name}_x_ref"] = ratio
+    print()
+    print_table(rows, ["함수", "µs/호출", "기준 작업 대비"])
+
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        if regressions:
+            for key in [regression.split(":")[0] for regression in regressions]:
+                _, ratio = relative_cost(funcs[key.removesuffix("_x_ref")], args.repeat, args.min_time)
+                results[key] = min(results[key], ratio)
+            regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import io
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.common import summarize, print_table, save_baseline, compare_to_baseline
+
+import images
+import metrics
+from assets import AssetStore
+
+# 학급 전체 4컷 이미지 처리량
+# 학생 N명이 동시에 "4컷 이미지 만들기"를 누르는 상황을 오프라인 그림(placeholder)으로 흉내 내요.
+# 컷 하나를 그리는 데 --delay초가 걸린다고 보고, 스트립 한 장이 걸리는 시간과 분당 스트립 수를 재요.
+# 같은 프롬프트로 한 번 더 돌려서 캐시가 맞는지, 이어 붙이기의 최대 메모리가
+# 전체 그림을 한 번에 만드는 방식보다 얼마나 적은지도 비교해요.
+#
+#   python -m bench.image_pipeline --students 25 --delay 1.0
+#   python -m bench.image_pipeline --save-baseline
+#   python -m bench.image_pipeline --check
+
+BASELINE_NAME = "image_pipeline"
+# 1ms도 안 되는 지표는 비율로 보면 잡음에도 두 배씩 흔들려서, 이만큼(절대값) 넘게 늘어야 회귀로 봐요
+# (그림을 다시 읽던 예전 방식은 redisplay_ms가 0.1ms 넘게, 캐시가 빗나가면 warm_p90_s가 몇 초씩 늘어요)
+CHECK_FLOORS = {"redisplay_ms": 0.05, "warm_p90_s": 0.05}
+STYLE = "cute anime/manga style, bright colors"
+
+
+def student_prompts(index):
+    return [f"Korean elementary school student number {index} in scene {panel} of a four panel comic"
+            for panel in range(1, 5)]
+
+
+def run_class(backend, students, store, size):
+    def one_student(index):
+        started = time.perf_counter()
+        images.make_strip(backend, student_prompts(index), STYLE, store=store, size=size)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        durations = list(pool.map(one_student, range(students)))
+    return durations, time.perf_counter() - started
+
+
+def naive_composite(panel_paths, out_path, size):
+    # 예전 방식이라면: 전체 크기 캔버스를 만들고 컷을 붙인 뒤 한 번에 저장
+    from PIL import Image
+
+    width, height = size
+    gutter = images.GUTTER
+    canvas = Image.new("RGB", (width + 2 * gutter, len(panel_paths) * (height + gutter) + gutter), images.BACKGROUND)
+    for i, path in enumerate(panel_paths):
+        with Image.open(path) as panel:
+            canvas.paste(panel.convert("RGB").resize(size), (gutter, gutter + i * (height + gutter)))
+    output = io.BytesIO()
+    canvas.save(output, format="PNG")
+    with open(out_path, "wb") as f:
+        f.write(output.getvalue())
+
+
+def rss_high_water_kb():
+    # 리눅스에서는 /proc/self/clear_refs로 최대 RSS를 지금 값으로 되돌릴 수 있어요
+    # (fork한 부모의 최대 RSS가 자식에게 이어져서 ru_maxrss만으로는 차이가 안 보여요)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_high_water():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory_child(method, panel_paths, out_path, size, results):
+    # 방식마다 새 프로세스에서 이어 붙이기만 하고 최대 RSS가 얼마나 늘었는지 재요
+    from PIL import Image  # noqa: F401  (불러오는 데 드는 메모리는 빼고 재요)
+
+    reset_high_water()
+    before = rss_high_water_kb()
+    if method == "streaming":
+        images.composite_strip(panel_paths, out_path, size)
+    else:
+        naive_composite(panel_paths, out_path, size)
+    results.put((rss_high_water_kb() - before) / 1024)
+
+
+def peak_memory(method, panel_paths, out_path, size):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    child = context.Process(target=peak_memory_child, args=(method, panel_paths, out_path, size, results))
+    child.start()
+    peak = results.get()
+    child.join()
+    return peak
+
+
+def redisplay_cost(store, result, repeats=200):
+    # 스토리보드를 다시 볼 때(재실행마다) 서버가 하는 일
+    # 예전: st.image(경로)가 파일을 읽고 해시를 구해 미디어 저장소에 올려요 (만화 + 미리보기 4장)
+    # 지금: 저장소에 있는지 확인하고 정적 파일 주소만 만들어요
+    names = [result["strip"]] + result["thumbnails"]
+
+    def legacy():
+        for name in names:
+            with open(store.path(name), "rb") as f:
+                hashlib.md5(f.read()).hexdigest()
+
+    def current():
+        for name in names:
+            if store.has(name):
+                store.url(name)
+
+    costs = {}
+    for label, func in (("legacy", legacy), ("current", current)):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        costs[label] = (time.perf_counter() - started) / repeats * 1000
+    costs["bytes"] = sum(os.path.getsize(store.path(name)) for name in names)
+    return costs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="학급 전체 4컷 이미지 처리량")
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--delay", type=float, default=1.0, help="컷 하나를 그리는 데 걸리는 시간 (초)")
+    parser.add_argument("--size", type=int, default=1024, help="컷 한 변의 픽셀 수")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    size = (args.size, args.size)
+    backend = images.PlaceholderBackend(delay=args.delay)
+    cache_dir = tempfile.mkdtemp(prefix="image_pipeline_")
+    try:
+        store = AssetStore(cache_dir)
+        cold, cold_wall = run_class(backend, args.students, store, size)
+        composite = metrics.snapshot()["observations"]["images.strip.composite_ms"]
+        warm, warm_wall = run_class(backend, args.students, store, size)
+        counters = metrics.snapshot()["counters"]
+
+        result = images.make_strip(backend, student_prompts(0), STYLE, store=store, size=size)
+        panels = [store.path(panel) for panel in result["panels"]]
+        streaming_mb = peak_memory("streaming", panels, f"{cache_dir}/streaming.png.tmp", size)
+        naive_mb = peak_memory("naive", panels, f"{cache_dir}/naive.png.tmp", size)
+        redisplay = redisplay_cost(store, result)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    rows = []
+    for label, durations, wall in (("처음", cold, cold_wall), ("캐시", warm, warm_wall)):
+        stats = summarize(durations)
+        rows.append([label, f"{stats['p50']:.2f}", f"{stats['p90']:.2f}", f"{stats['max']:.2f}",
+                     f"{wall:.2f}", f"{args.students / wall * 60:.0f}"])
+    print(f"== 학생 {args.students}명, 컷 {args.size}x{args.size}, 컷당 {args.delay}초 ==")
+    print_table(rows, ["실행", "p50(초)", "p90(초)", "최대(초)", "전체(초)", "스트립/분"])
+    print(f"\n이어 붙이기 한 번: 평균 {composite['mean']:.0f}ms, p90 {composite['p90']:.0f}ms")
+    print(f"컷 생성 {counters.get('images.panel.generated', 0)}회, 컷 캐시 적중 {counters.get('images.panel.cache_hits', 0)}회, "
+          f"스트립 캐시 적중 {counters.get('images.strip.cache_hits', 0)}회")
+    print(f"이어 붙이기 최대 메모리 증가: 줄 단위 {streaming_mb:.1f}MiB, 전체 캔버스 {naive_mb:.1f}MiB")
+    print(f"다시 볼 때 재실행당 서버 작업: 그림 읽기 {redisplay['legacy']:.2f}ms ({redisplay['bytes'] / 1024:.0f}KiB 전송) "
+          f"-> 주소만 {redisplay['current']:.3f}ms (웹소켓 0KiB, 그림은 정적 파일 주소로)")
+
+    results = {
+        "cold_p90_s": summarize(cold)["p90"],
+        "warm_p90_s": summarize(warm)["p90"],
+        "composite_mean_ms": composite["mean"],
+        "composite_peak_mb": streaming_mb,
+        "redisplay_ms": redisplay["current"],
+    }
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance, CHECK_FLOORS)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
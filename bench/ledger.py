@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from bench.common import percentile, print_table, save_baseline, compare_to_baseline
+
+import metrics
+import prompts
+import ledger
+import gemini_client
+import gemini_stub
+
+# Gemini 사용량 장부와 하루 예산 벤치마크
+# 1) 쓰기 비용: record() 한 번에 걸리는 시간 ; 호출마다 쓰기(flush_every=1)와 묶어 쓰기(기본)를 비교해요
+# 2) 예산: 로컬 대역 서버(gemini_stub)에 스토리보드(검사 2 + 장면 1 + 컷 프롬프트 4)를 계속 만들면서
+#    단계(ok / soft / hard)마다 스토리보드당 실제 호출 수와 비용을 재요. 예산은 첫 스토리보드 비용의 --budget-boards배로 정해요.
+#    하루 비용이 예산을 스토리보드 하나 값보다 더 넘으면 실패해요.
+#
+#   python -m bench.ledger
+#   python -m bench.ledger --records 50000 --storyboards 200
+#   python -m bench.ledger --save-baseline
+#   python -m bench.ledger --check
+
+BASELINE_NAME = "ledger"
+STORYBOARD = {
+    "age_group": "초등학교 3~4학년",
+    "gender": "여자",
+    "situation": "체육시간에 피구를 하다가 공에 맞아서 넘어졌어요",
+    "emotion": "부끄러움",
+    "reason": "모두가 보는 앞에서 넘어져서 창피했기 때문이에요",
+}
+CLASSES = ("3-1", "3-2", "4-1", "5-3")
+
+
+def write_cost(path, records, flush_every):
+    book = ledger.Ledger(path, flush_every=flush_every, flush_interval=3600)
+    timings = []
+    started = time.perf_counter()
+    for i in range(records):
+        begin = time.perf_counter()
+        book.record("scenes", CLASSES[i % len(CLASSES)], gemini_client.DEFAULT_MODEL, 180, 90, 850.0)
+        timings.append((time.perf_counter() - begin) * 1e6)
+    book.flush()
+    return (time.perf_counter() - started) / records * 1e6, percentile(timings, 99)
+
+
+def storyboard_calls(tenant):
+    # 앱이 한 스토리보드에서 보내는 호출 순서 (separate 모드)
+    values = dict(STORYBOARD)
+    calls = [
+        prompts.request(prompts.SITUATION_CHECK, text=values["situation"]),
+        prompts.request(prompts.REASON_CHECK, text=values["reason"]),
+        prompts.request(prompts.SCENE_SUMMARY, **values),
+    ]
+    for index in range(1, 5):
+        calls.append(prompts.request(prompts.PANEL_PROMPT, age_group=values["age_group"], gender=values["gender"],
+                                     situation=values["situation"], emotion=values["emotion"], index=index,
+                                     scene=f"{index}번째 장면"))
+    return [gemini_client.ask_gemini(**call, tenant=tenant) for call in calls]
+
+
+def upstream_calls():
+    return sum(value for name, value in metrics.snapshot()["counters"].items()
+               if name.startswith("gemini.") and name.endswith(".calls"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gemini 사용량 장부와 하루 예산")
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--storyboards", type=int, default=400)
+    parser.add_argument("--budget-boards", type=float, default=100, help="예산 = 첫 스토리보드 비용 × 이 값")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="ledger_")
+    rows = []
+    results = {}
+    for label, flush_every in (("호출마다 쓰기", 1), ("묶어 쓰기 (50줄)", 50)):
+        mean_us, p99_us = write_cost(os.path.join(directory, f"write_{flush_every}.db"), args.records, flush_every)
+        rows.append([label, f"{mean_us:.1f}", f"{p99_us:.1f}"])
+        results[f"record_us_flush{flush_every}"] = mean_us
+    print(f"record() {args.records:,}번")
+    print_table(rows, ["방식", "평균 µs", "p99 µs"])
+
+    server, base_url = gemini_stub.start_server()
+    gemini_client.configure(api_key="stub", base_url=base_url, mode="live")
+    book = ledger.Ledger(os.path.join(directory, "budget.db"))
+    gemini_client.configure(ledger=book)
+
+    metrics.reset()
+    storyboard_calls(CLASSES[0])
+    first_cost = book.spent_today()
+    book.daily_budget = first_cost * args.budget_boards
+    states = {state: {"boards": 0, "calls": 0, "cost": 0.0} for state in ledger.STATES}
+    for i in range(1, args.storyboards):
+        state = book.state()
+        calls, spent = upstream_calls(), book.spent_today()
+        storyboard_calls(CLASSES[i % len(CLASSES)])
+        states[state]["boards"] += 1
+        states[state]["calls"] += upstream_calls() - calls
+        states[state]["cost"] += book.spent_today() - spent
+    server.shutdown()
+    book.flush()
+
+    spent = book.spent_today()
+    print(f"\n예산: 스토리보드 {args.budget_boards:.0f}개 값 (${book.daily_budget:.4f}), "
+          f"스토리보드 {args.storyboards}개 만들기")
+    print_table([[state, s["boards"], f"{s['calls'] / max(s['boards'], 1):.1f}",
+                  f"${s['cost'] / max(s['boards'], 1) * 1000:.3f}"] for state, s in states.items()],
+                ["단계", "스토리보드", "호출/스토리보드", "비용 (스토리보드 1000개당)"])
+    refused = {name.removeprefix("budget.refused."): value
+               for name, value in metrics.snapshot()["counters"].items() if name.startswith("budget.refused.")}
+    print(f"싼 길로 돌린 호출: {refused}")
+    print(f"하루 비용: ${spent:.4f} / 예산 ${book.daily_budget:.4f} ({spent / book.daily_budget:.1%})")
+    print("\n호출 종류별 합계 (rollup):")
+    today = time.strftime("%Y-%m-%d")
+    for purpose, calls, prompt_tokens, output_tokens, latency_ms, cost in book.rollup("purpose", today, today):
+        print(f"  {purpose:<13} 호출 {calls:>5}  입력 {prompt_tokens:>7,}  출력 {output_tokens:>6,}  ${cost:.4f}")
+
+    failed = spent > book.daily_budget + first_cost
+    if failed:
+        print("[예산 초과] 하루 비용이 예산을 스토리보드 하나 값보다 더 넘었어요")
+    results["overshoot_ratio"] = max(spent / book.daily_budget - 1, 0)
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
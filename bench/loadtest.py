@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import time
+import heapq
+import pickle
+import random
+import argparse
+import urllib.request
+
+from bench.common import REPO_ROOT, summarize, print_table, save_baseline, load_baseline, compare_to_baseline
+
+import metrics
+import gemini_stub
+
+# 학급 부하 테스트
+# 학생 N명이 동시에 1→5단계를 진행하는 상황을 AppTest로 흉내 내요.
+# Gemini 호출은 모두 로컬 대역 서버(gemini_stub)로 보내요.
+# 실제 서버처럼 학생 모두가 한 프로세스(스케줄러, 미리 만들기 작업자, Gemini 연결, GIL 하나)를 함께 써요.
+# AppTest는 실행할 때마다 프로세스 전역 상태(Runtime 등)를 바꿔서 여러 스레드에서 동시에 돌릴 수 없어요.
+# 그래서 학생마다 다음 행동 시각을 정해 두고, 시각이 된 학생부터 한 명씩 번갈아 실행해요.
+# - 단계별 시간은 그 실행에 걸린 시간이에요. 다른 학생 차례를 기다린 시간은 "차례 대기"로 따로 재요.
+# - 미리 만들기 작업과 업스트림 대기는 뒤 스레드에서 도니 다른 학생 차례와 겹쳐요.
+# - 학생 수(단계)마다 st.cache_resource를 비우고 대역 서버를 새로 띄워서, 새로 배포한 서버처럼 시작해요.
+# 처리량 무릎은 서버의 한계가 아니라 이 하네스의 한계예요. 스크립트 실행(그 안의 업스트림 대기 포함)이
+# 한 번에 하나씩만 도니, 학생들 실행 시간의 합이 시간을 꽉 채우는 순간 처리량이 더 늘지 않아요.
+# 실제 서버는 세션마다 스크립트 스레드가 따로 돌아서 무릎이 더 뒤에 와요. 무릎은 같은 하네스로 잰
+# 변경 전후를 비교하는 데만 쓰고, 학급 크기의 한계로 읽지 마세요.
+#
+#   python -m bench.loadtest --levels 1,4,8,16 --think 0.5
+#   python -m bench.loadtest --levels 1,2,4 --save-baseline   # 기준값 저장
+#   python -m bench.loadtest --levels 1,2,4 --check           # 기준값 대비 회귀 검사 (기준값이 없으면 실패)
+
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+BASELINE_NAME = "loadtest"
+# 단계별 p90은 학생 수만큼의 표본이라 100ms 안쪽의 흔들림은 회귀로 보지 않아요
+CHECK_FLOORS = {"p90_ms": 100}
+
+SITUATIONS = [
+    "친구와 놀이터에서 함께 놀았을 때 정말 재미있었어요",
+    "체육시간에 피구를 하다가 공에 맞아서 넘어졌어요",
+    "어려운 수학 문제를 혼자 힘으로 풀어냈을 때",
+    "친한 친구가 다른 학교로 전학을 가게 되었을 때",
+]
+REASONS = [
+    "친구와 함께 웃으면서 시간을 보냈기 때문이에요",
+    "모두가 보는 앞에서 넘어져서 창피했기 때문이에요",
+    "포기하지 않고 끝까지 노력했기 때문이에요",
+    "매일 같이 놀던 친구를 자주 못 보게 되어서요",
+]
+EMOTIONS = ["pos_기쁨", "pos_뿌듯함", "neg_부끄러움", "neg_슬픔"]
+
+
+def find_button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise LookupError(label)
+
+
+def student_actions(rng):
+    # 한 명의 학생이 스토리보드 하나를 만드는 동안 하는 행동들 (단계, 이름, 동작)
+    pick = rng.randrange(len(SITUATIONS))
+    return [
+        (1, "style", lambda at: at.button(key="style_귀여운 애니메이션").click()),
+        (1, "next", lambda at: at.button(key="step1_next").click()),
+        (2, "type", lambda at: at.text_area(key="situation_input").input(SITUATIONS[pick])),
+        (2, "next", lambda at: at.button(key="step2_next").click()),
+        (3, "emotion", lambda at: at.button(key=EMOTIONS[pick]).click()),
+        (4, "type", lambda at: at.text_area(key="reason_input").input(REASONS[pick])),
+        (4, "next", lambda at: at.button(key="step4_final").click()),
+        (5, "restart", lambda at: find_button(at, "🔄 다시 만들기").click()),
+    ]
+
+
+def think_time(rng, think):
+    if think <= 0:
+        return 0.0
+    return rng.lognormvariate(0, 0.5) * think
+
+
+def timed_run(label, at, timings):
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    timings.setdefault(label, []).append(elapsed)
+    if at.exception:
+        raise RuntimeError(f"{label}: {at.exception[0].value}")
+
+
+def session_bytes(at):
+    # 세션 상태에 든 값들을 pickle로 직렬화한 크기의 합 (직렬화할 수 없는 값은 sys.getsizeof)
+    total = 0
+    for _, value in at.session_state.items():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            total += sys.getsizeof(value)
+    return total
+
+
+def run_student(index, rounds, think, seed, report, measure_memory=False):
+    # 학생 한 명 ; 행동 하나를 실행한 다음, 다음 행동까지 생각할 시간(초)을 내보내요
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + index)
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    timed_run("step1:load", at, report["timings"])
+    for _ in range(rounds):
+        for step, name, action in student_actions(rng):
+            yield think_time(rng, think)
+            action(at)
+            timed_run(f"step{step}:{name}", at, report["timings"])
+            if measure_memory:
+                # 실행마다 재서 그 학생 세션이 가장 컸을 때(보통 5단계)를 남겨요
+                report["memory"][index] = max(report["memory"].get(index, 0), session_bytes(at))
+        report["completed"] += 1
+
+
+def drive_students(students, args, report):
+    # 다음 행동 시각이 가장 이른 학생부터 한 명씩 실행해요
+    started = time.perf_counter()
+    queue = [(started, index, run_student(index, args.rounds, args.think, args.seed, report, args.memory))
+             for index in range(students)]
+    heapq.heapify(queue)
+    while queue:
+        due, index, student = heapq.heappop(queue)
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+        else:
+            report["timings"].setdefault("차례 대기", []).append(now - due)
+        try:
+            pause = next(student)
+        except StopIteration:
+            continue
+        except Exception as e:
+            report["errors"].append(f"학생 {index}: {e}")
+            continue
+        heapq.heappush(queue, (time.perf_counter() + pause, index, student))
+
+
+def stub_stats(base_url):
+    with urllib.request.urlopen(base_url.replace("/v1beta", "/stats")) as response:
+        return json.loads(response.read())
+
+
+def run_level(students, args):
+    import streamlit as st
+
+    server, base_url = gemini_stub.start_server(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    os.environ["GEMINI_BASE_URL"] = base_url
+    os.environ["GEMINI_API_KEY"] = "stub"
+    os.environ["GEMINI_MODE"] = "live"
+    # 이전 단계의 설정, 미리 만든 결과, 스케줄러 상태를 버려요
+    st.cache_resource.clear()
+
+    before = metrics.snapshot()["counters"]
+    report = {"timings": {}, "errors": [], "completed": 0, "memory": {}}
+    started = time.perf_counter()
+    drive_students(students, args, report)
+    wall = time.perf_counter() - started
+    counters = metrics.snapshot()["counters"]
+
+    result = {
+        "students": students,
+        "storyboards": report["completed"],
+        "wall": wall,
+        "timings": report["timings"],
+        "errors": report["errors"],
+        "upstream_calls": stub_stats(base_url)["requests"],
+        # 앱이 같은 프로세스에서 도니 미리 만들기(prefetch.py) 횟수를 바로 읽어요 (이 단계에서 늘어난 만큼)
+        "prefetch": {name: value - before.get(name, 0) for name, value in counters.items() if name.startswith("prefetch.")},
+    }
+    if report["memory"]:
+        # 학생마다 세션 상태가 가장 컸을 때의 평균 (모듈, 캐시, 스레드처럼 모든 세션이 함께 쓰는 몫은 빠져요)
+        result["memory_per_session"] = sum(report["memory"].values()) / len(report["memory"])
+    server.shutdown()
+    return result
+
+
+def find_knee(levels):
+    # 학생 수를 늘려도 처리량이 10% 이상 늘지 않는 첫 지점을 무릎으로 봐요
+    for current, following in zip(levels, levels[1:]):
+        if following["throughput"] < current["throughput"] * 1.1:
+            return current["students"]
+    return levels[-1]["students"] if levels else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="학급 동시 접속 부하 테스트")
+    parser.add_argument("--levels", default="1,2,4,8", help="동시 학생 수 목록 (쉼표 구분)")
+    parser.add_argument("--rounds", type=int, default=1, help="학생 한 명이 만드는 스토리보드 수")
+    parser.add_argument("--think", type=float, default=1.0, help="행동 사이 생각 시간 중앙값 (초)")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="대역 서버 지연 시간 분포")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--memory", action="store_true", help="세션당 세션 상태 크기 측정")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 느려지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    levels = []
+    results = {}
+    for students in [int(n) for n in args.levels.split(",")]:
+        result = run_level(students, args)
+        result["throughput"] = result["storyboards"] / result["wall"] if result["wall"] else 0.0
+        levels.append(result)
+
+        print(f"\n== 동시 학생 {students}명: 스토리보드 {result['storyboards']}개, "
+              f"{result['throughput'] * 60:.1f}개/분, 업스트림 호출 {result['upstream_calls']}회 ==")
+        rows = []
+        for label in sorted(result["timings"]):
+            stats = summarize(result["timings"][label])
+            rows.append([label, stats["count"], f"{stats['p50'] * 1000:.0f}", f"{stats['p90'] * 1000:.0f}", f"{stats['p99'] * 1000:.0f}"])
+            results[f"n{students}.{label}.p90_ms"] = stats["p90"] * 1000
+        print_table(rows, ["단계:동작", "횟수", "p50(ms)", "p90(ms)", "p99(ms)"])
+
+        if result["storyboards"]:
+            calls = result["upstream_calls"] / result["storyboards"]
+            results[f"n{students}.calls_per_storyboard"] = calls
+            print(f"스토리보드당 업스트림 호출: {calls:.1f}회")
+            # 스크립트 스레드가 붙잡혀 있던 시간 (생각 시간과 차례 대기 제외, 업스트림 대기 포함)
+            busy = sum(sum(values) for label, values in result["timings"].items() if label != "차례 대기")
+            busy /= result["storyboards"]
+            results[f"n{students}.thread_seconds_per_storyboard"] = busy
+            print(f"스토리보드당 서버 스레드 점유: {busy:.2f}초")
+        prefetched = result["prefetch"]
+        claims = prefetched.get("prefetch.hits", 0) + prefetched.get("prefetch.misses", 0)
+        if claims:
+            calls = prefetched.get("prefetch.calls", 0)
+            waste = 1 - prefetched.get("prefetch.used", 0) / calls if calls else 0.0
+            print(f"미리 만들기: 적중 {prefetched.get('prefetch.hits', 0)}/{claims}, "
+                  f"호출 {calls}회 중 버린 비율 {waste:.0%}")
+        if "memory_per_session" in result:
+            results[f"n{students}.memory_per_session_kb"] = result["memory_per_session"] / 1024
+            print(f"세션당 세션 상태 (pickle): {result['memory_per_session'] / 1024:.1f} KiB")
+        for error in result["errors"]:
+            print(f"[오류] {error}")
+
+    print(f"\n처리량 무릎: 동시 학생 {find_knee(levels)}명")
+
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        if load_baseline(BASELINE_NAME) is None:
+            print(f"[회귀] 기준값이 없어요: bench/baselines/{BASELINE_NAME}.json (--save-baseline으로 먼저 저장하세요)")
+            return 1
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance, CHECK_FLOORS)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        if regressions:
+            return 1
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+
+from bench.common import REPO_ROOT, print_table, save_baseline, compare_to_baseline
+
+import catalog
+
+# 학생 입력 일괄 검사 벤치마크 (moderation_audit.py)
+# 합성 입력(상황과 감정 이유, 약 2%는 막는 낱말 포함)을 JSONL로 만들어 검사 도구를 따로 된 프로세스로 돌리고
+# 처리량(줄/초)과 최대 메모리를 재요. 줄 수를 10배 늘려도 메모리가 그대로인지(흘려보내기) 함께 봐요.
+# 마지막으로 같은 입력을 --previous로 다시 검사해서 달라진 줄이 0인지 확인해요.
+#
+#   python -m bench.moderation_audit
+#   python -m bench.moderation_audit --rows 200000 --workers 1 2 4
+#   python -m bench.moderation_audit --save-baseline
+#   python -m bench.moderation_audit --check
+
+BASELINE_NAME = "moderation_audit"
+AUDIT_PATH = os.path.join(REPO_ROOT, "moderation_audit.py")
+
+REASONS = (
+    "친구가 먼저 손을 내밀어 줘서 고마웠어요",
+    "열심히 연습했는데 실수해서 속상했어요",
+    "처음 해 보는 일이라 떨렸어요",
+    "선생님이 칭찬해 주셔서 뿌듯했어요",
+    "동생이 내 물건을 망가뜨려서 화가 났어요",
+)
+FLAGGED = ("바보 같아서", "시발", "트럼프 때문에", "술 마시는 흉내", "칼싸움 놀이")
+
+
+def synthetic_rows(count, seed):
+    rng = random.Random(seed)
+    situations = [s for group in catalog.AGE_SITUATIONS.values() for s in group]
+    for i in range(count):
+        situation = rng.choice(situations)
+        reason = rng.choice(REASONS)
+        if rng.random() < 0.02:
+            situation = f"{situation} {rng.choice(FLAGGED)}"
+        if rng.random() < 0.02:
+            reason = f"{rng.choice(FLAGGED)} {reason}"
+        yield {"id": f"b{i}", "situation": situation, "reason": reason}
+
+
+def write_input(path, count, seed):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in synthetic_rows(count, seed):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+def run_audit(*args):
+    # (줄/초, 최대 메모리 MB, 달라진 줄 수) ; 검사 도구가 마지막에 찍는 요약에서 읽어요
+    completed = subprocess.run([sys.executable, AUDIT_PATH, "--progress", "0", *args],
+                               capture_output=True, text=True, cwd=REPO_ROOT, check=True)
+    out = completed.stdout
+    rate = float(re.search(r"처리량: ([\d,.]+)줄/초", out).group(1).replace(",", ""))
+    peak = float(re.search(r"최대 메모리 ([\d.]+)MB", out).group(1))
+    changed = re.search(r"중 ([\d,]+)줄이 달라졌어요", out)
+    return rate, peak, int(changed.group(1).replace(",", "")) if changed else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="학생 입력 일괄 검사 벤치마크")
+    parser.add_argument("--rows", type=int, default=500_000, help="스토리보드 수 (줄은 상황+이유로 두 배)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="audit_")
+    small = os.path.join(directory, "small.jsonl")
+    large = os.path.join(directory, "large.jsonl")
+    write_input(small, args.rows // 10, args.seed)
+    write_input(large, args.rows, args.seed)
+    print(f"입력: 스토리보드 {args.rows:,}개 (줄 {args.rows * 2:,}개), CPU {os.cpu_count()}개\n")
+
+    rows = []
+    results = {}
+    for workers in args.workers:
+        for label, path, count in (("1/10", small, args.rows // 10), ("전체", large, args.rows)):
+            output = os.path.join(directory, f"verdicts_{workers}_{label == '전체'}.jsonl")
+            rate, peak, _ = run_audit("--jsonl", path, "--workers", str(workers), "--output", output)
+            rows.append([workers, f"{count * 2:,}", f"{rate:,.0f}", f"{peak:.0f}"])
+            if label == "전체":
+                results[f"us_per_row_{workers}w"] = 1e6 / rate
+                results[f"peak_rss_mb_{workers}w"] = peak
+    print_table(rows, ["워커", "줄", "줄/초", "최대 메모리(MB)"])
+
+    previous = os.path.join(directory, f"verdicts_{args.workers[0]}_True.jsonl")
+    _, _, changed = run_audit("--jsonl", large, "--workers", str(args.workers[0]), "--previous", previous)
+    print(f"\n같은 입력 다시 검사: 달라진 줄 {changed}")
+    failed = changed != 0
+
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import argparse
+
+from bench.common import REPO_ROOT, print_table, save_baseline, load_baseline, compare_to_baseline
+from bench.scene_parse import load_corpus
+
+import output_filter
+import scene_parser
+from gemini_stub import estimate_tokens
+
+# 안전 필터: 응답 전체를 버리던 예전 방식과 걸린 문장만 지우는 output_filter 비교
+# 응답 모음(bench/corpus/scene_responses.json, flagged_outputs.json + 기록 파일의 장면 요약 응답)마다
+# - 예전: 막는 낱말이 하나라도 있으면 응답을 통째로 버리고 기본 문장으로 대신해요 (다시 만들 토큰 = 응답 전체)
+# - 지금: 걸린 문장만 지우고, 문장이 다 지워진 컷만 다시 요청해요 (다시 만들 토큰 = 그 컷들의 토큰)
+# 기본 문장으로 대신한 비율(대체율)과 다시 만들어야 하는 토큰 수를 비교해요.
+# 문장이 다 지워진 컷(번호만 남은 "2.")은 scene_parser가 빠진 컷으로 돌려줘야 다시 요청돼요.
+# 컷마다 따로 고쳐 본 결과와 다르면 실패하고, --check에서는 다시 요청할 컷이 0으로 떨어져도 실패해요
+# (compare_to_baseline은 늘어난 것만 잡아서, 지운 컷을 놓치면 오히려 좋아진 것처럼 보여요).
+#
+#   python -m bench.output_filter
+#   python -m bench.output_filter --verbose
+#   python -m bench.output_filter --check
+
+FLAGGED_PATH = os.path.join(REPO_ROOT, "bench", "corpus", "flagged_outputs.json")
+BASELINE_NAME = "output_filter"
+
+
+def legacy_blocked(text):
+    # 예전 ask_gemini의 낱말 검사 (예외 낱말 없이 부분 문자열)
+    return any(word in text for word in output_filter.BLOCKLIST)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="안전 필터: 전체 버리기 대 문장 단위 고치기")
+    parser.add_argument("--fixture-dir", default=os.environ.get("GEMINI_FIXTURE_DIR", "fixtures/gemini"))
+    parser.add_argument("--verbose", action="store_true", help="걸린 응답마다 결과 출력")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.fixture_dir)
+    with open(FLAGGED_PATH, encoding="utf-8") as f:
+        corpus += json.load(f)
+
+    legacy = {"flagged": 0, "fallback": 0, "tokens": 0}
+    new = {"flagged": 0, "fallback": 0, "tokens": 0, "panels": 0}
+    leaks = []
+    unrequested = []
+    rows = []
+    for item in corpus:
+        text = item["text"]
+        if legacy_blocked(text):
+            legacy["flagged"] += 1
+            legacy["fallback"] += 1
+            legacy["tokens"] += estimate_tokens(text)
+
+        before = scene_parser.parse_scenes(text)
+        repaired = output_filter.repair(text, "scenes")
+        if repaired != text:
+            new["flagged"] += 1
+        after = scene_parser.parse_scenes(repaired) if repaired else {}
+        if repaired and output_filter.blocked_words(repaired):
+            leaks.append(item["label"])
+        # 원래 있던 컷 중 필터가 지운 컷만 다시 요청해요 (원래 빠져 있던 컷은 필터 탓이 아니니 빼요)
+        lost = [number for number in before if number not in after]
+        emptied = [number for number in before if output_filter.repair_text(before[number])[0] is None]
+        if repaired and lost != emptied:
+            unrequested.append(f"{item['label']}: 다 지워진 컷 {emptied}, 빠진 컷 {lost}")
+        new["panels"] += len(lost)
+        new["tokens"] += sum(estimate_tokens(before[number]) for number in lost)
+        if before and not after:
+            new["fallback"] += 1
+        if legacy_blocked(text) or repaired != text:
+            rows.append([item["label"], "버림", f"{len(lost)}컷 다시" if after else "버림"])
+
+    if args.verbose:
+        print_table(rows, ["응답", "예전", "output_filter"])
+        print()
+    total = len(corpus)
+    print(f"응답 {total}개, 예전 방식에 걸린 응답 {legacy['flagged']}개, 지금 걸린 응답 {new['flagged']}개")
+    print_table([
+        ["예전 (전체 버림)", f"{legacy['fallback'] / total:.1%}", legacy["tokens"], "-"],
+        ["output_filter", f"{new['fallback'] / total:.1%}", new["tokens"], new["panels"]],
+    ], ["필터", "기본 문장 대체율", "다시 만들 토큰", "다시 요청할 컷"])
+    for label in leaks:
+        print(f"[누출] 고친 글에 막는 낱말이 남음: {label}")
+    for line in unrequested:
+        print(f"[빈 컷] 다시 요청되지 않음 - {line}")
+
+    results = {
+        "fallback_rate": new["fallback"] / total,
+        "regenerated_tokens": new["tokens"],
+        "regenerated_panels": new["panels"],
+    }
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        baseline = load_baseline(BASELINE_NAME)
+        for key in ("regenerated_tokens", "regenerated_panels"):
+            old = baseline["metrics"].get(key) if baseline else None
+            if old and not results[key]:
+                regressions.append(f"{key}: {old:.4g} -> 0 (지운 컷을 빠진 컷으로 못 찾았어요)")
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        if regressions:
+            return 1
+    return 1 if leaks or unrequested else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+from bench.common import print_table, save_baseline, compare_to_baseline
+from bench.loadtest import APP_PATH, student_actions
+
+import metrics
+import gemini_stub
+
+# 재실행(rerun)마다 브라우저로 보내는 요소 크기와 CPU 시간 측정
+# 학생 한 명의 1→5단계 흐름을 따라가며 각 실행 후 화면 트리의 protobuf 크기를 더하고,
+# 앱 안의 metrics 기록으로 앱 전체가 다시 실행됐는지 fragment만 실행됐는지 구분해요.
+# 브라우저 렌더링 시간은 여기서 잴 수 없으니 개발자 도구의 Performance 탭으로 확인하세요.
+#
+#   python -m bench.rerun_payload
+#   python -m bench.rerun_payload --check
+
+BASELINE_NAME = "rerun_payload"
+
+
+def tree_bytes(node):
+    total = 0
+    proto = getattr(node, "proto", None)
+    if proto is not None and hasattr(proto, "ByteSize"):
+        total += proto.ByteSize()
+    for child in getattr(node, "children", {}).values():
+        total += tree_bytes(child)
+    return total
+
+
+def rerun_scope():
+    # 이번 상호작용에서 앱 전체가 실행됐는지, 어떤 fragment만 실행됐는지 알려줘요
+    counters = metrics.snapshot()["counters"]
+    if "rerun.app.count" in counters:
+        return "app"
+    fragments = sorted(name[:-len(".count")] for name in counters if name.startswith("fragment."))
+    return ",".join(fragments) or "-"
+
+
+def timed_run(at):
+    metrics.reset()
+    started = time.process_time()
+    at.run()
+    return (time.process_time() - started) * 1000, rerun_scope()
+
+
+def measure(seed=7):
+    from streamlit.testing.v1 import AppTest
+
+    server, base_url = gemini_stub.start_server(seed=seed)
+    os.environ["GEMINI_BASE_URL"] = base_url
+    os.environ["GEMINI_API_KEY"] = "stub"
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    cpu_ms, scope = timed_run(at)
+    results = {"step1:load": (tree_bytes(at._tree), cpu_ms, scope)}
+    for step, name, action in student_actions(random.Random(seed)):
+        action(at)
+        cpu_ms, scope = timed_run(at)
+        results[f"step{step}:{name}"] = (tree_bytes(at._tree), cpu_ms, scope)
+    server.shutdown()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="재실행당 전송 바이트와 CPU 시간 측정")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = measure()
+    rows = [[label, size, f"{cpu_ms:.1f}", scope] for label, (size, cpu_ms, scope) in results.items()]
+    print_table(rows, ["단계:동작", "bytes", "CPU(ms)", "실행 범위"])
+    print(f"평균: {sum(r[0] for r in results.values()) / len(results):.0f} bytes/rerun")
+
+    measured = {}
+    for label, (size, cpu_ms, _) in results.items():
+        measured[f"{label}.bytes"] = size
+        measured[f"{label}.cpu_ms"] = cpu_ms
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, measured)
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, measured, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+from bench.common import REPO_ROOT, print_table, save_baseline, compare_to_baseline
+
+from scene_parser import SceneParser, parse_scenes
+
+# 장면 요약 응답 해석 성공률
+# 응답 모음(bench/corpus/scene_responses.json + 기록 파일 폴더의 장면 요약 응답)을
+# 예전 방식(줄 맨 앞 "1." 정규식, 4개 미만이면 응답을 통째로 버리고 기본 문장)과 scene_parser로 각각 해석해요.
+# - 성공: 다시 요청하지 않고 네 장면을 모두 얻음
+# - 버린 호출: 응답에서 한 장면도 쓰지 못한 호출 (예전 방식은 4개 미만이면 전부 버려요)
+# - 추가 호출: 빠진 장면만 다시 요청하는 호출 (scene_parser만)
+# 스트리밍 조각 크기를 바꿔 넣어도 한 번에 넣은 것과 결과가 같은지도 확인해요.
+# 응답 모음에 "missing"(비어 있는 장면 번호)이 적힌 응답은 그 번호가 정확히 빠졌는지도 확인해요
+# (빈 장면에 다음 장면 글이 들어가면 다시 요청하지 않고 학생에게 그대로 보여요).
+#
+#   python -m bench.scene_parse
+#   python -m bench.scene_parse --fixture-dir fixtures/gemini
+#   python -m bench.scene_parse --check
+
+CORPUS_PATH = os.path.join(REPO_ROOT, "bench", "corpus", "scene_responses.json")
+BASELINE_NAME = "scene_parse"
+CHUNK_SIZES = (1, 3, 7, 24, 64)
+
+
+def legacy_parse(text):
+    # app.py가 예전에 쓰던 방식 그대로
+    scenes = []
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        if re.match(r'^\d+\.', line):
+            scene_text = re.sub(r'^\d+\.\s*', '', line).strip()
+            if scene_text:
+                scenes.append(scene_text)
+    return scenes if len(scenes) >= 4 else []
+
+
+def load_corpus(fixture_dir=None):
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+    if fixture_dir and os.path.isdir(fixture_dir):
+        for name in sorted(os.listdir(fixture_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(fixture_dir, name), encoding="utf-8") as f:
+                record = json.load(f)
+            system = "".join(part.get("text", "") for part in record["request"].get("systemInstruction", {}).get("parts", []))
+            if "4컷 만화의 각 장면" not in system:
+                continue
+            try:
+                text = record["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            except (KeyError, IndexError):
+                continue
+            corpus.append({"label": f"기록 {name[:8]}", "text": text})
+    return corpus
+
+
+def stream_parse(text, size):
+    parser = SceneParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="장면 요약 응답 해석 성공률")
+    parser.add_argument("--fixture-dir", default=os.environ.get("GEMINI_FIXTURE_DIR", "fixtures/gemini"),
+                        help="기록된 Gemini 응답 폴더 (있으면 장면 요약 응답을 함께 써요)")
+    parser.add_argument("--verbose", action="store_true", help="응답마다 결과 출력")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.fixture_dir)
+    legacy = {"complete": 0, "wasted": 0, "extra": 0}
+    new = {"complete": 0, "wasted": 0, "extra": 0}
+    mismatches = []
+    wrong = []
+    rows = []
+    for item in corpus:
+        text = item["text"]
+        old_scenes = legacy_parse(text)
+        legacy["complete"] += bool(old_scenes)
+        legacy["wasted"] += not old_scenes
+
+        scenes = parse_scenes(text)
+        missing = 4 - len(scenes)
+        new["complete"] += missing == 0
+        new["wasted"] += not scenes
+        new["extra"] += missing > 0
+        mismatches += [f"{item['label']} (조각 {size}자)" for size in CHUNK_SIZES if stream_parse(text, size) != scenes]
+        expected = item.get("missing")
+        if expected is not None and sorted(set(range(1, 5)) - set(scenes)) != expected:
+            wrong.append(f"{item['label']}: 빠진 장면 {sorted(set(range(1, 5)) - set(scenes))}, 기대 {expected}")
+        rows.append([item["label"], "O" if old_scenes else "X", f"{len(scenes)}/4"])
+
+    started = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        for item in corpus:
+            stream_parse(item["text"], 24)
+    per_response_us = (time.perf_counter() - started) / (rounds * len(corpus)) * 1e6
+
+    if args.verbose:
+        print_table(rows, ["응답", "예전", "scene_parser"])
+        print()
+    total = len(corpus)
+    print(f"응답 {total}개 (기본 모음 + 기록 파일)")
+    print_table([
+        ["예전 정규식", f"{legacy['complete'] / total:.0%}", legacy["wasted"], legacy["extra"]],
+        ["scene_parser", f"{new['complete'] / total:.0%}", new["wasted"], new["extra"]],
+    ], ["해석기", "한 번에 성공", "버린 호출", "빠진 장면 재요청"])
+    print(f"\n스트리밍 해석 (24자 조각): 응답당 {per_response_us:.0f}µs")
+    for mismatch in mismatches:
+        print(f"[불일치] 스트리밍 결과가 다름: {mismatch}")
+    for item in wrong:
+        print(f"[빈 장면] {item}")
+
+    results = {
+        "failure_rate": 1 - new["complete"] / total,
+        "wasted_calls": new["wasted"],
+        "parse_us_per_response": per_response_us,
+    }
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        if regressions:
+            return 1
+    return 1 if mismatches or wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
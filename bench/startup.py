@@ -0,0 +1,123 @@
+import os
+import re
+import ast
+import sys
+import argparse
+import subprocess
+
+from bench.common import REPO_ROOT, percentile, print_table, save_baseline, compare_to_baseline
+
+# 앱 시작 시간 측정
+# 1) python -X importtime 으로 app.py가 처음 실행될 때 불러오는 우리 모듈(과 그 아래 라이브러리)의 시간
+#    streamlit 자체는 서버가 먼저 불러 두니 빼고 재요
+# 2) 새 프로세스에서 AppTest로 첫 화면을 그리기까지 걸리는 시간 (스크립트 컴파일 + 모듈 불러오기 + 첫 실행)
+# 두 값 모두 예산(--import-budget, --render-budget)을 넘으면 실패해요.
+#
+#   python -m bench.startup
+#   python -m bench.startup --save-baseline
+#   python -m bench.startup --check
+
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+BASELINE_NAME = "startup"
+IMPORT_BUDGET_MS = 40
+RENDER_BUDGET_MS = 450
+
+FIRST_RENDER_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+print((time.perf_counter() - started) * 1000)
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def app_modules(path=APP_PATH):
+    # app.py가 불러오는 모듈 중 저장소 안에 있는 것들
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    local = [name for name in names if os.path.exists(os.path.join(REPO_ROOT, f"{name.split('.')[0]}.py"))]
+    return sorted(set(local))
+
+
+def import_times(modules):
+    # 돌려주는 값: (우리 모듈 전체 누적 시간 ms, [(모듈, 자체 ms, 누적 ms)] 오래 걸린 순)
+    code = "import streamlit\n" + "".join(f"import {name}\n" for name in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    started = False
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # streamlit을 다 불러온 다음 줄부터가 앱 모듈 몫이에요
+        if not started:
+            started = name == "streamlit" and not indent
+            continue
+        rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent)))
+    total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    heaviest = sorted(((name, own, cumulative) for name, own, cumulative, _ in rows), key=lambda row: -row[2])
+    return total, heaviest
+
+
+def first_render_ms():
+    result = subprocess.run([sys.executable, "-c", FIRST_RENDER_SCRIPT, APP_PATH],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="앱 시작 시간 측정")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, help="앱 모듈 불러오기 예산 (ms)")
+    parser.add_argument("--render-budget", type=float, default=RENDER_BUDGET_MS, help="첫 화면 예산 (ms)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 느려지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    modules = app_modules()
+    runs = [import_times(modules) for _ in range(args.repeats)]
+    import_ms = percentile([total for total, _ in runs], 50)
+    render_ms = percentile([first_render_ms() for _ in range(args.repeats)], 50)
+
+    print(f"앱 모듈: {', '.join(modules)}")
+    print_table([[name, f"{own:.1f}", f"{cumulative:.1f}"] for name, own, cumulative in runs[-1][1][:10]],
+                ["모듈", "자체(ms)", "누적(ms)"])
+    print(f"\n앱 모듈 불러오기 (streamlit 제외, 중앙값): {import_ms:.1f}ms / 예산 {args.import_budget:.0f}ms")
+    print(f"첫 화면까지 (새 프로세스, 중앙값): {render_ms:.0f}ms / 예산 {args.render_budget:.0f}ms")
+
+    failed = False
+    if import_ms > args.import_budget:
+        print("[예산 초과] 앱 모듈 불러오기")
+        failed = True
+    if render_ms > args.render_budget:
+        print("[예산 초과] 첫 화면")
+        failed = True
+
+    results = {"app_import_ms": import_ms, "first_render_ms": render_ms}
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
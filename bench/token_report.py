@@ -0,0 +1,205 @@
+import sys
+import time
+import argparse
+
+from bench.common import print_table
+
+import prompts
+import gemini_client
+from gemini_stub import estimate_tokens
+
+# 스토리보드 한 개당 토큰 보고서
+# 예전 방식(모든 지시문을 매번 본문에 넣고 생성 설정 없이 보내던 호출)과
+# 지금 방식(systemInstruction + 짧은 본문 + 목적별 generationConfig)을 비교해요.
+# 기본은 입력 토큰의 오프라인 추정치이고, --live를 주면 GEMINI_BASE_URL/GEMINI_API_KEY로 실제 호출해서
+# usageMetadata의 입력/출력 토큰 수와 지연 시간을 비교해요 (대역 서버도 가능).
+#
+#   python -m bench.token_report
+#   GEMINI_API_KEY=... python -m bench.token_report --live
+
+SAMPLE = {
+    "age_group": "초등학교 3~4학년",
+    "gender": "여자",
+    "situation": "체육시간에 피구를 하다가 공에 맞아서 넘어졌어요",
+    "emotion": "부끄러움",
+    "reason": "모두가 보는 앞에서 넘어져서 창피했기 때문이에요",
+    "scenes": [
+        "주인공이 친구들과 피구를 시작합니다",
+        "날아온 공에 맞아 주인공이 넘어집니다",
+        "친구들의 시선에 주인공의 얼굴이 빨개집니다",
+        "친구가 손을 내밀어 주인공을 일으켜 줍니다",
+    ],
+}
+
+
+def legacy_situation_check(s):
+    return f"""
+다음 텍스트가 초등학생에게 적합한지 문맥을 고려하여 판단해주세요:
+
+텍스트: "{s['situation']}"
+
+판단 기준:
+- 문맥상 폭력적이거나 위험한 의도가 있는가?
+- 문맥상 욕설이나 혐오 표현의 의도가 있는가?
+- 문맥상 성적이거나 부적절한 내용인가?
+- 정치적 인물이나 논란적 내용인가?
+- 의미있는 교육적 상황인가?
+- 초등학생 교육환경에 적합한가?
+
+문맥 예시:
+- "친구와 죽 먹기" → 적합 (음식을 먹는 이야기)
+- "괴물을 죽이기" → 부적절 (폭력적 내용)
+- "김정은 만나기" → 부적절 (정치적 인물)
+- "시험을 망쳤어" → 적합 (학교 상황 표현)
+- "선생님이 미쳤다고 했어" → 부적절 (부적절한 표현)
+
+문맥상 의미를 종합적으로 고려하여 "적합" 또는 "부적절" 중 하나로만 답변하세요.
+특히 욕설의 변형이나 은어, 부적절한 표현이 숨어있는지 주의깊게 살펴보세요:
+"""
+
+
+def legacy_reason_check(s):
+    return f"""
+다음 감정의 이유가 초등학생에게 적합한지 문맥을 고려하여 판단해주세요:
+
+텍스트: "{s['reason']}"
+
+판단 기준:
+- 문맥상 폭력적이거나 위험한 의도가 있는가?
+- 문맥상 욕설이나 혐오 표현의 의도가 있는가?
+- 문맥상 성적이거나 부적절한 내용인가?
+- 정치적 인물이나 논란적 내용인가?
+- 의미있는 감정 표현인가?
+- 초등학생 교육환경에 적합한가?
+
+문맥 예시:
+- "죽도록 열심히 했는데" → 적합 (열심히 노력했다는 의미)
+- "친구를 죽이고 싶었어" → 부적절 (폭력적 표현)
+- "미친듯이 기뻤어" → 적합 (매우 기뻤다는 의미)
+- "선생님이 미쳤다고 생각해" → 부적절 (비하 표현)
+
+문맥상 의미를 종합적으로 고려하여 "적합" 또는 "부적절" 중 하나로만 답변하세요:
+"""
+
+
+def legacy_scene_summary(s):
+    return f"""
+나이대: {s['age_group']}
+상황: {s['situation']}
+감정: {s['emotion']}
+이유: {s['reason']}
+
+위 정보를 바탕으로 4컷 만화의 각 장면을 간단명료하게 설명해주세요.
+각 장면은 한 문장으로, 번호와 함께 작성해주세요.
+
+다음 형식으로 작성해주세요:
+1. [첫 번째 장면 설명]
+2. [두 번째 장면 설명]
+3. [세 번째 장면 설명]
+4. [네 번째 장면 설명]
+"""
+
+
+def legacy_panel_prompt(s, i, scene):
+    return f"""
+다음 정보로 K-6 학생용 안전한 단일 장면 이미지 생성용 영어 프롬프트를 만들어주세요:
+
+캐릭터 정보:
+- 나이대: {s['age_group']}
+- 성별: {s['gender']}
+- 상황: {s['situation']}
+- 감정: {s['emotion']}
+- 이 장면: {scene}
+
+안전 요구사항 (반드시 준수):
+1. K-6 학생에게 적합한 건전한 내용만
+2. 폭력, 성적 내용, 위험한 행동 절대 금지
+3. 교육적이고 긍정적인 내용
+4. 학교 환경에 적합한 상황
+
+기술 요구사항:
+1. 단일 장면만 묘사 (4컷 중 {i+1}번째 컷)
+2. 동일한 캐릭터가 4개 프롬프트 모두에 등장
+3. 일관된 화풍 유지 (cute anime/manga style)
+4. 영어로 작성
+5. 한국 초등학생 캐릭터
+
+안전하고 교육적인 프롬프트만 간결하게 출력해주세요:
+"""
+
+
+def storyboard_calls(s):
+    # (호출 종류, 예전 프롬프트, 지금 요청 인자) 목록: 스토리보드 한 개에 드는 호출 전부
+    calls = [
+        ("situation_check", legacy_situation_check(s), prompts.request(prompts.SITUATION_CHECK, text=s["situation"])),
+        ("reason_check", legacy_reason_check(s), prompts.request(prompts.REASON_CHECK, text=s["reason"])),
+        ("scene_summary", legacy_scene_summary(s), prompts.request(
+            prompts.SCENE_SUMMARY, age_group=s["age_group"], situation=s["situation"],
+            emotion=s["emotion"], reason=s["reason"])),
+    ]
+    for i, scene in enumerate(s["scenes"]):
+        calls.append(("panel_prompt", legacy_panel_prompt(s, i, scene), prompts.request(
+            prompts.PANEL_PROMPT, age_group=s["age_group"], gender=s["gender"], situation=s["situation"],
+            emotion=s["emotion"], index=i + 1, scene=scene)))
+    return calls
+
+
+def estimate(calls):
+    # (호출, 이전 입력, 현재 입력, 이전 출력, 현재 출력, 이전 지연, 현재 지연)
+    rows = []
+    for name, legacy, current in calls:
+        before = estimate_tokens(legacy)
+        after = estimate_tokens(current["system_instruction"]) + estimate_tokens(current["prompt"])
+        rows.append((name, before, after, 0, 0, 0.0, 0.0))
+    return rows
+
+
+def measure_live(calls):
+    def send(data):
+        started = time.perf_counter()
+        result = gemini_client.post_generate(gemini_client.DEFAULT_MODEL, data)
+        usage = result.get("usageMetadata", {})
+        return usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0), time.perf_counter() - started
+
+    rows = []
+    for name, legacy, current in calls:
+        before_in, before_out, before_latency = send(gemini_client.build_request(legacy))
+        after_in, after_out, after_latency = send(gemini_client.build_request(
+            current["prompt"], current["system_instruction"],
+            gemini_client.GENERATION_PROFILES.get(current["purpose"])))
+        rows.append((name, before_in, after_in, before_out, after_out, before_latency, after_latency))
+    return rows
+
+
+def percent_saved(before, after):
+    return f"{(1 - after / before) * 100:.0f}%" if before else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스토리보드당 토큰 보고서")
+    parser.add_argument("--live", action="store_true", help="설정된 Gemini 주소로 실제 호출해서 측정")
+    args = parser.parse_args(argv)
+
+    calls = storyboard_calls(SAMPLE)
+    if args.live:
+        gemini_client.configure_from_env()
+        rows = measure_live(calls)
+    else:
+        rows = estimate(calls)
+
+    print_table(
+        [[name, bi, ai, percent_saved(bi, ai), bo, ao, percent_saved(bo, ao), f"{bl * 1000:.0f}", f"{al * 1000:.0f}"]
+         for name, bi, ai, bo, ao, bl, al in rows],
+        ["호출", "이전 입력", "현재 입력", "절감", "이전 출력", "현재 출력", "절감", "이전(ms)", "현재(ms)"],
+    )
+    before_in, after_in = sum(r[1] for r in rows), sum(r[2] for r in rows)
+    print(f"\n스토리보드당 입력 토큰: {before_in} -> {after_in} ({percent_saved(before_in, after_in)} 절감)")
+    if args.live:
+        before_out, after_out = sum(r[3] for r in rows), sum(r[4] for r in rows)
+        print(f"스토리보드당 출력 토큰: {before_out} -> {after_out} ({percent_saved(before_out, after_out)} 절감)")
+        print(f"스토리보드당 지연 시간 합: {sum(r[5] for r in rows):.2f}초 -> {sum(r[6] for r in rows):.2f}초")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+from bench.common import print_table, save_baseline, compare_to_baseline
+from bench.loadtest import run_student, stub_stats
+
+import gemini_stub
+from shared_state import SharedStore
+
+# 워커 수에 따른 처리량 (1 → N)
+# 1) 공유 저장소 자체: 워커 N개가 동시에 jobs/rate/sessions를 읽고 쓸 때 초당 처리 수
+# 2) 앱 전체: 학생 --students명을 워커 N개에 나눠 맡기고(워커 안에서는 한 명씩), 같은 공유 저장소와
+#    대역 서버로 1→5단계를 끝내는 데 걸린 시간과 업스트림 호출 수
+# CPU가 하나뿐인 기계에서는 워커를 늘려도 CPU 몫은 늘지 않으니, 결과를 볼 때 코어 수를 같이 보세요.
+#
+#   python -m bench.worker_scaling --workers 1,2,4
+#   python -m bench.worker_scaling --workers 1,2,4 --save-baseline
+#   python -m bench.worker_scaling --workers 1,2,4 --check
+
+BASELINE_NAME = "worker_scaling"
+
+
+def store_worker(path, seconds, seed, results):
+    store = SharedStore(path)
+    rng = random.Random(seed)
+    operations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        key = rng.randrange(200)
+        store.run_once(f"bench:{key}", lambda: {"text": "적합"})
+        store.rate_hit("bench", 10 ** 9)
+        token = f"student-{rng.randrange(50)}"
+        store.save_session(token, {"step": rng.randrange(1, 6)})
+        store.load_session(token)
+        operations += 4
+    results.put(operations)
+
+
+def measure_store(workers, seconds):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    path = os.path.join(tempfile.mkdtemp(prefix="shared_state_"), "state.db")
+    SharedStore(path)
+    processes = [context.Process(target=store_worker, args=(path, seconds, i, results)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / seconds
+
+
+def app_worker(indexes, seed, results):
+    # 워커 하나 = 프로세스 하나 ; 맡은 학생들을 차례로 처리해요
+    # run_student는 행동마다 생각 시간을 내보내는 제너레이터라 끝까지 돌린 다음 결과를 보내요
+    for index in indexes:
+        report = {"timings": {}, "errors": [], "completed": 0, "memory": {}}
+        try:
+            for pause in run_student(index, 1, 0.0, seed, report):
+                time.sleep(pause)
+        except Exception as e:
+            report["errors"].append(f"학생 {index}: {e}")
+        results.put(report)
+
+
+def measure_app(workers, students, latency, seed, shared):
+    server, base_url = gemini_stub.start_server(latency=latency, seed=seed)
+    os.environ["GEMINI_BASE_URL"] = base_url
+    os.environ["GEMINI_API_KEY"] = "stub"
+    os.environ["GEMINI_MODE"] = "live"
+    if shared:
+        os.environ["SHARED_STATE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="shared_state_"), "state.db")
+    else:
+        os.environ.pop("SHARED_STATE_PATH", None)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [context.Process(target=app_worker, args=(list(range(i, students, workers)), seed, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in range(students)]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+    calls = stub_stats(base_url)["requests"]
+    server.shutdown()
+    return {
+        "storyboards": sum(report["completed"] for report in reports),
+        "errors": [error for report in reports for error in report["errors"]],
+        "wall": wall,
+        "upstream_calls": calls,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="워커 수에 따른 처리량")
+    parser.add_argument("--workers", default="1,2,4", help="워커 수 목록 (쉼표 구분)")
+    parser.add_argument("--students", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0, help="공유 저장소 측정 시간 (초)")
+    parser.add_argument("--latency", default="fixed:0.3", help="대역 서버 지연 시간 분포")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-shared", action="store_true", help="공유 저장소 없이 (비교용)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="기준값보다 tolerance 이상 나빠지면 실패")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    levels = [int(n) for n in args.workers.split(",")]
+    print(f"CPU {os.cpu_count()}개, 학생 {args.students}명, 대역 서버 지연 {args.latency}, "
+          f"공유 저장소 {'없음' if args.no_shared else '사용'}")
+    rows = []
+    results = {}
+    errors = []
+    for workers in levels:
+        store_ops = measure_store(workers, args.seconds)
+        app = measure_app(workers, args.students, args.latency, args.seed, not args.no_shared)
+        per_minute = app["storyboards"] / app["wall"] * 60
+        errors += app["errors"]
+        rows.append([workers, f"{store_ops:.0f}", f"{app['wall']:.1f}", f"{per_minute:.1f}",
+                     f"{app['upstream_calls'] / max(app['storyboards'], 1):.2f}"])
+        results[f"w{workers}.seconds_per_class"] = app["wall"]
+        # 값이 클수록 나쁜 지표로 맞춰서 저장해요
+        results[f"w{workers}.ms_per_store_op"] = 1000 / store_ops if store_ops else 0.0
+    print_table(rows, ["워커", "저장소 작업/초", "학급 전체(초)", "스토리보드/분", "스토리보드당 호출"])
+    for error in errors:
+        print(f"[오류] {error}")
+
+    if args.save_baseline:
+        save_baseline(BASELINE_NAME, results)
+        print("기준값을 저장했어요.")
+    if args.check:
+        regressions = compare_to_baseline(BASELINE_NAME, results, args.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}")
+        if regressions:
+            return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+from types import MappingProxyType
+
+# 여러 세션이 함께 쓰는 고정 표 (감정, 화풍, 나이대별 상황)
+# app.py는 실행될 때마다 처음부터 다시 돌기 때문에, 고정 표는 이 모듈에 한 번만 만들어 두고
+# 모든 세션이 복사하지 않고 같은 객체를 읽어요. 바꿀 수 없는 tuple/MappingProxyType으로 만들어요.
+# 찾기용 색인(감정→신호등, 화풍→프롬프트, 감정 비슷한 말→대표 감정)도 import 때 한 번만 만들어요.
+
+AGE_GROUPS = ("초등학교 1~2학년", "초등학교 3~4학년", "초등학교 5~6학년", "교사")
+
+AGE_DESCRIPTIONS = MappingProxyType({
+    "초등학교 1~2학년": "🌟 간단하고 귀여운 스타일의 만화를 만들어요!",
+    "초등학교 3~4학년": "🎨 조금 더 자세하고 재미있는 스토리를 만들어요!",
+    "초등학교 5~6학년": "📖 감정 표현이 풍부하고 깊이 있는 만화를 만들어요!",
+    "교사": "🎓 교육용으로 활용할 수 있는 전문적인 스토리보드를 만들어요!",
+})
+
+POSITIVE_EMOTIONS = ("기쁨", "행복", "감사", "뿌듯함", "만족", "희망", "신남", "설렘", "평온", "자신감")
+NEGATIVE_EMOTIONS = ("슬픔", "화남", "답답함", "걱정", "두려움", "실망", "부끄러움", "외로움", "스트레스", "짜증")
+
+ART_STYLES = MappingProxyType({
+    "귀여운 애니메이션": MappingProxyType({"emoji": "🌟", "desc": "지브리, 디즈니 같은 부드럽고 따뜻한 스타일"}),
+    "한국 웹툰": MappingProxyType({"emoji": "📱", "desc": "네이버 웹툰 같은 깔끔하고 현대적인 스타일"}),
+    "3D 캐릭터": MappingProxyType({"emoji": "🎭", "desc": "픽사, 토이스토리 같은 입체적이고 생동감 있는 스타일"}),
+    "피규어 형태": MappingProxyType({"emoji": "🧸", "desc": "레고, 플레이모빌 같은 귀여운 장난감 스타일"}),
+    "낙서 형태": MappingProxyType({"emoji": "✏️", "desc": "공책에 그린 듯한 자유롭고 친근한 손그림 스타일"}),
+    "수채화": MappingProxyType({"emoji": "🖼️", "desc": "부드럽고 몽환적인 수채화 일러스트 스타일"}),
+    "동화책": MappingProxyType({"emoji": "📚", "desc": "따뜻하고 상상력 가득한 동화책 삽화 스타일"}),
+    "실제 사진": MappingProxyType({"emoji": "📸", "desc": "실제 아이들이 연기하는 사진 스타일"}),
+    "인형극": MappingProxyType({"emoji": "🎪", "desc": "인형이나 마네킹을 이용한 인형극 사진 스타일"}),
+    "클레이 모델": MappingProxyType({"emoji": "🏺", "desc": "찰흙이나 클레이로 만든 캐릭터 사진 스타일"}),
+})
+
+DEFAULT_STYLE_PROMPT = "cute anime/manga style"
+
+STYLE_PROMPTS = MappingProxyType({
+    "귀여운 애니메이션": "Studio Ghibli style, Disney animation style, soft colors, magical atmosphere",
+    "한국 웹툰": "Korean webtoon style, clean lines, vibrant colors, modern digital art",
+    "3D 캐릭터": "Pixar 3D animation style, volumetric lighting, detailed textures, playful 3D characters",
+    "피규어 형태": "LEGO minifigure style, Playmobil toy style, cute figurine aesthetic",
+    "낙서 형태": "Hand-drawn doodle style, sketch-like, casual drawing, notebook doodle aesthetic",
+    "수채화": "Watercolor illustration, soft brushstrokes, gentle colors, dreamy atmosphere",
+    "동화책": "Children's book illustration, storybook art style, warm and cozy",
+    "실제 사진": "Real photography, candid photo of children, natural lighting, documentary style",
+    "인형극": "Puppet show photography, marionette style, theatrical lighting, stage setting",
+    "클레이 모델": "Clay animation style, stop-motion photography, plasticine characters",
+})
+
+AGE_SITUATIONS = MappingProxyType({
+    "초등학교 1~2학년": (
+        "급식시간에 좋아하는 반찬이 나왔을 때",
+        "친구와 놀이터에서 함께 놀았을 때",
+        "선생님께 칭찬을 받았을 때",
+        "새로운 친구와 인사를 나눴을 때",
+        "미술 시간에 그림을 그렸을 때",
+    ),
+    "초등학교 3~4학년": (
+        "체육시간에 피구를 하다가 공에 맞았을 때",
+        "숙제를 깜빡하고 학교에 왔을 때",
+        "시험에서 예상보다 좋은 점수를 받았을 때",
+        "친구와 다툰 후 화해했을 때",
+        "발표를 하는데 긴장되었을 때",
+    ),
+    "초등학교 5~6학년": (
+        "학급 임원 선거에서 떨어졌을 때",
+        "친한 친구가 다른 학교로 전학갔을 때",
+        "어려운 수학 문제를 혼자 풀었을 때",
+        "단체 활동에서 의견이 안 맞았을 때",
+        "졸업식을 앞두고 친구들과 시간을 보낼 때",
+    ),
+    "교사": (
+        "학생이 처음으로 어려운 개념을 이해했을 때",
+        "학급에서 갈등이 일어나 중재해야 할 때",
+        "공개수업을 앞두고 준비하는 상황",
+        "학부모와 상담하는 시간",
+        "동료 교사와 협업하여 프로젝트를 진행할 때",
+    ),
+})
+
+
+# 감정 신호등: 초록불(긍정), 빨간불(부정), 노란불(그 밖의 복잡한 감정)
+TRAFFIC_LIGHTS = MappingProxyType({
+    "positive": MappingProxyType({
+        "color": "🟢",
+        "status": "초록불",
+        "message": "건강하고 긍정적인 감정이에요! 이런 감정을 잘 표현하고 나누어보세요.",
+        "css_color": "#28a745",
+    }),
+    "negative": MappingProxyType({
+        "color": "🔴",
+        "status": "빨간불",
+        "message": "힘들고 어려운 감정이네요. 이런 감정은 혼자 담아두지 말고 선생님이나 부모님께 도움을 요청하는 것이 좋아요.",
+        "css_color": "#dc3545",
+    }),
+    "mixed": MappingProxyType({
+        "color": "🟡",
+        "status": "노란불",
+        "message": "복잡한 감정이에요. 천천히 생각해보고 감정을 정리해보세요.",
+        "css_color": "#ffc107",
+    }),
+})
+
+POSITIVE_SET = frozenset(POSITIVE_EMOTIONS)
+NEGATIVE_SET = frozenset(NEGATIVE_EMOTIONS)
+
+# 학생이 직접 적은 감정 표현 → 대표 감정 (띄어쓰기를 뺀 형태로 찾아요)
+EMOTION_SYNONYMS = MappingProxyType({
+    "기뻐": "기쁨", "기뻤어": "기쁨", "기뻤어요": "기쁨", "즐거움": "기쁨", "즐거워": "기쁨", "좋았어": "기쁨",
+    "행복해": "행복", "행복했어": "행복", "행복했어요": "행복",
+    "고마움": "감사", "고마워": "감사", "고마웠어": "감사",
+    "뿌듯해": "뿌듯함", "뿌듯했어": "뿌듯함", "자랑스러움": "뿌듯함",
+    "만족해": "만족", "만족스러움": "만족",
+    "기대": "희망", "기대됨": "희망",
+    "신나": "신남", "신났어": "신남", "재미있음": "신남", "재밌어": "신남",
+    "설레": "설렘", "설렜어": "설렘", "두근두근": "설렘",
+    "편안함": "평온", "차분함": "평온", "편안해": "평온",
+    "자신있음": "자신감", "자신있어": "자신감",
+    "슬퍼": "슬픔", "슬펐어": "슬픔", "슬펐어요": "슬픔", "속상함": "슬픔", "속상해": "슬픔", "서운함": "슬픔",
+    "화가남": "화남", "화났어": "화남", "분노": "화남", "화나": "화남",
+    "답답해": "답답함", "답답했어": "답답함",
+    "걱정돼": "걱정", "걱정됐어": "걱정", "불안": "걱정", "불안함": "걱정", "긴장": "걱정", "긴장됨": "걱정",
+    "무서움": "두려움", "무서워": "두려움", "무서웠어": "두려움", "겁남": "두려움",
+    "실망했어": "실망", "실망스러움": "실망", "아쉬움": "실망",
+    "부끄러워": "부끄러움", "창피함": "부끄러움", "창피해": "부끄러움", "쑥스러움": "부끄러움",
+    "외로워": "외로움", "외로웠어": "외로움", "쓸쓸함": "외로움",
+    "스트레스받음": "스트레스", "힘듦": "스트레스", "힘들어": "스트레스",
+    "짜증나": "짜증", "짜증났어": "짜증", "귀찮음": "짜증",
+})
+
+_CANONICAL = {emotion: emotion for emotion in POSITIVE_EMOTIONS + NEGATIVE_EMOTIONS}
+EMOTION_INDEX = MappingProxyType({**_CANONICAL, **EMOTION_SYNONYMS})
+
+EMOTION_VALENCE = MappingProxyType({
+    **{emotion: "positive" for emotion in POSITIVE_EMOTIONS},
+    **{emotion: "negative" for emotion in NEGATIVE_EMOTIONS},
+})
+
+
+def resolve_emotion(text):
+    # 대표 감정이면 그대로, 비슷한 말이면 대표 감정으로, 모르는 말이면 None
+    if not text:
+        return None
+    return EMOTION_INDEX.get(text.strip().replace(" ", ""))
+
+
+def emotion_valence(emotion):
+    return EMOTION_VALENCE.get(resolve_emotion(emotion), "mixed")
+
+
+def traffic_light(emotion):
+    return TRAFFIC_LIGHTS[emotion_valence(emotion)]
+
+
+def style_prompt(style_name):
+    return STYLE_PROMPTS.get(style_name, DEFAULT_STYLE_PROMPT)
+
+
+def situations_for(age_group):
+    return AGE_SITUATIONS.get(age_group, AGE_SITUATIONS[AGE_GROUPS[0]])
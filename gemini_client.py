@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import metrics
+import scheduler
+import output_filter
+
+# Gemini API 기본 주소 (로컬 대역 서버를 쓰려면 GEMINI_BASE_URL로 바꿔요)
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "models/gemini-1.5-pro-latest"
+
+# 기록/재생 모드: "live"(기본), "record"(실제 호출을 기록), "replay"(기록만 사용)
+GEMINI_MODES = ("live", "record", "replay")
+
+
+# 호출 목적별 생성 설정 (prompts.py의 purpose와 같은 이름)
+# 검사는 "적합/부적절" 한 단어, 장면 요약은 네 줄, 컷 프롬프트는 한 문단만 받으면 되니
+# 출력 길이를 막고 정지 문자열로 군더더기가 붙기 전에 끊어요
+GENERATION_PROFILES = {
+    "moderation": {
+        "candidateCount": 1,
+        "maxOutputTokens": 10,
+        "temperature": 0.0,
+    },
+    "scenes": {
+        "candidateCount": 1,
+        "maxOutputTokens": 320,
+        "temperature": 0.7,
+        "stopSequences": ["\n5."],
+    },
+    # 검사 결과와 장면을 정해진 JSON 모양으로 받아요 (온도는 검사가 흔들리지 않도록 낮게)
+    "storyboard": {
+        "candidateCount": 1,
+        "maxOutputTokens": 400,
+        "temperature": 0.3,
+        "responseMimeType": "application/json",
+        "responseSchema": {
+            "type": "OBJECT",
+            "properties": {
+                "situation": {"type": "STRING", "enum": ["적합", "부적절"]},
+                "reason": {"type": "STRING", "enum": ["적합", "부적절"]},
+                "scenes": {"type": "ARRAY", "items": {"type": "STRING"}},
+            },
+            "required": ["situation", "reason", "scenes"],
+            "propertyOrdering": ["situation", "reason", "scenes"],
+        },
+    },
+    "panel_prompt": {
+        "candidateCount": 1,
+        "maxOutputTokens": 200,
+        "temperature": 0.6,
+        "stopSequences": ["\n\n"],
+    },
+}
+
+
+class FixtureNotFound(Exception):
+    pass
+
+
+class BudgetExceeded(Exception):
+    # 하루 예산 단계(ledger.py) 때문에 보내지 않은 호출
+    pass
+
+
+class SendCancelled(Exception):
+    # before_send가 거짓을 돌려줘서 보내지 않은 호출 (본 요청이 먼저 가져간 미리 만들기)
+    pass
+
+
+BUDGET_MESSAGE = "[오류] 오늘 쓸 수 있는 AI 사용량에 가까워 간단한 방식으로 만들어요."
+
+
+# HTTP 클라이언트는 첫 호출 때 만들어요 (requests를 불러오는 데만 수십 ms가 걸려서 앱 시작을 늦춰요)
+# 한 번 만든 세션은 연결을 재사용해요
+_session = None
+_session_lock = threading.Lock()
+
+
+_config = {
+    "api_key": None,
+    "base_url": DEFAULT_BASE_URL,
+    "mode": "live",
+    "fixture_dir": "fixtures/gemini",
+    "timeout": 30,
+    # 여러 워커 모드의 공유 저장소 (shared_state.SharedStore) ; 없으면 프로세스마다 따로 호출해요
+    "shared": None,
+    # 사용량 장부 (ledger.Ledger) ; 있으면 실제로 나간 호출을 기록하고 하루 예산을 지켜요
+    "ledger": None,
+}
+
+# 같은 요청이면 같은 답이 나오는 호출(온도 0)은 워커끼리 결과를 나눠 써요
+SHARED_PURPOSES = ("moderation",)
+
+
+def configure(api_key=None, base_url=None, mode=None, fixture_dir=None, timeout=None, shared=None, ledger=None):
+    if api_key is not None:
+        _config["api_key"] = api_key
+    if base_url:
+        _config["base_url"] = base_url.rstrip("/")
+    if mode:
+        if mode not in GEMINI_MODES:
+            raise ValueError(f"알 수 없는 GEMINI_MODE: {mode}")
+        _config["mode"] = mode
+    if fixture_dir:
+        _config["fixture_dir"] = fixture_dir
+    if timeout is not None:
+        _config["timeout"] = timeout
+    if shared is not None:
+        _config["shared"] = shared
+    if ledger is not None:
+        _config["ledger"] = ledger
+
+
+def configure_from_env(environ=None):
+    environ = os.environ if environ is None else environ
+    configure(
+        api_key=environ.get("GEMINI_API_KEY"),
+        base_url=environ.get("GEMINI_BASE_URL"),
+        mode=environ.get("GEMINI_MODE"),
+        fixture_dir=environ.get("GEMINI_FIXTURE_DIR"),
+    )
+
+
+def http_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+
+                session = requests.Session()
+                # 동시에 나가는 호출 수(스케줄러 max_concurrent)보다 넉넉하게 연결을 모아 둬요
+                session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+                session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+                _session = session
+    return _session
+
+
+def get_config():
+    return dict(_config)
+
+
+def build_url(model, method="generateContent"):
+    return f"{_config['base_url']}/{model}:{method}?key={_config['api_key']}"
+
+
+def fixture_key(model, data):
+    # 같은 모델과 같은 요청 본문이면 같은 기록 파일을 사용해요
+    body = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{model}\n{body}".encode("utf-8")).hexdigest()[:32]
+
+
+def fixture_path(model, data, fixture_dir=None):
+    return os.path.join(fixture_dir or _config["fixture_dir"], f"{fixture_key(model, data)}.json")
+
+
+def save_fixture(model, data, result, fixture_dir=None):
+    path = fixture_path(model, data, fixture_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {"model": model, "request": data, "response": result}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fixture(model, data, fixture_dir=None):
+    path = fixture_path(model, data, fixture_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["response"]
+
+
+def post_generate(model, data):
+    # 모드에 따라 실제 API(또는 대역 서버)를 호출하거나 기록된 응답을 돌려줘요
+    mode = _config["mode"]
+    if mode == "replay":
+        result = load_fixture(model, data)
+        if result is None:
+            raise FixtureNotFound(fixture_key(model, data))
+        return result
+
+    headers = {"Content-Type": "application/json"}
+    response = http_session().post(build_url(model), headers=headers, data=json.dumps(data), timeout=_config["timeout"])
+    response.raise_for_status()
+    result = response.json()
+
+    if mode == "record":
+        save_fixture(model, data, result)
+    return result
+
+
+def post_stream(model, data, on_chunk):
+    # streamGenerateContent(SSE)로 받으면서 조각 글자마다 on_chunk(text)를 불러요
+    # 다 받으면 generateContent와 같은 모양으로 합쳐 돌려줘요 (기록 파일, 토큰 기록이 그대로 쓰여요)
+    mode = _config["mode"]
+    if mode == "replay":
+        result = post_generate(model, data)
+        on_chunk(result["candidates"][0]["content"]["parts"][0]["text"])
+        return result
+
+    headers = {"Content-Type": "application/json"}
+    url = build_url(model, "streamGenerateContent") + "&alt=sse"
+    texts = []
+    candidate = {"content": {"parts": [{"text": ""}], "role": "model"}, "index": 0}
+    result = {"candidates": [candidate]}
+    with http_session().post(url, headers=headers, data=json.dumps(data), timeout=_config["timeout"], stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            # 응답에 charset이 없어서 바이트를 직접 UTF-8로 풀어요
+            if not line.startswith(b"data:"):
+                continue
+            chunk = json.loads(line[5:].decode("utf-8"))
+            if "usageMetadata" in chunk:
+                result["usageMetadata"] = chunk["usageMetadata"]
+            for part_candidate in chunk.get("candidates", []):
+                if "finishReason" in part_candidate:
+                    candidate["finishReason"] = part_candidate["finishReason"]
+                text = "".join(part.get("text", "") for part in part_candidate.get("content", {}).get("parts", []))
+                if text:
+                    texts.append(text)
+                    on_chunk(text)
+    candidate["content"]["parts"][0]["text"] = "".join(texts)
+
+    if mode == "record":
+        save_fixture(model, data, result)
+    return result
+
+
+def build_request(prompt, system_instruction=None, generation_config=None):
+    data = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if system_instruction:
+        # 고정 지시문은 systemInstruction으로 분리해서 보내요 (prompts.py 참고)
+        data["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    if generation_config:
+        data["generationConfig"] = generation_config
+    return data
+
+
+def record_usage(purpose, result, elapsed, tenant=None, model=DEFAULT_MODEL):
+    # 호출 종류별 입력/출력 토큰 수와 지연 시간을 metrics에 남기고, 장부가 있으면 장부에도 써요 (재생은 비용이 없어 빼요)
+    usage = result.get("usageMetadata", {})
+    prompt_tokens = usage.get("promptTokenCount", 0)
+    output_tokens = usage.get("candidatesTokenCount", 0)
+    metrics.increment(f"gemini.{purpose}.calls")
+    metrics.observe(f"gemini.{purpose}.latency_ms", elapsed * 1000)
+    metrics.observe(f"gemini.{purpose}.prompt_tokens", prompt_tokens)
+    metrics.observe(f"gemini.{purpose}.output_tokens", output_tokens)
+    ledger = _config["ledger"]
+    if ledger is not None and _config["mode"] != "replay":
+        try:
+            ledger.record(purpose, tenant, model, prompt_tokens, output_tokens, elapsed * 1000)
+        except Exception:
+            # 장부에 못 써도 이미 받은 응답은 그대로 돌려줘요 (못 쓴 줄은 장부가 들고 있다가 다음에 써요)
+            metrics.increment("ledger.errors")
+
+
+def budget_state():
+    # "ok" / "soft" / "hard" (ledger.py 참고) ; 장부가 없거나 재생 모드면 늘 "ok"
+    ledger = _config["ledger"]
+    if ledger is None or _config["mode"] == "replay":
+        return "ok"
+    return ledger.state()
+
+
+def ask_gemini(prompt, model=DEFAULT_MODEL, system_instruction=None, purpose="other", tenant=None, on_chunk=None,
+               priority=None, before_send=None):
+    # on_chunk를 주면 스트리밍으로 받으면서 조각마다 불러요 (안전 필터는 다 받은 뒤 전체 글에 적용하니, 조각은 화면에 그대로 보여주지 마세요)
+    # priority를 주면 purpose 대신 그 우선순위로 줄을 서요 (미리 만들기는 "batch")
+    # before_send를 주면 스케줄러 자리를 받은 뒤 보내기 직전에 불러요 ; 거짓이면 보내지 않고 None을 돌려줘요
+    import requests  # 아래 except에서 씀 ; http_session()이 이미 불러 두었다면 바로 찾아요
+
+    try:
+        data = build_request(prompt, system_instruction, GENERATION_PROFILES.get(purpose))
+
+        def call():
+            # 하루 예산 단계에 걸리면 보내지 않아요 ; 공유 캐시에 같은 검사 결과가 있으면 run_once가 여기까지 오지 않고 돌려줘요
+            ledger = _config["ledger"]
+            if ledger is not None and _config["mode"] != "replay" and \
+                    not ledger.allows(purpose, priority or scheduler.priority_for(purpose)):
+                raise BudgetExceeded(purpose)
+            # 스케줄러가 우선순위와 학급 차례에 맞춰 내보내요 (scheduler.py 참고)
+            with scheduler.slot(purpose, tenant, priority=priority):
+                if before_send is not None and not before_send():
+                    raise SendCancelled(purpose)
+                started = time.perf_counter()
+                result = post_stream(model, data, on_chunk) if on_chunk else post_generate(model, data)
+            record_usage(purpose, result, time.perf_counter() - started, tenant, model)
+            return result
+
+        shared = _config["shared"]
+        if shared is not None and purpose in SHARED_PURPOSES:
+            # 다른 워커가 같은 검사를 하고 있거나 이미 했으면 그 결과를 받아요
+            result = shared.run_once(f"gemini:{fixture_key(model, data)}", call)
+        else:
+            result = call()
+        generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
+
+        # 막는 낱말이 든 문장만 지우고 나머지는 살려요 (output_filter.py)
+        generated_text = output_filter.repair(generated_text, purpose)
+        if generated_text is None:
+            return output_filter.SAFETY_MESSAGE
+
+        return generated_text
+
+    except requests.exceptions.Timeout:
+        return "[오류] 요청 시간이 초과되었습니다."
+    except requests.exceptions.RequestException as e:
+        return f"[오류] 네트워크 오류: {str(e)}"
+    except scheduler.QueueTimeout:
+        return "[오류] 지금 요청이 많아요. 잠시 후 다시 시도해주세요."
+    except FixtureNotFound:
+        return "[오류] 재생할 기록이 없습니다."
+    except SendCancelled:
+        return None
+    except BudgetExceeded:
+        # 앱은 이 응답이면 검사는 로컬 필터로, 장면과 컷 프롬프트는 기본 문장으로 이어 가요
+        return BUDGET_MESSAGE
+    except (KeyError, IndexError):
+        return "[오류] API 응답 형식이 올바르지 않습니다."
+    except Exception as e:
+        return f"[오류] 예상치 못한 오류: {str(e)}"
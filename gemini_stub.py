@@ -0,0 +1,274 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import gemini_client
+
+# 로컬 Gemini 대역 서버
+# 실제 API 키 없이 앱과 벤치마크를 오프라인으로 돌리기 위해 generateContent와
+# streamGenerateContent를 흉내 내요. 지연 시간 분포, 오류 비율, 429 폭주를 설정할 수 있어요.
+#
+#   python gemini_stub.py --port 8787 --latency lognormal:0.8,0.4 --error-rate 0.02
+#   GEMINI_BASE_URL=http://127.0.0.1:8787/v1beta streamlit run app.py
+
+ROUTE_PATTERN = re.compile(r"^/v1beta/(models/[^:/]+):(generateContent|streamGenerateContent)$")
+
+
+def parse_latency(spec):
+    # "fixed:0.2", "uniform:0.1,0.5", "lognormal:0.8,0.4"(중앙값 초, 시그마)
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"알 수 없는 지연 시간 분포: {spec}")
+
+
+def estimate_tokens(text):
+    # 대략적인 토큰 수 (한글은 글자당, 영어는 4글자당 1토큰 정도)
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return hangul + max(0, len(text) - hangul) // 4 + 1
+
+
+def canned_reply(prompt):
+    # 프롬프트 종류에 맞는 그럴듯한 답변을 돌려줘요
+    if "JSON으로만 답하세요" in prompt:
+        return json.dumps({
+            "situation": "적합",
+            "reason": "적합",
+            "scenes": [
+                "주인공이 교실에 들어서며 친구들과 인사합니다.",
+                "수업 중에 예상하지 못한 일이 일어납니다.",
+                "주인공이 그 일로 감정이 크게 흔들립니다.",
+                "친구와 이야기를 나누며 마음을 정리합니다.",
+            ],
+        }, ensure_ascii=False)
+    if "\"적합\" 또는 \"부적절\"" in prompt:
+        return "적합"
+    if "빠진 장면 번호:" in prompt:
+        numbers = re.findall(r"\d+", prompt.split("빠진 장면 번호:")[-1])
+        return "\n".join(f"{n}. 주인공이 {n}번째 장면에서 마음을 표현합니다." for n in numbers)
+    if "4컷 만화의 각 장면" in prompt:
+        return (
+            "1. 주인공이 교실에 들어서며 친구들과 인사합니다.\n"
+            "2. 수업 중에 예상하지 못한 일이 일어납니다.\n"
+            "3. 주인공이 그 일로 감정이 크게 흔들립니다.\n"
+            "4. 친구와 이야기를 나누며 마음을 정리합니다."
+        )
+    return (
+        "A cheerful Korean elementary school student in a bright classroom, "
+        "expressive face, soft pastel colors, child-friendly illustration"
+    )
+
+
+def prompt_text(data):
+    # systemInstruction도 입력 토큰에 들어가니 함께 합쳐요
+    parts = [part.get("text", "") for part in data.get("systemInstruction", {}).get("parts", [])]
+    for content in data.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def apply_generation_config(text, config):
+    # 정지 문자열과 maxOutputTokens를 실제 API처럼 반영해요
+    finish_reason = "STOP"
+    for stop in config.get("stopSequences", []):
+        if stop in text:
+            text = text[:text.index(stop)]
+    limit = config.get("maxOutputTokens")
+    if limit and estimate_tokens(text) > limit:
+        while text and estimate_tokens(text) > limit:
+            text = text[:-1]
+        finish_reason = "MAX_TOKENS"
+    return text, finish_reason
+
+
+def make_response(text, prompt, config=None):
+    text, finish_reason = apply_generation_config(text, config or {})
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": finish_reason,
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": estimate_tokens(prompt),
+            "candidatesTokenCount": estimate_tokens(text),
+            "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(text),
+        },
+    }
+
+
+class StubState:
+    def __init__(self, latency="fixed:0", error_rate=0.0, burst_every=0, burst_length=0,
+                 fixture_dir=None, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.fixture_dir = fixture_dir
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.stats = {"ok": 0, "error": 0, "rate_limited": 0, "fixture_hits": 0}
+
+    def next_outcome(self):
+        # 요청 순서에 따라 정상/429/500 중 하나를 정하고 지연 시간을 뽑아요
+        with self.lock:
+            index = self.request_count
+            self.request_count += 1
+            delay = max(0.0, self.sample_latency(self.rng))
+            if self.burst_every and index % self.burst_every < self.burst_length:
+                self.stats["rate_limited"] += 1
+                return 429, delay
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats["error"] += 1
+                return 500, delay
+            self.stats["ok"] += 1
+            return 200, delay
+
+    def lookup_fixture(self, model, data):
+        if not self.fixture_dir:
+            return None
+        result = gemini_client.load_fixture(model, data, self.fixture_dir)
+        if result is not None:
+            with self.lock:
+                self.stats["fixture_hits"] += 1
+        return result
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            with self.state.lock:
+                self.send_json(200, dict(self.state.stats, requests=self.state.request_count))
+            return
+        self.send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        match = ROUTE_PATTERN.match(parsed.path)
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+        if not match:
+            self.send_json(404, {"error": {"code": 404, "message": "not found"}})
+            return
+
+        model, method = match.groups()
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            self.send_json(400, {"error": {"code": 400, "message": "invalid JSON"}})
+            return
+
+        status, delay = self.state.next_outcome()
+        time.sleep(delay)
+        if status == 429:
+            self.send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+            return
+        if status == 500:
+            self.send_json(500, {"error": {"code": 500, "message": "Internal error", "status": "INTERNAL"}})
+            return
+
+        prompt = prompt_text(data)
+        result = self.state.lookup_fixture(model, data) or make_response(canned_reply(prompt), prompt, data.get("generationConfig"))
+
+        if method == "generateContent":
+            self.send_json(200, result)
+        else:
+            self.send_stream(result, sse=parse_qs(parsed.query).get("alt") == ["sse"])
+
+    def send_stream(self, result, sse):
+        # 응답 텍스트를 여러 조각으로 나눠 streamGenerateContent처럼 보내요
+        text = result["candidates"][0]["content"]["parts"][0]["text"]
+        pieces = [text[i:i + 24] for i in range(0, len(text), 24)] or [""]
+        chunks = []
+        for i, piece in enumerate(pieces):
+            chunk = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}]}
+            if i == len(pieces) - 1:
+                chunk["candidates"][0]["finishReason"] = "STOP"
+                if "usageMetadata" in result:
+                    chunk["usageMetadata"] = result["usageMetadata"]
+            chunks.append(chunk)
+
+        if sse:
+            body = "".join(f"data: {json.dumps(c, ensure_ascii=False)}\r\n\r\n" for c in chunks)
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps(chunks, ensure_ascii=False)
+            content_type = "application/json; charset=utf-8"
+        encoded = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    # 벤치마크에서 쓰기 쉽도록 백그라운드 스레드로 서버를 띄우고 base URL을 돌려줘요
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1beta"
+    return server, base_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 Gemini 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:초 | uniform:최소,최대 | lognormal:중앙값,시그마")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류를 돌려줄 비율 (0~1)")
+    parser.add_argument("--burst-every", type=int, default=0, help="N번째 요청마다 429 폭주 시작")
+    parser.add_argument("--burst-length", type=int, default=0, help="429 폭주 길이 (요청 수)")
+    parser.add_argument("--fixtures", default=os.environ.get("GEMINI_FIXTURE_DIR"), help="기록된 응답이 있으면 그대로 재생")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency, error_rate=args.error_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length,
+        fixture_dir=args.fixtures, seed=args.seed,
+    )
+    print(f"Gemini 대역 서버 실행 중: GEMINI_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import os
+import io
+import time
+import zlib
+import base64
+import struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from assets import AssetStore
+
+# 4컷 이미지 만들기
+# 컷별 프롬프트(scene_prompts)로 네 컷을 동시에 그리고, 한 장의 세로 만화로 이어 붙여요.
+# - 그리는 쪽(backend)은 바꿔 끼울 수 있어요: "openai"(DALL-E 3), "placeholder"(오프라인 확인용 단색 그림)
+# - 컷 그림과 미리보기는 assets.py 저장소에 넣고 프롬프트 해시로 찾아서, 같은 프롬프트는 다시 그리지 않아요
+# - 이어 붙일 때는 전체 그림을 메모리에 올리지 않고 컷 한 줄씩 읽어서 PNG 줄 단위로 바로 써요
+# Pillow와 requests는 그림을 실제로 다룰 때만 불러와요 (텍스트 단계만 쓰는 경우에는 필요 없어요)
+
+PANEL_SIZE = (1024, 1024)
+THUMBNAIL_SIZE = (256, 256)
+GUTTER = 24
+# 한 번에 압축기로 보내는 줄 수 (이 줄 수만큼의 가로 띠만 메모리에 있어요)
+TILE_ROWS = 64
+BACKGROUND = (255, 255, 255)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class ImageGenerationError(Exception):
+    pass
+
+
+class ImageBackend:
+    name = "base"
+
+    def generate(self, prompt, size):
+        # PNG 바이트를 돌려줘요
+        raise NotImplementedError
+
+
+class PlaceholderBackend(ImageBackend):
+    # 네트워크 없이 파이프라인을 확인할 때 쓰는 그림: 프롬프트 해시로 정한 색에 프롬프트 앞부분을 적어요
+    # delay를 주면 원격 API처럼 기다렸다가 돌려줘요 (벤치마크용)
+    name = "placeholder"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def generate(self, prompt, size):
+        from PIL import Image, ImageDraw
+
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        color = tuple(160 + b % 96 for b in digest[:3])
+        image = Image.new("RGB", size, color)
+        draw = ImageDraw.Draw(image)
+        words = prompt.split()
+        for row in range(0, min(len(words), 48), 8):
+            draw.text((16, 16 + row * 3), " ".join(words[row:row + 8]), fill=(40, 40, 40))
+        output = io.BytesIO()
+        image.save(output, format="PNG")
+        return output.getvalue()
+
+
+class OpenAIImageBackend(ImageBackend):
+    name = "openai"
+    URL = "https://api.openai.com/v1/images/generations"
+
+    def __init__(self, api_key, model="dall-e-3", timeout=120):
+        if not api_key:
+            raise ImageGenerationError("DALL_E_API_KEY가 설정되지 않았어요.")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+
+    def generate(self, prompt, size):
+        import requests
+
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        data = {
+            "model": self.model,
+            "prompt": prompt,
+            "n": 1,
+            "size": f"{size[0]}x{size[1]}",
+            "response_format": "b64_json",
+        }
+        try:
+            response = requests.post(self.URL, headers=headers, json=data, timeout=self.timeout)
+            response.raise_for_status()
+            return base64.b64decode(response.json()["data"][0]["b64_json"])
+        except requests.exceptions.RequestException as e:
+            raise ImageGenerationError(f"이미지 API 오류: {e}") from e
+        except (KeyError, IndexError, ValueError) as e:
+            raise ImageGenerationError("이미지 API 응답 형식이 올바르지 않습니다.") from e
+
+
+BACKENDS = {
+    "placeholder": PlaceholderBackend,
+    "openai": OpenAIImageBackend,
+}
+
+
+def get_backend(name, **options):
+    if name not in BACKENDS:
+        raise ValueError(f"알 수 없는 IMAGE_BACKEND: {name}")
+    return BACKENDS[name](**options)
+
+
+def warm_up():
+    # 첫 화면을 보낸 뒤 백그라운드에서 미리 불러 둘 때 써요
+    from PIL import Image, ImageDraw  # noqa: F401
+
+
+def build_panel_prompts(scene_prompts, style_prompt):
+    # 네 컷이 같은 화풍으로 그려지도록 컷마다 화풍 설명을 앞에 붙여요
+    return [f"{style_prompt}. {prompt}" for prompt in scene_prompts]
+
+
+def prompt_key(backend, prompt, size):
+    # 같은 그리는 쪽, 같은 크기, 같은 프롬프트면 같은 그림으로 봐요
+    text = f"{backend.name}\n{size[0]}x{size[1]}\n{prompt}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def make_thumbnail(panel):
+    # panel은 파일 경로나 파일처럼 읽히는 것 (AssetStore.open_mapped)
+    from PIL import Image
+
+    with Image.open(panel) as image:
+        image = image.convert("RGB")
+        image.thumbnail(THUMBNAIL_SIZE)
+        output = io.BytesIO()
+        image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def generate_panel(backend, prompt, size, store):
+    # 돌려주는 값: (컷 그림 이름, 미리보기 이름) ; 이름은 저장소 안의 내용 해시 파일 이름이에요
+    key = prompt_key(backend, prompt, size)
+    panel = store.resolve(f"panel-{key}")
+    if panel:
+        metrics.increment("images.panel.cache_hits")
+    else:
+        started = time.perf_counter()
+        data = backend.generate(prompt, size)
+        metrics.observe(f"images.{backend.name}.latency_ms", (time.perf_counter() - started) * 1000)
+        metrics.increment("images.panel.generated")
+        panel = store.put(data)
+        store.alias(f"panel-{key}", panel)
+    thumbnail = store.resolve(f"thumb-{key}")
+    if not thumbnail:
+        with store.open_mapped(panel) as mapped:
+            thumbnail = store.put(make_thumbnail(mapped))
+        store.alias(f"thumb-{key}", thumbnail)
+    return panel, thumbnail
+
+
+def generate_panels(backend, prompts, store, size=PANEL_SIZE, max_workers=4):
+    # 네 컷을 동시에 요청해요 (원격 API는 한 컷에 수십 초씩 걸려요)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda prompt: generate_panel(backend, prompt, size, store), prompts))
+    return [panel for panel, _ in results], [thumbnail for _, thumbnail in results]
+
+
+def png_chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+
+class PngStreamWriter:
+    # 8비트 RGB PNG를 줄 단위로 써요 (압축된 조각이 나오는 대로 IDAT 청크로 내보내요)
+    def __init__(self, f, width, height):
+        self.f = f
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+
+    def write_rows(self, rows):
+        # rows: 한 줄에 width*3 바이트인 줄들 ; 줄마다 필터 없음(0) 표시를 붙여요
+        data = self.compressor.compress(b"".join(b"\x00" + row for row in rows))
+        if data:
+            self.f.write(png_chunk(b"IDAT", data))
+
+    def close(self):
+        self.f.write(png_chunk(b"IDAT", self.compressor.flush()))
+        self.f.write(png_chunk(b"IEND", b""))
+
+
+def load_panel(path, size):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+    if image.size != size:
+        image = image.resize(size)
+    return image
+
+
+def composite_strip(panel_paths, out_path, size=PANEL_SIZE, columns=1, gutter=GUTTER):
+    # 컷들을 columns개씩 한 줄로 놓고 줄 단위로 이어 붙여요 (columns=1이면 세로 4컷)
+    # 메모리에는 지금 쓰는 한 줄의 컷들만 풀어서 올려요
+    started = time.perf_counter()
+    width, height = size
+    rows_of_panels = [panel_paths[i:i + columns] for i in range(0, len(panel_paths), columns)]
+    strip_width = columns * width + (columns + 1) * gutter
+    strip_height = len(rows_of_panels) * height + (len(rows_of_panels) + 1) * gutter
+    blank_row = bytes(BACKGROUND) * strip_width
+    gutter_bytes = bytes(BACKGROUND) * gutter
+
+    with open(out_path, "wb") as f:
+        writer = PngStreamWriter(f, strip_width, strip_height)
+        writer.write_rows([blank_row] * gutter)
+        for band in rows_of_panels:
+            panels = [load_panel(path, size) for path in band]
+            empty_line = bytes(BACKGROUND) * width
+            for top in range(0, height, TILE_ROWS):
+                bottom = min(top + TILE_ROWS, height)
+                # 컷마다 이 가로 띠만 바이트로 꺼내요
+                tiles = [panel.crop((0, top, width, bottom)).tobytes() for panel in panels]
+                rows = []
+                for y in range(bottom - top):
+                    parts = [gutter_bytes]
+                    for tile in tiles:
+                        parts.append(tile[y * width * 3:(y + 1) * width * 3])
+                        parts.append(gutter_bytes)
+                    for _ in range(columns - len(panels)):
+                        parts.append(empty_line)
+                        parts.append(gutter_bytes)
+                    rows.append(b"".join(parts))
+                writer.write_rows(rows)
+            del panels
+            writer.write_rows([blank_row] * gutter)
+        writer.close()
+    metrics.observe("images.strip.composite_ms", (time.perf_counter() - started) * 1000)
+    return out_path
+
+
+def make_strip(backend, scene_prompts, style_prompt, store=None, size=PANEL_SIZE, columns=1):
+    # 컷 프롬프트 → 네 컷 그림 → 한 장의 만화
+    # 돌려주는 값: {"strip": 만화 이름, "panels": 컷 이름들, "thumbnails": 미리보기 이름들}
+    store = store or AssetStore()
+    prompts = build_panel_prompts(scene_prompts, style_prompt)
+    panels, thumbnails = generate_panels(backend, prompts, store, size)
+    # 만화는 들어간 컷들과 배치가 같으면 같은 그림이에요
+    layout = f"{columns}\n{GUTTER}\n" + "|".join(panels)
+    strip_key = f"strip-{hashlib.sha256(layout.encode('utf-8')).hexdigest()[:32]}"
+    strip = store.resolve(strip_key)
+    if strip:
+        metrics.increment("images.strip.cache_hits")
+    else:
+        tmp_path = store.temp_path()
+        try:
+            composite_strip([store.path(panel) for panel in panels], tmp_path, size, columns)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        strip = store.put_file(tmp_path)
+        store.alias(strip_key, strip)
+    return {"strip": strip, "panels": panels, "thumbnails": thumbnails}
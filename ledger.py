@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+
+import metrics
+import shared_state
+
+# Gemini 사용량 장부 (비용과 지연 시간)
+# 실제로 나간 호출마다 usageMetadata의 입력/출력 토큰 수, 지연 시간, 호출 종류, 학급을 한 줄씩 남겨요.
+# - 장부(calls)는 덧붙이기만 하고 고치지 않아요. 하루·학급·호출 종류별 합계(daily_usage)는 같은 트랜잭션에서 올려요.
+# - 호출마다 파일에 쓰지 않고 모아 두었다가 flush_every줄이 차거나 flush_interval초가 지나면 한 번에 써요
+#   (프로세스가 끝날 때도 써요). 여러 워커가 같은 파일을 함께 써도 돼요 (SQLite WAL).
+# - 하루 예산(daily_budget, USD)을 정하면 오늘 쓴 비용에 따라 단계가 바뀌어요.
+#     ok   : 평소처럼
+#     soft : 예산의 soft_ratio 이상 ; 미리 만들기와 검사·컷 프롬프트 호출을 멈추고 싼 길로 돌려요
+#            (검사: 공유 캐시 → 로컬 필터 moderation.local_verdict, 컷 프롬프트: 기본 문장). 장면 만들기는 계속해요.
+#     hard : 예산을 다 씀 ; Gemini 호출을 모두 멈추고 검사는 로컬 필터, 장면과 프롬프트는 기본 문장으로 만들어요.
+#   다른 워커가 아직 쓰지 않은 몫(워커당 최대 flush_every줄)만큼은 늦게 보일 수 있어요.
+# - 쓰기에 실패하면(파일이 잠김 등) 그 줄들을 다시 모아 두고 다음에 써요. 계속 실패해도 max_pending줄까지만
+#   들고 있고, 넘치는 오래된 줄은 버려요 (ledger.dropped).
+#
+#   python ledger.py .cache/ledger.db --days 7
+#
+# metrics: ledger.records / ledger.flushes / ledger.dropped, budget.refused.<purpose>, 게이지 budget.spent_ratio
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    at REAL NOT NULL,
+    day TEXT NOT NULL,
+    classroom TEXT NOT NULL,
+    purpose TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    cost REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_usage (
+    day TEXT NOT NULL, classroom TEXT NOT NULL, purpose TEXT NOT NULL,
+    calls INTEGER NOT NULL, prompt_tokens INTEGER NOT NULL, output_tokens INTEGER NOT NULL,
+    latency_ms REAL NOT NULL, cost REAL NOT NULL,
+    PRIMARY KEY (day, classroom, purpose)
+) WITHOUT ROWID;
+"""
+
+# gemini-1.5-pro 기준 100만 토큰당 가격 (USD, 128k 토큰 이하 요청) ; GEMINI_INPUT_PRICE / GEMINI_OUTPUT_PRICE로 바꿔요
+INPUT_PRICE = 1.25
+OUTPUT_PRICE = 5.00
+
+STATES = ("ok", "soft", "hard")
+# soft 단계에서 멈추는 호출 (우선순위 batch인 미리 만들기도 함께 멈춰요)
+SOFT_PURPOSES = ("moderation", "panel_prompt")
+ROLLUPS = ("day", "classroom", "purpose")
+
+
+class Ledger:
+    def __init__(self, path, daily_budget=0.0, soft_ratio=0.8, input_price=INPUT_PRICE, output_price=OUTPUT_PRICE,
+                 flush_every=50, flush_interval=5.0, refresh=2.0, busy_timeout=10.0, max_pending=1000):
+        self.path = path
+        self.daily_budget = daily_budget
+        self.soft_ratio = soft_ratio
+        self.input_price = input_price
+        self.output_price = output_price
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.refresh = refresh
+        self.busy_timeout = busy_timeout
+        self.max_pending = max_pending
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.pending = []
+        self.last_flush = time.monotonic()
+        # (날짜, 읽은 시각, 저장된 오늘 비용) ; 예산 확인마다 파일을 읽지 않게 refresh초 동안 써요
+        self.spent = (None, 0.0, 0.0)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connect().executescript(SCHEMA)
+        atexit.register(self.flush)
+
+    def connect(self):
+        return shared_state.connect_local(self.local, self.path, self.busy_timeout)
+
+    def cost(self, prompt_tokens, output_tokens):
+        return (prompt_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    # --- 쓰기 ---
+
+    def record(self, purpose, classroom, model, prompt_tokens, output_tokens, latency_ms, day=None):
+        row = (time.time(), day or date.today().isoformat(), classroom or "-", purpose, model,
+               prompt_tokens, output_tokens, latency_ms, self.cost(prompt_tokens, output_tokens))
+        with self.lock:
+            self.pending.append(row)
+            due = len(self.pending) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval
+        metrics.increment("ledger.records")
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            self.last_flush = time.monotonic()
+        if not rows:
+            return
+        totals = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])
+        for _, day, classroom, purpose, _, prompt_tokens, output_tokens, latency_ms, cost in rows:
+            total = totals[(day, classroom, purpose)]
+            total[0] += 1
+            total[1] += prompt_tokens
+            total[2] += output_tokens
+            total[3] += latency_ms
+            total[4] += cost
+        db = self.connect()
+        try:
+            # 파일이 잠겨 있으면 BEGIN에서 실패해요 ; 그때도 줄들을 다시 모아 둬요
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT INTO calls (at, day, classroom, purpose, model, prompt_tokens, output_tokens, latency_ms, cost) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            db.executemany(
+                "INSERT INTO daily_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                "calls = calls + excluded.calls, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens, latency_ms = latency_ms + excluded.latency_ms, "
+                "cost = cost + excluded.cost",
+                [(*key, *total) for key, total in totals.items()])
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            with self.lock:
+                self.pending[:0] = rows
+                dropped = len(self.pending) - self.max_pending
+                if dropped > 0:
+                    del self.pending[:dropped]
+            if dropped > 0:
+                metrics.increment("ledger.dropped", dropped)
+            raise
+        db.execute("COMMIT")
+        committed = time.monotonic()
+        metrics.increment("ledger.flushes")
+        # 방금 쓴 몫을 커밋 전에 읽어 둔 오늘 비용에 더해요 (다음에 다시 읽을 때까지 예산 확인에서 빠지지 않게)
+        with self.lock:
+            day, read_at, stored = self.spent
+            if read_at < committed:
+                self.spent = (day, read_at, stored + sum(row[8] for row in rows if row[1] == day))
+
+    # --- 예산 ---
+
+    def spent_today(self):
+        today = date.today().isoformat()
+        day, read_at, stored = self.spent
+        if day != today or time.monotonic() - read_at >= self.refresh:
+            read_at = time.monotonic()
+            stored = self.connect().execute(
+                "SELECT coalesce(sum(cost), 0) FROM daily_usage WHERE day = ?", (today,)).fetchone()[0]
+            with self.lock:
+                self.spent = (today, read_at, stored)
+        with self.lock:
+            stored = self.spent[2] if self.spent[0] == today else stored
+            pending = sum(row[8] for row in self.pending if row[1] == today)
+        return stored + pending
+
+    def state(self):
+        if self.daily_budget <= 0:
+            return "ok"
+        ratio = self.spent_today() / self.daily_budget
+        metrics.set_gauge("budget.spent_ratio", ratio)
+        if ratio >= 1:
+            return "hard"
+        return "soft" if ratio >= self.soft_ratio else "ok"
+
+    def allows(self, purpose, priority):
+        state = self.state()
+        if state == "ok":
+            return True
+        if state == "soft" and purpose not in SOFT_PURPOSES and priority != "batch":
+            return True
+        metrics.increment(f"budget.refused.{purpose}")
+        return False
+
+    # --- 합계 (start, end는 "YYYY-MM-DD", 끝 날짜 포함) ---
+
+    def rollup(self, by, start, end, classroom=None):
+        # [(기준 값, 호출 수, 입력 토큰, 출력 토큰, 평균 지연 ms, 비용)] 비용 많은 순
+        if by not in ROLLUPS:
+            raise ValueError(f"알 수 없는 기준: {by}")
+        self.flush()
+        query = (f"SELECT {by}, sum(calls), sum(prompt_tokens), sum(output_tokens), sum(latency_ms) / sum(calls), "
+                 f"sum(cost) FROM daily_usage WHERE day BETWEEN ? AND ?")
+        params = [start, end]
+        if classroom:
+            query += " AND classroom = ?"
+            params.append(classroom)
+        order = "day" if by == "day" else "6 DESC"
+        return self.connect().execute(f"{query} GROUP BY {by} ORDER BY {order}", params).fetchall()
+
+
+def main(argv=None):
+    # 명령줄에서만 써요 (앱이 불러올 때는 argparse를 부르지 않아요)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gemini 사용량 장부 합계")
+    parser.add_argument("path", help="장부 파일 (LEDGER_PATH)")
+    parser.add_argument("--days", type=int, default=7, help="오늘까지 며칠")
+    parser.add_argument("--classroom", help="한 학급만")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger(args.path)
+    today = date.today()
+    start, end = (today - timedelta(days=args.days - 1)).isoformat(), today.isoformat()
+    print(f"{start} ~ {end}" + (f", 학급 {args.classroom}" if args.classroom else ""))
+    for by in ROLLUPS:
+        print(f"\n[{by}]")
+        for key, calls, prompt_tokens, output_tokens, latency_ms, cost in ledger.rollup(by, start, end, args.classroom):
+            print(f"{key:<14} 호출 {calls:>6,}  입력 {prompt_tokens:>10,}  출력 {output_tokens:>9,}  "
+                  f"평균 {latency_ms:>7,.0f}ms  ${cost:,.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
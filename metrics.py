@@ -0,0 +1,92 @@
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# 프로세스 단위 성능 지표 모음
+# 카운터(횟수), 게이지(현재 대기열 길이 등), 관측값(시간 등)을 모아 두었다가 snapshot()으로 보여줘요.
+# 앱 주소에 ?metrics=1 을 붙이면 화면 아래에서 볼 수 있고, 벤치마크에서도 바로 읽어요.
+
+_lock = threading.Lock()
+_counters = {}
+_observations = {}
+_gauges = {}
+
+# 관측값은 최근 값만 남겨서 메모리가 끝없이 늘지 않게 해요
+MAX_SAMPLES = 2048
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name, value):
+    # 현재 값 하나만 기억하는 지표 (대기열 길이 등)
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    with _lock:
+        samples = _observations.setdefault(name, [])
+        samples.append(value)
+        if len(samples) > MAX_SAMPLES:
+            del samples[:len(samples) - MAX_SAMPLES]
+
+
+def start():
+    return time.perf_counter(), time.thread_time()
+
+
+def finish(name, started):
+    wall_started, cpu_started = started
+    observe(f"{name}.wall_ms", (time.perf_counter() - wall_started) * 1000)
+    observe(f"{name}.cpu_ms", (time.thread_time() - cpu_started) * 1000)
+    increment(f"{name}.count")
+
+
+@contextmanager
+def timer(name):
+    # st.rerun()이나 st.stop()으로 빠져나가도 기록되도록 finally에서 남겨요
+    started = start()
+    try:
+        yield
+    finally:
+        finish(name, started)
+
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1],
+    }
+
+
+def snapshot():
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        observations = {name: _summary(samples) for name, samples in _observations.items() if samples}
+    return {"counters": counters, "gauges": gauges, "observations": observations}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _observations.clear()
@@ -0,0 +1,85 @@
+import output_filter
+
+# 학생 입력(상황, 감정 이유) 검사 규칙 (길이, 키워드, AI 검사 결과 읽기)
+# 앱(2·4단계)과 일괄 검사 도구(moderation_audit.py)가 같은 규칙을 쓰도록 한 곳에 모았어요.
+# - 기본 키워드: AI 검사가 애매하거나 실패했을 때만 쓰는 목록이에요. 상황 목록에는 한 글자 낱말도 있어서
+#   단독으로 쓰면 평범한 문장도 막혀요.
+# - AI 검사(SITUATION_CHECK / REASON_CHECK) 응답은 "부적절" / "적합" / 그 밖(애매)으로 읽어요.
+
+SITUATION_KEYWORDS = (
+    "시발", "병신", "김정은", "트럼프", "윤석열", "죽어", "꺼져", "좆", "씨발", "개새끼",
+    "바보", "멍청", "미친", "년", "새끼", "개새", "처먹", "좋이나", "쳐먹", "개소리",
+    "좋아", "좋이", "처", "먹", "쳐", "개", "병", "신", "미", "친",
+)
+
+REASON_KEYWORDS = ("시발", "병신", "김정은", "트럼프", "앙착의와잡괴", "좆", "씨발", "개새끼")
+
+# 로컬 필터(local_verdict) 목록 ; 욕설, 정치인, 끔찍한 폭력만 담아요
+# "싸우고 화해했어요", "동생이 때려서 속상했어요", "가족의 사랑"처럼 아이들이 흔히 쓰는 말은 넣지 않아요
+LOCAL_KEYWORDS = (
+    "시발", "씨발", "ㅅㅂ", "병신", "ㅂㅅ", "좆", "존나", "개새끼", "개새", "닥쳐", "꺼져", "미친놈", "미친년",
+    "트럼프", "김정은", "윤석열", "문재인", "박근혜", "이재명", "바이든", "푸틴", "시진핑",
+    "죽여", "죽일", "죽인다", "살인", "찔러", "찌르", "피투성이", "목졸", "총으로",
+)
+
+KINDS = ("situation", "reason")
+
+# AI 검사 결과
+UNSAFE = "부적절"
+SAFE = "적합"
+UNCLEAR = "애매"
+
+
+def validate_text_input(text, min_length=5, max_length=200, field_name="입력"):
+    if not text or not text.strip():
+        return False, f"{field_name}을 입력해주세요."
+
+    text = text.strip()
+    if len(text) < min_length:
+        return False, f"{field_name}은 최소 {min_length}자 이상 입력해주세요."
+
+    if len(text) > max_length:
+        return False, f"{field_name}은 최대 {max_length}자까지 입력 가능합니다."
+
+    return True, ""
+
+
+def keyword_hit(text, kind):
+    # 상황은 띄어 써서 피하는 걸 막으려고 공백을 빼고 봐요 (낱말마다 다시 만들지 않게 한 번만 바꿔요)
+    if kind == "situation":
+        text = text.lower().replace(" ", "")
+        return any(word in text for word in SITUATION_KEYWORDS)
+    text = text.lower()
+    return any(word in text for word in REASON_KEYWORDS)
+
+
+def blocklist_hit(text):
+    # 생성 글에 쓰는 안전 필터 목록 (예외 낱말 포함, output_filter.py)
+    return bool(output_filter.blocked_words(text))
+
+
+def ai_verdict(response):
+    if response and UNSAFE in response:
+        return UNSAFE
+    if response and SAFE in response:
+        return SAFE
+    return UNCLEAR
+
+
+def local_verdict(text):
+    # AI 검사 없이 정하는 결과 (하루 예산 때문에 검사를 보내지 않을 때)
+    # 상황 키워드 목록은 한 글자 낱말("친", "미")이 있어 "친구", "미술"도 막고, 생성 글의 안전 필터 목록은
+    # "싸우", "사랑", "예쁘"까지 막으니 둘 다 쓰지 않고 LOCAL_KEYWORDS만 봐요 (띄어 써서 피하지 않게 공백은 빼요)
+    text = text.lower().replace(" ", "")
+    if any(word in text for word in LOCAL_KEYWORDS):
+        return UNSAFE
+    return SAFE
+
+
+def input_blocked(text, kind, verdict=None):
+    # 앱이 그 입력을 막는지 ; verdict가 None이면 AI 검사가 실패한 경우(기본 키워드만 봐요)
+    if verdict == UNSAFE:
+        return True
+    if verdict == SAFE:
+        return False
+    return keyword_hit(text, kind)
@@ -0,0 +1,309 @@
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import resource
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import prompts
+import moderation
+import gemini_client
+
+# 학생 입력 일괄 검사 (오프라인)
+# 키워드 목록이나 안전 필터를 바꾸기 전에, 지금까지 쌓인 상황·감정 이유를 새 규칙으로 다시 검사해서
+# 예전 결과와 무엇이 달라지는지 봐요.
+#
+#   python moderation_audit.py --sessions .cache/shared_state.db --output audit/2026-10.jsonl
+#   python moderation_audit.py --jsonl export.jsonl --previous audit/2026-09.jsonl --diff audit/diff.jsonl
+#   python moderation_audit.py --sessions .cache/shared_state.db --gemini --workers 4   # GEMINI_* 환경 변수를 써요
+#
+# 입력 (여러 개를 함께 줘도 돼요, 준 순서대로 읽어요)
+# - --sessions: 공유 저장소(shared_state.db)의 스토리보드 (상황, 감정 이유) ; id는 토큰을 해시한 값이에요
+# - --analytics: 학급 통계 저장소(analytics.db)의 상황 (공백 정리한 앞 60자만 남아 있어요)
+# - --jsonl: 내보낸 파일 ("-"는 표준 입력) ; 한 줄에 {"id", "kind", "text"} 또는 {"id", "situation", "reason"}
+#   예전 결과(keywords / blocklist / gemini / blocked)가 같은 줄에 있으면 그것과 비교해요
+#
+# 검사 (줄마다)
+# - keywords: 앱의 기본 키워드 목록 (moderation.keyword_hit)
+# - blocklist: 생성 글 안전 필터 목록 (output_filter.blocked_words)
+# - local: 하루 예산 때문에 AI 검사를 보내지 않을 때 앱이 쓰는 로컬 필터 (moderation.local_verdict)
+# - gemini: --gemini를 주면 SITUATION_CHECK / REASON_CHECK를 보내요 (부적절 / 적합 / 애매 / 오류)
+# - blocked: 앱이 그 입력을 막는지 (AI 결과가 없거나 애매하면 기본 키워드로 정해요)
+#
+# 수백만 줄도 메모리가 일정하도록 입력 → 묶음 → 프로세스 풀 → 출력까지 모두 한 줄씩 흘려보내요.
+# 돌고 있는 묶음은 워커당 IN_FLIGHT_PER_WORKER개까지만 두고, 결과는 입력 순서대로 내보내요.
+# 그래서 --previous 파일은 같은 입력으로 만든 예전 결과면 id로 줄을 맞춰 한 줄씩 비교할 수 있어요.
+
+CHECKERS = ("keywords", "blocklist", "local", "gemini", "blocked")
+BATCH = 500
+IN_FLIGHT_PER_WORKER = 4
+SAMPLES = 5
+GEMINI_THREADS = 4
+ERROR_VERDICT = "오류"
+
+# 워커 프로세스마다 init_worker()가 정해요 ; Gemini 검사는 기다리는 시간이 대부분이라 워커 안에서 스레드로 동시에 보내요
+_use_gemini = False
+_gemini_pool = None
+
+
+# --- 입력 ---
+
+def hashed(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def read_only(path):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def previous_verdicts(item):
+    previous = {checker: item[checker] for checker in CHECKERS if checker in item}
+    return previous or None
+
+
+def read_sessions(path):
+    db = read_only(path)
+    for token, data in db.execute("SELECT token, data FROM sessions ORDER BY token"):
+        board = json.loads(data).get("storyboard") or {}
+        for kind in moderation.KINDS:
+            if board.get(kind):
+                yield f"session:{hashed(token)}:{kind}", kind, board[kind], None
+    db.close()
+
+
+def read_analytics(path):
+    db = read_only(path)
+    for row_id, situation in db.execute("SELECT id, situation FROM storyboards WHERE situation != '' ORDER BY id"):
+        yield f"analytics:{row_id}", "situation", situation, None
+    db.close()
+
+
+def read_jsonl(path):
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            row_id = str(item.get("id", f"{path}:{number}"))
+            if "text" in item:
+                yield row_id, item.get("kind", "situation"), item["text"], previous_verdicts(item)
+                continue
+            for kind in moderation.KINDS:
+                if item.get(kind):
+                    yield f"{row_id}:{kind}", kind, item[kind], None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def input_rows(args):
+    for path in args.sessions:
+        yield from read_sessions(path)
+    for path in args.analytics:
+        yield from read_analytics(path)
+    for path in args.jsonl:
+        yield from read_jsonl(path)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- 검사 (워커 프로세스) ---
+
+def init_worker(use_gemini, gemini_threads=GEMINI_THREADS):
+    global _use_gemini, _gemini_pool
+    _use_gemini = use_gemini
+    if use_gemini:
+        gemini_client.configure_from_env()
+        _gemini_pool = ThreadPoolExecutor(max_workers=gemini_threads, thread_name_prefix="audit")
+
+
+def gemini_verdict(text, kind):
+    template = prompts.SITUATION_CHECK if kind == "situation" else prompts.REASON_CHECK
+    response = gemini_client.ask_gemini(**prompts.request(template, text=text), tenant="audit", priority="batch")
+    if response.startswith("[오류]"):
+        return ERROR_VERDICT
+    return moderation.ai_verdict(response)
+
+
+def check_row(row, verdict=None):
+    row_id, kind, text, previous = row
+    result = {
+        "id": row_id,
+        "kind": kind,
+        "text": text,
+        "keywords": moderation.keyword_hit(text, kind),
+        "blocklist": moderation.blocklist_hit(text),
+        "local": moderation.local_verdict(text) == moderation.UNSAFE,
+        "gemini": verdict,
+        "blocked": moderation.input_blocked(text, kind, None if verdict == ERROR_VERDICT else verdict),
+    }
+    return result, previous
+
+
+def check_batch(batch):
+    if not _use_gemini:
+        return [check_row(row) for row in batch]
+    verdicts = _gemini_pool.map(lambda row: gemini_verdict(row[2], row[1]), batch)
+    return [check_row(row, verdict) for row, verdict in zip(batch, verdicts)]
+
+
+def audited(rows, workers, use_gemini, batch=BATCH, gemini_threads=GEMINI_THREADS):
+    # (결과, 예전 결과)를 입력 순서대로 내보내요
+    if workers <= 1:
+        init_worker(use_gemini, gemini_threads)
+        for chunk in batched(rows, batch):
+            yield from check_batch(chunk)
+        return
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(use_gemini, gemini_threads)) as pool:
+        # Pool.imap은 입력을 끝까지 미리 읽어 큐에 쌓아서 수백만 줄이면 메모리가 커져요 ; 돌고 있는 묶음 수를 직접 제한해요
+        pending = deque()
+        for chunk in batched(rows, batch):
+            pending.append(pool.apply_async(check_batch, (chunk,)))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def with_previous_file(results, path):
+    # 같은 입력으로 만든 예전 결과 파일과 한 줄씩 맞춰요 (id가 어긋나면 멈춰요)
+    with open(path, encoding="utf-8") as f:
+        for result, previous in results:
+            line = f.readline()
+            if line:
+                old = json.loads(line)
+                if old["id"] != result["id"]:
+                    raise SystemExit(f"예전 결과와 줄이 맞지 않아요: {old['id']} ≠ {result['id']} "
+                                     f"(같은 입력으로 만든 --previous 파일을 주세요)")
+                previous = previous_verdicts(old)
+            yield result, previous
+
+
+# --- 결과 ---
+
+def is_block(value):
+    return value is True or value == moderation.UNSAFE
+
+
+class AuditReport:
+    def __init__(self, samples=SAMPLES):
+        self.samples_per_change = samples
+        self.rows = 0
+        self.kinds = Counter()
+        self.flagged = Counter()
+        self.gemini = Counter()
+        self.compared = 0
+        self.changed_rows = 0
+        self.changes = Counter()
+        self.samples = {}
+
+    def add(self, result, previous):
+        # 예전 결과와 달라진 검사 [(검사, 예전, 지금)]
+        self.rows += 1
+        self.kinds[result["kind"]] += 1
+        for checker in CHECKERS:
+            if is_block(result[checker]):
+                self.flagged[checker] += 1
+        if result["gemini"] is not None:
+            self.gemini[result["gemini"]] += 1
+        if previous is None:
+            return []
+        self.compared += 1
+        changed = []
+        for checker in CHECKERS:
+            old, new = previous.get(checker), result[checker]
+            if old is None or new is None or old == new:
+                continue
+            changed.append((checker, old, new))
+            key = (checker, "막힘으로" if is_block(new) else "통과로")
+            self.changes[key] += 1
+            samples = self.samples.setdefault(key, [])
+            if len(samples) < self.samples_per_change:
+                samples.append(f"[{result['kind']}] {result['text'][:60]}")
+        if changed:
+            self.changed_rows += 1
+        return changed
+
+    def print(self, elapsed):
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        peak_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+        kinds = ", ".join(f"{kind} {count:,}" for kind, count in self.kinds.items())
+        print(f"검사한 줄: {self.rows:,} ({kinds})")
+        print(f"처리량: {rate:,.0f}줄/초 ({elapsed:.1f}초), 최대 메모리 {peak_mb:.0f}MB (프로세스 하나 기준)")
+        print("걸린 줄: " + ", ".join(f"{checker} {self.flagged[checker]:,}" for checker in CHECKERS))
+        if self.gemini:
+            print("gemini: " + ", ".join(f"{verdict} {count:,}" for verdict, count in self.gemini.most_common()))
+        if not self.compared:
+            print("예전 결과가 없어서 비교하지 않았어요.")
+            return
+        print(f"\n예전 결과와 비교: {self.compared:,}줄 중 {self.changed_rows:,}줄이 달라졌어요")
+        for (checker, direction), count in sorted(self.changes.items()):
+            print(f"- {checker}: {direction} 바뀜 {count:,}줄")
+            for sample in self.samples[(checker, direction)]:
+                print(f"    {sample}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="학생 입력 일괄 검사 (오프라인)")
+    parser.add_argument("--sessions", action="append", default=[], help="공유 저장소 파일 (shared_state.db)")
+    parser.add_argument("--analytics", action="append", default=[], help="학급 통계 저장소 파일 (analytics.db)")
+    parser.add_argument("--jsonl", action="append", default=[], help="내보낸 입력 파일 (- 는 표준 입력)")
+    parser.add_argument("--gemini", action="store_true", help="Gemini 검사도 함께 (GEMINI_MODE / GEMINI_BASE_URL 그대로)")
+    parser.add_argument("--gemini-threads", type=int, default=GEMINI_THREADS, help="워커마다 동시에 보내는 Gemini 검사 수")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batch", type=int, default=BATCH, help="워커에 한 번에 넘기는 줄 수")
+    parser.add_argument("--output", help="이번 결과를 쓸 파일 (다음 검사의 --previous로 써요)")
+    parser.add_argument("--previous", help="같은 입력으로 만든 예전 결과 파일")
+    parser.add_argument("--diff", help="달라진 줄만 쓸 파일")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="바뀐 종류마다 보여 줄 예시 수")
+    parser.add_argument("--progress", type=int, default=100_000, help="이만큼마다 진행 상황 출력 (0이면 끔)")
+    parser.add_argument("--fail-on-change", action="store_true", help="예전 결과와 달라진 줄이 있으면 실패")
+    args = parser.parse_args(argv)
+    if not (args.sessions or args.analytics or args.jsonl):
+        parser.error("--sessions, --analytics, --jsonl 중 하나는 주세요")
+
+    results = audited(input_rows(args), args.workers, args.gemini, args.batch, args.gemini_threads)
+    if args.previous:
+        results = with_previous_file(results, args.previous)
+
+    report = AuditReport(args.samples)
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    diff = open(args.diff, "w", encoding="utf-8") if args.diff else None
+    started = time.perf_counter()
+    try:
+        for result, previous in results:
+            changed = report.add(result, previous)
+            if output:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if diff and changed:
+                diff.write(json.dumps({"id": result["id"], "kind": result["kind"], "text": result["text"],
+                                       "changes": {checker: [old, new] for checker, old, new in changed}},
+                                      ensure_ascii=False) + "\n")
+            if args.progress and report.rows % args.progress == 0:
+                elapsed = time.perf_counter() - started
+                print(f"... {report.rows:,}줄, {report.rows / elapsed:,.0f}줄/초", file=sys.stderr)
+    finally:
+        for f in (output, diff):
+            if f:
+                f.close()
+    report.print(time.perf_counter() - started)
+    return 1 if args.fail_on_change and report.changed_rows else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import re
+import json
+
+import metrics
+
+# Gemini가 만든 글의 안전 필터
+# 막는 낱말이 한 군데라도 있으면 응답 전체를 버리던 것을, 그 낱말이 든 문장만 지우고 나머지는 살려요.
+# - 장면 목록("1. ...")은 줄(컷)마다 문장 단위로 지워요. 한 컷의 문장이 모두 지워지면 번호만 남아서
+#   scene_parser가 빠진 컷으로 보고, 앱이 그 컷만 다시 요청해요 (SCENE_FILL).
+# - 한 번에 검사하고 만들기(storyboard) 응답은 JSON이라 scenes 안의 글만 고쳐요.
+# - 남는 글이 없으면 예전처럼 SAFETY_MESSAGE를 돌려줘요.
+# 막는 낱말 목록은 그대로고, 걸린 문장은 화면에 절대 나가지 않아요.
+#
+# metrics: output_filter.<purpose>.repaired(고친 응답) / discarded(통째로 버린 응답) / spans(지운 문장 수)
+
+BLOCKLIST = (
+    "바보", "멍청", "죽어", "꺼져", "시발", "개새", "병신", "미친",
+    "혐오", "차별", "따돌림", "왕따", "괴롭히", "폭력", "때리", "싸우",
+    "비키니", "키스", "연애", "사랑", "섹시", "예쁘", "잘생", "몸매",
+    "담배", "술", "마약", "도박", "자해", "칼", "위험한",
+    "트럼프", "김정은", "윤석열", "문재인", "박근혜", "이재명",
+    "바이든", "푸틴", "시진핑", "정치인", "대통령", "국회의원",
+)
+
+# 막는 낱말이 들어 있지만 뜻이 전혀 다른 낱말 ("미술 시간", "술래잡기", "칼국수")
+ALLOWED_WORDS = ("미술", "기술", "예술", "마술", "요술", "수술", "술래", "칼국수", "칼슘", "칼라", "칼로리", "사랑니")
+
+SAFETY_MESSAGE = "[안전 필터] 부적절한 내용이 생성되어 다시 생성합니다. 안전한 내용으로 대체됩니다."
+
+# 문장 끝(. ! ? 。) 뒤의 공백에서 나눠요 ; "2. 장면"의 번호도 한 조각이 되어 그대로 남아요
+SENTENCE_BREAK = re.compile(r"(?<=[.!?。])\s+")
+
+
+def blocked_words(text):
+    for word in ALLOWED_WORDS:
+        text = text.replace(word, " ")
+    return [word for word in BLOCKLIST if word in text]
+
+
+def repair_text(text):
+    # (고친 글, 지운 문장 수) ; 글자(한글/영문/숫자 외 번호 표시 제외)가 하나도 안 남으면 고친 글은 None
+    lines = []
+    removed = 0
+    for line in text.split("\n"):
+        sentences = SENTENCE_BREAK.split(line)
+        kept = [sentence for sentence in sentences if not blocked_words(sentence)]
+        removed += len(sentences) - len(kept)
+        lines.append(" ".join(kept))
+    repaired = "\n".join(lines)
+    if not re.search(r"[가-힣A-Za-z]", repaired):
+        return None, removed
+    return repaired, removed
+
+
+def repair_storyboard(text):
+    # JSON 안의 장면만 고쳐요 ; 다 지워진 장면은 빈 글로 두면 앱이 그 컷만 다시 요청해요
+    try:
+        data = json.loads(text)
+        scenes = list(data["scenes"])
+    except (ValueError, KeyError, TypeError):
+        return repair_text(text)
+    removed = 0
+    for i, scene in enumerate(scenes):
+        repaired, count = repair_text(str(scene))
+        scenes[i] = repaired or ""
+        removed += count
+    data["scenes"] = scenes
+    return json.dumps(data, ensure_ascii=False), removed
+
+
+def repair(text, purpose="other"):
+    # 걸린 문장만 지운 글을 돌려줘요 ; 남는 게 없으면 None
+    if not blocked_words(text):
+        return text
+    if purpose == "storyboard":
+        repaired, removed = repair_storyboard(text)
+    else:
+        repaired, removed = repair_text(text)
+    metrics.increment(f"output_filter.{purpose}.spans", removed)
+    metrics.increment(f"output_filter.{purpose}.{'repaired' if repaired is not None else 'discarded'}")
+    return repaired
@@ -0,0 +1,178 @@
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+
+import metrics
+
+# 미리 만들기 (추측 실행)
+# 학생이 3단계에서 감정을 고르고 4단계에서 이유를 쓰는 동안, 나올 게 뻔한 Gemini 호출을 뒤에서 먼저 보내 둬요.
+# 5단계에서 같은 입력의 결과가 있으면 바로 쓰고(적중), 없으면 평소처럼 호출해요(빗나감).
+# 아직 호출을 보내지 못한 작업은 기다리지 않고 취소해서 빗나감으로 세요. 이미 보낸 작업만 잠깐 기다려요.
+# - 작업자 풀에서 줄 서 있는 작업은 Future를 취소해요.
+# - 작업자가 잡았지만 스케줄러 줄(batch)에 서 있거나 앞 작업을 기다리는 작업은 보내지 말라고 표시해요.
+#   작업이 호출을 보내기 직전에 before_send()를 불러서 확인해요 (ask_gemini의 before_send).
+#
+# - 작업은 입력으로 만든 key로 구분해요. 같은 key는 한 번만 실행해요.
+# - 한 번에 도는 작업 수(max_workers)와 분당 시작할 수 있는 작업 수(budget_per_minute)를 넘지 않아요.
+# - pressure()가 참이면(대기열이 밀리거나 호출 한도에 가까우면) 새 작업을 시작하지 않고,
+#   기다리던 작업도 실행 직전에 다시 확인해서 건너뛰어요.
+# - 입력이 바뀌어 필요 없어진 작업은 cancel()로 취소해요 (이미 실행 중이면 결과만 버려요).
+#
+# metrics: prefetch.calls(실제로 보낸 호출), prefetch.used(결과를 쓴 호출), prefetch.hits / misses,
+#          prefetch.skipped.pressure / budget, prefetch.cancelled, prefetch.errors
+#          게이지 prefetch.hit_rate = hits / (hits + misses), prefetch.waste_ratio = 1 - used / calls
+
+MAX_JOBS = 256
+
+
+def usable(future):
+    # 취소되지 않았고, 아직 도는 중이거나 결과를 남기고 끝난 작업
+    if future.cancelled():
+        return False
+    return not future.done() or (future.exception() is None and future.result() is not None)
+
+
+def job_key(*parts):
+    body = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:24]
+
+
+class Prefetcher:
+    def __init__(self, max_workers=2, budget_per_minute=30, pressure=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.budget_per_minute = budget_per_minute
+        self.pressure = pressure or (lambda: False)
+        self.lock = threading.Lock()
+        # key → Future ; 오래된 것부터 밀려나요
+        self.jobs = OrderedDict()
+        self.used = set()
+        # 호출을 보낸 작업 / 보내기 전에 본 요청이 가져가서 보내지 말아야 할 작업
+        self.sent = set()
+        self.dropped = set()
+        # 작업자 스레드마다 지금 돌리는 작업의 key
+        self.local = threading.local()
+        self.period = None
+        self.started_in_period = 0
+        self.counts = {"calls": 0, "used": 0, "hits": 0, "misses": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+            calls, used, hits, misses = (self.counts[k] for k in ("calls", "used", "hits", "misses"))
+        metrics.increment(f"prefetch.{name}")
+        metrics.set_gauge("prefetch.hit_rate", hits / (hits + misses) if hits + misses else 0.0)
+        metrics.set_gauge("prefetch.waste_ratio", 1 - used / calls if calls else 0.0)
+
+    def within_budget(self):
+        period = int(time.time() // 60)
+        if period != self.period:
+            self.period = period
+            self.started_in_period = 0
+        if self.started_in_period >= self.budget_per_minute:
+            return False
+        self.started_in_period += 1
+        return True
+
+    def submit(self, key, func, *args, **kwargs):
+        # 작업을 시작했거나 이미 있으면 True
+        if self.budget_per_minute <= 0:
+            return False
+        with self.lock:
+            if key in self.jobs and usable(self.jobs[key]):
+                return True
+            if self.pressure():
+                metrics.increment("prefetch.skipped.pressure")
+                return False
+            if not self.within_budget():
+                metrics.increment("prefetch.skipped.budget")
+                return False
+            self.sent.discard(key)
+            self.dropped.discard(key)
+            self.jobs[key] = self.pool.submit(self.run, key, func, args, kwargs)
+            while len(self.jobs) > MAX_JOBS:
+                old_key, old = self.jobs.popitem(last=False)
+                old.cancel()
+                self.sent.discard(old_key)
+                self.dropped.discard(old_key)
+        return True
+
+    def run(self, key, func, args, kwargs):
+        # 줄을 서 있는 동안 한도가 빠듯해졌으면 호출하지 않아요
+        if self.pressure():
+            metrics.increment("prefetch.skipped.pressure")
+            return None
+        self.local.key = key
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.local.key = None
+
+    def before_send(self):
+        # 작업 안에서 스케줄러 자리를 받고 호출을 보내기 직전에 불러요 ; 본 요청이 이미 가져갔으면 거짓
+        key = getattr(self.local, "key", None)
+        with self.lock:
+            if key in self.dropped:
+                return False
+            self.sent.add(key)
+        self.count("calls")
+        return True
+
+    def cancel(self, key):
+        # 아직 시작하지 않은 작업을 취소했으면 True
+        with self.lock:
+            future = self.jobs.get(key)
+        if future is not None and future.cancel():
+            metrics.increment("prefetch.cancelled")
+            with self.lock:
+                self.jobs.pop(key, None)
+            return True
+        return False
+
+    def take(self, key, timeout):
+        # 결과를 기다렸다 돌려줘요 ; 작업이 없거나, 취소됐거나, timeout 안에 안 끝나면 None
+        with self.lock:
+            future = self.jobs.get(key)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout)
+        except (CancelledError, FutureTimeout):
+            return None
+        except Exception:
+            metrics.increment("prefetch.errors")
+            return None
+        if result is not None:
+            with self.lock:
+                first = key not in self.used
+                self.used.add(key)
+                if len(self.used) > MAX_JOBS:
+                    self.used = set(self.jobs) & self.used
+            if first:
+                self.count("used")
+        return result
+
+    def collect(self, key, timeout):
+        # 호출을 이미 보낸 작업만 timeout까지 기다려요
+        # 아직 못 보낸 작업은 기다리면 줄 선 시간 + 호출 시간이 걸리니, 취소하고 바로 None을 돌려줘요
+        if self.cancel(key):
+            return None
+        with self.lock:
+            future = self.jobs.get(key)
+            waiting = future is not None and not future.done() and key not in self.sent
+            if waiting:
+                self.dropped.add(key)
+        if waiting:
+            metrics.increment("prefetch.cancelled")
+            return None
+        return self.take(key, timeout)
+
+    def claim(self, key, timeout):
+        # 본 요청 자리에서 부를 때: 적중/빗나감을 세요 (빗나가면 본 요청을 곧장 보내요)
+        if self.budget_per_minute <= 0:
+            return None
+        result = self.collect(key, timeout)
+        self.count("hits" if result is not None else "misses")
+        return result
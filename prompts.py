@@ -0,0 +1,143 @@
+# 프롬프트 템플릿
+# 호출마다 똑같은 지시문(system)은 Gemini의 systemInstruction으로 따로 보내고,
+# 호출마다 바뀌는 부분(user)만 채워서 보내요. 지시문은 뜻이 같은 한 줄로 줄였어요.
+#
+#   ask_gemini(**prompts.request(prompts.SITUATION_CHECK, text=situation))
+#
+# FOUR_PANEL은 Gemini에 보내지 않고 5단계에서 학생이 복사해 가는 4컷 전체 이미지 프롬프트예요 (영어).
+
+import catalog
+
+SITUATION_CHECK = {
+    "purpose": "moderation",
+    "system": """초등학생 교육용 앱의 내용 검토자입니다. 주어진 학교생활 상황이 초등학생 교육환경에 적합한지 문맥으로 판단하세요.
+부적절 기준: 폭력적·위험한 의도, 욕설·혐오 표현(변형·은어 포함), 성적 내용, 정치적 인물·논란, 의미 없는 글자 나열
+예시: "친구와 죽 먹기"→적합(음식 이야기), "괴물을 죽이기"→부적절(폭력), "김정은 만나기"→부적절(정치인), "시험을 망쳤어"→적합, "선생님이 미쳤다고 했어"→부적절
+"적합" 또는 "부적절" 중 하나로만 답하세요.""",
+    "user": '텍스트: "{text}"',
+}
+
+REASON_CHECK = {
+    "purpose": "moderation",
+    "system": """초등학생 교육용 앱의 내용 검토자입니다. 주어진 감정의 이유가 초등학생에게 적합한 감정 표현인지 문맥으로 판단하세요.
+부적절 기준: 폭력적·위험한 의도, 욕설·혐오·비하 표현, 성적 내용, 정치적 인물·논란
+예시: "죽도록 열심히 했는데"→적합(노력), "친구를 죽이고 싶었어"→부적절(폭력), "미친듯이 기뻤어"→적합(강조), "선생님이 미쳤다고 생각해"→부적절(비하)
+"적합" 또는 "부적절" 중 하나로만 답하세요.""",
+    "user": '텍스트: "{text}"',
+}
+
+SCENE_SUMMARY = {
+    "purpose": "scenes",
+    "system": """주어진 정보로 4컷 만화의 각 장면을 한 문장씩 간단명료하게 설명하세요.
+다른 말 없이 다음 형식으로만 답하세요:
+1. [첫 번째 장면]
+2. [두 번째 장면]
+3. [세 번째 장면]
+4. [네 번째 장면]""",
+    "user": """나이대: {age_group}
+상황: {situation}
+감정: {emotion}
+이유: {reason}""",
+}
+
+# 한 번에 검사하고 만들기 (PIPELINE_MODE=combined)
+# 4단계에서 만들기를 누를 때 상황과 이유를 함께 검사하고, 둘 다 적합하면 장면까지 한 번의 호출로 받아요
+# 응답은 JSON(gemini_client의 storyboard 생성 설정이 형식을 정해요)
+STORYBOARD_CHECKED = {
+    "purpose": "storyboard",
+    "system": """초등학생 교육용 4컷 만화 앱의 내용 검토자이자 스토리 작가입니다.
+1) 상황과 이유가 초등학생 교육환경에 적합한지 각각 문맥으로 판단하세요.
+부적절 기준: 폭력적·위험한 의도, 욕설·혐오·비하 표현(변형·은어 포함), 성적 내용, 정치적 인물·논란, 의미 없는 글자 나열
+예시: "친구와 죽 먹기"→적합(음식 이야기), "괴물을 죽이기"→부적절(폭력), "미친듯이 기뻤어"→적합(강조), "선생님이 미쳤다고 생각해"→부적절(비하)
+2) 둘 다 적합하면 4컷 만화의 각 장면을 한 문장씩 간단명료하게 쓰고, 하나라도 부적절하면 scenes는 빈 목록으로 두세요.
+JSON으로만 답하세요: {"situation": "적합" 또는 "부적절", "reason": "적합" 또는 "부적절", "scenes": ["첫 번째 장면", "두 번째 장면", "세 번째 장면", "네 번째 장면"]}""",
+    "user": """나이대: {age_group}
+상황: {situation}
+감정: {emotion}
+이유: {reason}""",
+}
+
+# 장면 요약 응답에서 빠진 장면만 다시 받아요 (scene_parser.py 참고)
+SCENE_FILL = {
+    "purpose": "scenes",
+    "system": """4컷 만화 스토리보드에서 빠진 장면만 한 문장씩 간단명료하게 채우세요. 앞뒤 장면과 이야기가 이어지게 하세요.
+다른 말 없이 "번호. 장면" 형식으로 빠진 번호만 답하세요.""",
+    "user": """나이대: {age_group}
+상황: {situation}
+감정: {emotion}
+이유: {reason}
+지금까지 장면:
+{scenes}
+빠진 장면 번호: {missing}""",
+}
+
+# 미리 만들기 (prefetch.py): 3단계에서 감정을 고르면 이유 없이 초안을 만들고, 4단계에서 이유가 오면 다듬어요
+# 지시문은 SCENE_SUMMARY와 같게 둬서 응답 형식도 같아요
+SCENE_DRAFT = {
+    "purpose": "scenes",
+    "system": SCENE_SUMMARY["system"],
+    "user": """나이대: {age_group}
+상황: {situation}
+감정: {emotion}""",
+}
+
+SCENE_REFINE = {
+    "purpose": "scenes",
+    "system": SCENE_SUMMARY["system"] + "\n장면 초안이 주어지면 감정의 이유가 드러나도록 다듬으세요.",
+    "user": """나이대: {age_group}
+상황: {situation}
+감정: {emotion}
+이유: {reason}
+장면 초안:
+{draft}""",
+}
+
+PANEL_PROMPT = {
+    "purpose": "panel_prompt",
+    "system": """K-6 학생용 4컷 만화의 한 컷을 그리기 위한 안전한 영어 이미지 생성 프롬프트를 만드세요.
+안전: 학교 환경에 맞는 건전하고 교육적이며 긍정적인 내용만, 폭력·성적 내용·위험한 행동 금지
+기술: 주어진 한 장면만 묘사, 네 컷 모두 같은 한국 초등학생 캐릭터, cute anime/manga style 유지, 영어로 작성
+설명 없이 프롬프트 한 문단만 간결하게 출력하세요.""",
+    "user": """나이대: {age_group}
+성별: {gender}
+상황: {situation}
+감정: {emotion}
+{index}번째 컷 장면: {scene}""",
+}
+
+
+FOUR_PANEL = """Create a 4-panel comic strip (네컷 만화) with consistent character design throughout all panels:
+
+Character: {character} ({age_group})
+Art Style: {style}
+Story theme: {situation}
+Main emotion: {emotion}
+Reason for emotion: {reason}
+
+Panel 1: {scenes[0]}
+Panel 2: {scenes[1]}
+Panel 3: {scenes[2]}
+Panel 4: {scenes[3]}
+
+Safety requirements: Safe for children, educational content, wholesome, school-appropriate, consistent character design across all panels, colorful, child-friendly."""
+
+
+def four_panel_prompt(board):
+    # board: storyboard_state.Storyboard (빈 컷은 빈 칸으로 둬요)
+    character = "Korean elementary school boy" if board.gender == "남자" else "Korean elementary school girl"
+    scenes = (list(board.scenes) + [""] * 4)[:4]
+    return FOUR_PANEL.format(character=character, age_group=board.age_group, style=catalog.style_prompt(board.art_style),
+                             situation=board.situation, emotion=board.emotion, reason=board.reason, scenes=scenes)
+
+
+def render(template, **values):
+    return template["user"].format(**values)
+
+
+def request(template, **values):
+    # ask_gemini에 그대로 넘길 수 있는 인자 묶음
+    return {
+        "prompt": render(template, **values),
+        "system_instruction": template["system"],
+        "purpose": template["purpose"],
+    }
@@ -0,0 +1,135 @@
+import re
+from functools import lru_cache
+
+# 장면 요약 응답 해석기
+# Gemini가 "1.", "1)", "(1)", "**1.**", "컷 1:", "1번째 장면:", "Panel 1 -" 처럼 번호를 여러 모양으로 쓰거나,
+# 두 장면을 한 줄에 붙여 써도 장면을 찾아내요. 스트리밍 조각을 받는 대로 feed()에 넣으면
+# 다음 번호가 나타나는 순간 앞 장면이 완성돼요. 끝나면 close()로 마지막 장면을 마무리해요.
+#
+#   parser = SceneParser()
+#   for chunk in chunks:
+#       parser.feed(chunk)
+#   scenes = parser.close()      # {번호: 장면}
+#   parser.missing()             # 빠진 번호들 → 그 장면만 다시 요청해요
+
+PANEL_COUNT = 4
+ORDINALS = {1: "첫", 2: "두", 3: "세", 4: "네", 5: "다섯", 6: "여섯"}
+# 번호 앞에 올 수 있는 목록/제목/강조 표시
+PREFIX = r"(?:[-*•]\s*)?(?:#{1,6}\s*)?(?:\*\*|__)?[\[(]?\s*"
+# 번호 뒤에 올 수 있는 닫는 괄호/강조/구분 기호
+SUFFIX = r"\s*[\])]?(?:\*\*|__)?\s*[:：.)\-–—]?\s*(?:\*\*|__)?\s*"
+# 스트리밍 중에는 번호 뒤로 이만큼 더 받은 다음에 번호로 인정해요 ("4번"이 "4번째 컷"이 될 수도 있어요)
+LOOKAHEAD = 8
+# 장면 끝에서 떼어낼 것들
+STRIP_CHARS = " \t\r\n*_[]\"'“”‘’:：-–—/|"
+
+
+def number_forms(number):
+    forms = [
+        rf"(?:컷|장면|씬|panel|scene|cut)\s*{number}(?!\d)\s*(?:번)?",
+        rf"{number}(?!\d)\s*(?:번째)?\s*(?:컷|장면|씬|번)",
+    ]
+    if number in ORDINALS:
+        forms.append(rf"{ORDINALS[number]}\s*번째\s*(?:컷|장면|씬)?")
+    return forms
+
+
+@lru_cache(maxsize=None)
+def marker_patterns(number):
+    # (줄 맨 앞에서 찾는 패턴, 줄 중간에서 찾는 패턴) ; 처음 쓰는 번호만 그때 만들어 두고 다시 써요
+    # 줄 맨 앞 패턴은 "\n" 바로 뒤에서만 맞아요. 버퍼 맨 앞이 줄 맨 앞인지는 SceneParser가 따로 기억해요
+    # 줄 중간에서는 "친구와 2번 부딪혔어요" 같은 문장을 번호로 오해하지 않도록 구분 기호가 꼭 있어야 해요
+    loose = "|".join(number_forms(number) + [rf"{number}(?!\d)\s*[.)．]", rf"\({number}\)", rf"{number}️?⃣"])
+    strict = "|".join(
+        [rf"(?:{form})\s*[\])]?(?:\*\*|__)?\s*[:：]" for form in number_forms(number)]
+        + [rf"{number}(?!\d)[.)](?=\s)", rf"\({number}\)", rf"{number}️?⃣"]
+    )
+    line_start = re.compile(rf"(?<=\n)[ \t]*{PREFIX}(?:{loose}){SUFFIX}", re.IGNORECASE)
+    inline = re.compile(rf"(?<![0-9A-Za-z가-힣]){PREFIX}(?:{strict}){SUFFIX}", re.IGNORECASE)
+    return line_start, inline
+
+
+def clean_scene(text, last=False):
+    if last:
+        # 마지막 장면 뒤에 붙는 설명 문단은 버려요
+        text = re.split(r"\n\s*\n", text.strip(), maxsplit=1)[0]
+    text = re.sub(r"\*\*|__", "", text)
+    text = " ".join(text.split())
+    return text.strip(STRIP_CHARS)
+
+
+class SceneParser:
+    def __init__(self, count=PANEL_COUNT):
+        self.count = count
+        self.buffer = ""
+        self.current = None
+        self.scenes = {}
+        self.preamble = ""
+        # 버퍼 맨 앞이 줄 맨 앞인지 ; 줄 중간의 번호를 떼어 낸 뒤("1. 2번째 시간에…")에는 아니에요
+        self.at_line_start = True
+
+    def find_next_marker(self, final=False):
+        # (번호, 시작, 끝) ; 다음 번호를 먼저 찾고, 번호를 건너뛴 경우(1, 2, 4)에는 줄 맨 앞의 더 큰 번호도 받아줘요
+        # 버퍼 앞에 한 글자(줄 맨 앞이면 "\n", 아니면 " ")를 붙여서 찾으니 위치는 1씩 빼요
+        text = ("\n" if self.at_line_start else " ") + self.buffer
+        best = None
+        expected = (self.current or 0) + 1
+        for number in range(expected, self.count + 1):
+            line_start, inline = marker_patterns(number)
+            candidates = [line_start] if number > expected else [line_start, inline]
+            for pattern in candidates:
+                match = pattern.search(text)
+                # 버퍼 끝에 걸친 번호는 다음 조각을 기다려요
+                ready = match and (final or match.end() + LOOKAHEAD <= len(text))
+                # PREFIX의 공백(\s*)이 앞에 붙인 글자부터 맞을 수 있어요 ; 그때도 시작은 버퍼 맨 앞(0)이에요
+                start = max(match.start() - 1, 0) if match else None
+                if ready and (best is None or start < best[1]):
+                    best = (number, start, match.end() - 1)
+        return best
+
+    def feed(self, chunk, final=False):
+        # 새로 완성된 (번호, 장면) 목록을 돌려줘요
+        self.buffer += chunk
+        completed = []
+        while True:
+            found = self.find_next_marker(final)
+            if found is None:
+                break
+            number, start, end = found
+            before = self.buffer[:start]
+            if self.current is None:
+                self.preamble += before
+            else:
+                scene = clean_scene(before)
+                if scene:
+                    self.scenes[self.current] = scene
+                    completed.append((self.current, scene))
+            # 번호 뒤 공백에 줄바꿈이 들어 있으면 다음 글자는 줄 맨 앞이에요
+            self.at_line_start = "\n" in self.buffer[start:end]
+            self.buffer = self.buffer[end:]
+            self.current = number
+        return completed
+
+    def close(self):
+        self.feed("", final=True)
+        if self.current is not None:
+            scene = clean_scene(self.buffer, last=True)
+            if scene:
+                self.scenes[self.current] = scene
+        elif not self.scenes:
+            # 번호가 하나도 없으면 빈 줄이 아닌 줄을 차례로 장면으로 봐요 ("다음과 같아요:" 같은 머리말은 빼고)
+            lines = [line for line in (self.preamble + self.buffer).splitlines() if not line.rstrip().endswith(":")]
+            lines = [line for line in map(clean_scene, lines) if line]
+            if len(lines) >= self.count:
+                self.scenes = {i + 1: line for i, line in enumerate(lines[:self.count])}
+        self.buffer = ""
+        return dict(self.scenes)
+
+    def missing(self):
+        return [number for number in range(1, self.count + 1) if number not in self.scenes]
+
+
+def parse_scenes(text, count=PANEL_COUNT):
+    parser = SceneParser(count)
+    parser.feed(text)
+    return parser.close()
@@ -0,0 +1,163 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import metrics
+
+# Gemini 호출 순서를 정하는 공정 스케줄러
+# - 우선순위: 실시간 검사(interactive) > 스토리보드 생성(generation) > 일괄/미리 계산(batch)
+# - 같은 우선순위 안에서는 학급(tenant)별로 돌아가며 하나씩 보내요 (한 학급이 줄을 독차지하지 않게)
+# - 동시에 나가는 호출 수는 max_concurrent개를 넘지 않아요
+# - limiter가 있으면(여러 워커 모드, shared_state.RateLimiter) 자리를 받은 뒤 모든 워커를 합친 분당 호출 수도 지켜요
+# 대기열 길이와 대기 시간은 metrics에 남겨요 (scheduler.<우선순위>.queue_depth / wait_ms)
+
+PRIORITIES = ("interactive", "generation", "batch")
+
+# 호출 목적(prompts.py의 purpose) → 우선순위
+PURPOSE_PRIORITY = {
+    "moderation": "interactive",
+    "scenes": "generation",
+    "storyboard": "generation",
+    "panel_prompt": "generation",
+    "precompute": "batch",
+    "batch": "batch",
+}
+
+DEFAULT_TENANT = "default"
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+def priority_for(purpose):
+    return PURPOSE_PRIORITY.get(purpose, "generation")
+
+
+class FairScheduler:
+    def __init__(self, max_concurrent=4, queue_timeout=60):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.limiter = None
+        self.lock = threading.Lock()
+        # 우선순위 → (학급 → 기다리는 호출들) ; OrderedDict 순서가 곧 학급 차례예요
+        self.queues = {priority: OrderedDict() for priority in PRIORITIES}
+
+    def has_waiters(self):
+        return any(self.queues[priority] for priority in PRIORITIES)
+
+    def depth(self, priority):
+        return sum(len(waiters) for waiters in self.queues[priority].values())
+
+    def publish_gauges(self):
+        metrics.set_gauge("scheduler.running", self.running)
+        for priority in PRIORITIES:
+            metrics.set_gauge(f"scheduler.{priority}.queue_depth", self.depth(priority))
+
+    def next_waiter(self):
+        for priority in PRIORITIES:
+            tenants = self.queues[priority]
+            if not tenants:
+                continue
+            tenant, waiters = next(iter(tenants.items()))
+            waiter = waiters.popleft()
+            # 차례가 끝난 학급은 맨 뒤로 보내요
+            del tenants[tenant]
+            if waiters:
+                tenants[tenant] = waiters
+            return waiter
+        return None
+
+    def dispatch(self):
+        while self.running < self.max_concurrent:
+            waiter = self.next_waiter()
+            if waiter is None:
+                break
+            self.running += 1
+            waiter.set()
+
+    def remove(self, priority, tenant, waiter):
+        waiters = self.queues[priority].get(tenant)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self.queues[priority][tenant]
+
+    def acquire(self, priority="generation", tenant=DEFAULT_TENANT, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        waiter = threading.Event()
+        with self.lock:
+            if self.running < self.max_concurrent and not self.has_waiters():
+                self.running += 1
+                waiter.set()
+            else:
+                self.queues[priority].setdefault(tenant, deque()).append(waiter)
+            self.publish_gauges()
+
+        if not waiter.wait(timeout):
+            with self.lock:
+                # 기다리다 포기하는 순간에 차례가 왔을 수도 있어요
+                if not waiter.is_set():
+                    self.remove(priority, tenant, waiter)
+                    self.publish_gauges()
+                    metrics.increment(f"scheduler.{priority}.timeouts")
+                    raise QueueTimeout(priority)
+
+        if self.limiter is not None:
+            remaining = max(0.0, timeout - (time.perf_counter() - started))
+            if not self.limiter.wait(remaining):
+                self.release()
+                metrics.increment(f"scheduler.{priority}.timeouts")
+                raise QueueTimeout(priority)
+
+        metrics.observe(f"scheduler.{priority}.wait_ms", (time.perf_counter() - started) * 1000)
+
+    def under_pressure(self, ratio=0.7):
+        # 자리가 꽉 찼거나, 급한 호출(interactive/generation)이 기다리거나, 분당 한도에 가까우면 참
+        with self.lock:
+            if self.running >= self.max_concurrent or self.depth("interactive") or self.depth("generation"):
+                return True
+        return self.limiter is not None and self.limiter.usage() >= ratio
+
+    def release(self):
+        with self.lock:
+            self.running -= 1
+            self.dispatch()
+            self.publish_gauges()
+
+    @contextmanager
+    def slot(self, priority="generation", tenant=DEFAULT_TENANT, timeout=None):
+        self.acquire(priority, tenant, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_scheduler = FairScheduler()
+
+
+def configure(max_concurrent=None, queue_timeout=None, limiter=None):
+    with _scheduler.lock:
+        if max_concurrent:
+            _scheduler.max_concurrent = int(max_concurrent)
+        if queue_timeout:
+            _scheduler.queue_timeout = float(queue_timeout)
+        if limiter is not None:
+            _scheduler.limiter = limiter
+        _scheduler.dispatch()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def slot(purpose, tenant=None, timeout=None, priority=None):
+    return _scheduler.slot(priority or priority_for(purpose), tenant or DEFAULT_TENANT, timeout)
+
+
+def under_pressure():
+    return _scheduler.under_pressure()
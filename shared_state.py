@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import metrics
+
+# 여러 Streamlit 프로세스(워커)가 함께 쓰는 상태 저장소
+# 한 서버에서 워커 여러 개를 띄울 때(workers.py) 같은 SQLite 파일(WAL 모드)을 함께 써요.
+# SHARED_STATE_PATH를 정하지 않으면 쓰지 않고, 예전처럼 프로세스마다 따로 동작해요.
+#
+# 들어 있는 것
+# - jobs: 같은 작업(같은 Gemini 검사 요청, 같은 4컷 만화)을 한 워커만 실행하고 나머지는 결과를 받아가요.
+#         끝난 결과는 max_age 동안 캐시로도 써요.
+# - rate: 모든 워커를 합친 분당 Gemini 호출 수 제한 (API 키 한도는 워커 수와 상관없이 하나예요)
+# - sessions: 브라우저 토큰(?sb=)별 진행 단계, 오늘 만든 횟수, 스토리보드
+#             다른 워커로 다시 연결되거나 새로고침해도 이어서 만들고, 하루 횟수 제한도 유지돼요
+#
+# 일관성 보장
+# - 모든 읽기/쓰기는 문장 하나짜리 트랜잭션이에요. 쓰기는 SQLite가 한 번에 하나씩 처리하고(직렬화),
+#   읽기는 마지막으로 커밋된 값을 봐요. 같은 서버의 로컬 디스크에서만 쓰세요 (NFS 등 네트워크 파일 시스템은 안 돼요).
+# - jobs: 임대(lease) 시간 안에는 한 key를 한 워커만 실행해요. 실행하던 워커가 죽으면 임대가 끝난 뒤
+#         다른 워커가 다시 실행해요 (최소 한 번 실행). 실패한 작업은 다음 요청이 다시 실행해요.
+# - rate: 고정 창(window) 카운터라 창 안에서는 정확하지만, 창 경계에서는 잠깐 최대 두 배까지 몰릴 수 있어요.
+# - sessions: 마지막에 저장한 값이 이겨요. 전체 재실행이 끝날 때 바뀐 경우에만 저장해요.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate (
+    name TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, period)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# 오래된 행 정리 주기 (쓰기 이만큼마다 한 번)
+PURGE_EVERY = 500
+JOB_RETENTION = 24 * 3600
+SESSION_RETENTION = 7 * 24 * 3600
+
+
+def connect_local(local, path, busy_timeout):
+    # sqlite3 연결은 스레드끼리 나눠 쓰지 않고 스레드마다 하나씩 만들어요 (local: threading.local())
+    # WAL이라 읽기는 쓰기를 기다리지 않고, 트랜잭션은 부르는 쪽이 BEGIN/COMMIT으로 직접 정해요
+    # 학급 통계(analytics.py)와 사용량 장부(ledger.py)도 같은 방식으로 열어요
+    db = getattr(local, "db", None)
+    if db is None:
+        db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        local.db = db
+    return db
+
+
+class SharedStore:
+    def __init__(self, path, busy_timeout=10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connect().executescript(SCHEMA)
+
+    def connect(self):
+        return connect_local(self.local, self.path, self.busy_timeout)
+
+    def wrote(self):
+        self.writes += 1
+        if self.writes % PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        db = self.connect()
+        db.execute("DELETE FROM jobs WHERE status != 'running' AND updated < ?", (now - JOB_RETENTION,))
+        db.execute("DELETE FROM rate WHERE period < ?", (int(now // 60) - 60,))
+        db.execute("DELETE FROM sessions WHERE updated < ?", (now - SESSION_RETENTION,))
+
+    # --- jobs ---
+
+    def claim(self, key, owner, lease, max_age):
+        now = time.time()
+        row = self.connect().execute(
+            """INSERT INTO jobs (key, status, owner, lease_until, result, updated)
+               VALUES (?, 'running', ?, ?, NULL, ?)
+               ON CONFLICT (key) DO UPDATE SET
+                   status = 'running', owner = excluded.owner, lease_until = excluded.lease_until,
+                   result = NULL, updated = excluded.updated
+               WHERE jobs.status = 'failed'
+                  OR (jobs.status = 'running' AND jobs.lease_until < ?)
+                  OR (jobs.status = 'done' AND jobs.updated < ?)
+               RETURNING owner""",
+            (key, owner, now + lease, now, now, now - max_age),
+        ).fetchone()
+        self.wrote()
+        return row is not None and row[0] == owner
+
+    def finish_job(self, key, owner, status, result=None):
+        self.connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, updated = ? WHERE key = ? AND owner = ?",
+            (status, result, time.time(), key, owner),
+        )
+        self.wrote()
+
+    def run_once(self, key, func, lease=120.0, max_age=JOB_RETENTION, poll=0.1):
+        # 다른 워커가 같은 key를 실행 중이면 끝날 때까지 기다렸다가 그 결과(JSON으로 저장할 수 있는 값)를 돌려줘요
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+        waited = False
+        while True:
+            if self.claim(key, owner, lease, max_age):
+                metrics.increment("shared.jobs.ran")
+                try:
+                    result = func()
+                except BaseException:
+                    self.finish_job(key, owner, "failed")
+                    raise
+                self.finish_job(key, owner, "done", json.dumps(result, ensure_ascii=False))
+                return result
+            row = self.connect().execute("SELECT status, result FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row and row[0] == "done":
+                metrics.increment("shared.jobs.joined" if waited else "shared.jobs.cached")
+                return json.loads(row[1])
+            waited = True
+            time.sleep(poll)
+
+    # --- rate ---
+
+    def rate_hit(self, name, limit, window=60):
+        # 이번 호출을 세고, 허용되면 0을, 아니면 다음 창까지 기다릴 초를 돌려줘요
+        now = time.time()
+        current = int(now // window)
+        count = self.connect().execute(
+            """INSERT INTO rate (name, period, count) VALUES (?, ?, 1)
+               ON CONFLICT (name, period) DO UPDATE SET count = count + 1
+               RETURNING count""",
+            (name, current),
+        ).fetchone()[0]
+        self.wrote()
+        if count <= limit:
+            return 0.0
+        return (current + 1) * window - now
+
+    def rate_count(self, name, window=60):
+        # 이번 창에서 지금까지 센 호출 수 (세지는 않아요)
+        row = self.connect().execute(
+            "SELECT count FROM rate WHERE name = ? AND period = ?", (name, int(time.time() // window))
+        ).fetchone()
+        return row[0] if row else 0
+
+    # --- sessions ---
+
+    def save_session(self, token, data):
+        self.connect().execute(
+            """INSERT INTO sessions (token, data, updated) VALUES (?, ?, ?)
+               ON CONFLICT (token) DO UPDATE SET data = excluded.data, updated = excluded.updated""",
+            (token, json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        self.wrote()
+
+    def load_session(self, token):
+        row = self.connect().execute("SELECT data FROM sessions WHERE token = ?", (token,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class RateLimiter:
+    # 모든 워커를 합쳐 window초에 limit번까지만 통과시켜요 (스케줄러가 자리를 준 다음에 확인해요)
+    def __init__(self, store, name, limit, window=60):
+        self.store = store
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def usage(self):
+        # 이번 창에서 한도를 얼마나 썼는지 (0.0~)
+        return self.store.rate_count(self.name, self.window) / self.limit
+
+    def wait(self, timeout):
+        # 통과하면 True, timeout 안에 차례가 안 오면 False
+        deadline = time.monotonic() + timeout
+        while True:
+            delay = self.store.rate_hit(self.name, self.limit, self.window)
+            if delay == 0:
+                return True
+            metrics.increment(f"shared.rate.{self.name}.delayed")
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
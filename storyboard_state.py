@@ -0,0 +1,76 @@
+from dataclasses import dataclass, fields, asdict
+
+# 학생 한 명이 만들고 있는 스토리보드 상태
+# session_state에 흩어진 키 대신 이 객체 하나만 두고, 길이 제한을 넘는 값은 잘라서 저장해요.
+# 오래 켜두는 키오스크 세션에서도 세션당 메모리가 일정하게 유지돼요.
+
+MAX_PANELS = 4
+
+# 필드별 최대 글자 수 (입력 검증 한도보다 조금 넉넉하게)
+FIELD_LIMITS = {
+    "age_group": 20,
+    "gender": 4,
+    "art_style": 20,
+    "situation": 200,
+    "emotion": 20,
+    "reason": 150,
+    "scenes": 300,
+    "scene_prompts": 1200,
+    "strip": 80,
+    "thumbnails": 80,
+}
+
+# 스토리보드 화면에서만 쓰고 다시 만들 때 지워야 하는 위젯 키
+WIDGET_KEYS = ("situation_input", "reason_input", "four_panel_final", "full_prompt_backup")
+WIDGET_KEY_PREFIXES = ("line_",)
+
+
+@dataclass(slots=True)
+class Storyboard:
+    age_group: str = None
+    gender: str = None
+    art_style: str = None
+    situation: str = None
+    emotion: str = None
+    reason: str = None
+    scenes: tuple = ()
+    scene_prompts: tuple = ()
+    # 만든 4컷 이미지는 그림 저장소(assets.py)에 두고 이름만 기억해요
+    strip: str = None
+    thumbnails: tuple = ()
+    counted: bool = False
+
+    def __setattr__(self, name, value):
+        limit = FIELD_LIMITS.get(name)
+        if limit and isinstance(value, str):
+            value = value[:limit]
+        elif limit and isinstance(value, (list, tuple)):
+            value = tuple(str(item)[:limit] for item in value[:MAX_PANELS])
+        object.__setattr__(self, name, value)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        # 저장소에서 읽은 값도 __setattr__를 거쳐서 길이 제한이 그대로 적용돼요
+        board = cls()
+        for field in fields(cls):
+            if field.name in data:
+                setattr(board, field.name, data[field.name])
+        return board
+
+    def approx_bytes(self):
+        # 세션당 메모리 확인용 대략적인 크기 (문자열 길이 기준)
+        total = 0
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, str):
+                total += len(value.encode("utf-8"))
+            elif isinstance(value, tuple):
+                total += sum(len(item.encode("utf-8")) for item in value)
+        return total
+
+
+def is_stale_widget_key(key):
+    return key in WIDGET_KEYS or any(str(key).startswith(prefix) for prefix in WIDGET_KEY_PREFIXES)
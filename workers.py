@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+# 여러 워커로 앱 띄우기
+# Streamlit 프로세스 하나는 GIL 때문에 무거운 작업을 한 번에 하나씩 처리해요.
+# 이 스크립트는 같은 서버에 워커 N개를 포트를 나눠 띄우고, 모두 같은 공유 저장소(SHARED_STATE_PATH)를 쓰게 해요.
+#
+#   python workers.py --workers 4 --base-port 8501
+#
+# 앞단의 로드 밸런서는 웹소켓을 쓰니 같은 브라우저를 같은 워커로 보내는 설정(sticky)을 권장해요. 예: nginx
+#
+#   upstream comic { ip_hash; server 127.0.0.1:8501; server 127.0.0.1:8502; ... }
+#   location / { proxy_pass http://comic; proxy_http_version 1.1;
+#                proxy_set_header Upgrade $http_upgrade; proxy_set_header Connection "upgrade"; }
+#
+# 다른 워커로 다시 연결돼도 주소의 ?sb= 토큰으로 진행 상황과 하루 횟수가 이어져요 (shared_state.py 참고).
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_SHARED_STATE_PATH = os.path.join(".cache", "shared_state.db")
+
+
+def worker_command(port):
+    return [sys.executable, "-m", "streamlit", "run", APP_PATH,
+            "--server.port", str(port), "--server.headless", "true"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 워커로 앱 띄우기")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--base-port", type=int, default=8501)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("SHARED_STATE_PATH", DEFAULT_SHARED_STATE_PATH)
+    processes = [subprocess.Popen(worker_command(args.base_port + i), env=env) for i in range(args.workers)]
+    print(f"워커 {args.workers}개: 포트 {args.base_port}~{args.base_port + args.workers - 1}, "
+          f"공유 저장소 {env['SHARED_STATE_PATH']}")
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    return max(process.returncode or 0 for process in processes)
+
+
+if __name__ == "__main__":
+    sys.exit(main())